@@ -7,16 +7,26 @@ Base class for all AI agents in the autonomous system
 import time
 import logging
 import threading
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 from abc import ABC, abstractmethod
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.helpers import safe_execute
+from utils.helpers import safe_execute, rate_limited_call
+from ai.response_cache import get_response_cache
 
 class BaseAI(ABC):
-    """Base class for all AI agents"""
+    """Base class for all AI agents
+
+    Claimed tasks run on a worker pool of config['concurrency'] threads
+    (default 1): processing is mostly waiting on the LLM provider, so an
+    agent can keep several requests in flight. The run loop only claims as
+    many tasks as there are free workers, so claimed tasks never sit behind
+    a busy pool while their lease runs down. stop() lets in-flight tasks
+    finish for up to config['drain_timeout'] seconds.
+    """
 
     def __init__(self, db_manager, config: Dict[str, Any]):
         self.db = db_manager
@@ -27,26 +37,61 @@ class BaseAI(ABC):
 
         # Initialize AI client (subclass must override if needed)
         self.client = None
+        self.provider = config.get('provider', 'openai')  # Rate limiter quota to draw from
+
+        # Identical requests are answered from the shared response cache
+        self.response_cache = get_response_cache() if config.get('cache_responses', True) else None
 
         # Performance tracking
         self.tasks_processed = 0
+        self.tasks_failed = 0
         self.last_activity = time.time()
 
+        # Concurrent task execution
+        self.concurrency = max(1, int(config.get('concurrency', 1)))
+        self.drain_timeout = config.get('drain_timeout', 30)
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._slots = threading.Condition()
+
+        # Task leases: claimed tasks return to the queue if not finished in time
+        self.lease_seconds = 300
+
+        # Agents block on the database's task notifier between claims; this
+        # fallback poll only catches tasks queued without a ring
+        self.poll_interval = 300
+
     def start(self):
         """Start the AI agent"""
         if not self.running:
             self.running = True
+            self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=self.name)
             self.thread = threading.Thread(target=self._run_loop, daemon=True)
             self.thread.start()
             logging.info(f"{self.name} AI agent started")
 
     def stop(self):
-        """Stop the AI agent"""
+        """Stop the AI agent, letting in-flight tasks finish"""
         self.running = False
+        self.db.task_notifier.wake()
+        with self._slots:
+            self._slots.notify_all()
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=5)
+        self._drain()
         logging.info(f"{self.name} AI agent stopped")
 
+    def _drain(self):
+        """Wait up to drain_timeout for in-flight tasks, then shut the worker pool down"""
+        with self._slots:
+            if not self._slots.wait_for(lambda: self.in_flight == 0, self.drain_timeout):
+                # Their leases expire and return them to the queue
+                logging.warning(f"{self.name} stopped with {self.in_flight} tasks still in flight")
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
     def is_alive(self) -> bool:
         """Check if agent is alive"""
         return self.running and (self.thread is None or self.thread.is_alive())
@@ -58,6 +103,10 @@ class BaseAI(ABC):
             'running': self.running,
             'alive': self.is_alive(),
             'tasks_processed': self.tasks_processed,
+            'tasks_failed': self.tasks_failed,
+            'concurrency': self.concurrency,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
             'last_activity': time.time() - self.last_activity
         }
 
@@ -71,7 +120,7 @@ class BaseAI(ABC):
         """Process a single task (subclass must implement)"""
         pass
 
-    def _generate_response(self, prompt: str, model: str = None, **kwargs) -> str:
+    def _generate_response(self, prompt: str, model: str = None, cache: bool = True, **kwargs) -> str:
         """Generate response using AI (generic method)"""
         try:
             if not self.client:
@@ -86,9 +135,14 @@ class BaseAI(ABC):
                 **kwargs
             }
 
-            response = safe_execute(self.client.chat.completions.create, **request_params)
-            if response and response.choices:
-                return response.choices[0].message.content
+            def call():
+                response = safe_execute(rate_limited_call, self.provider, self.client.chat.completions.create,
+                                        max_wait=self.lease_seconds, **request_params)
+                return response.choices[0].message.content if response and response.choices else None
+
+            content = self._cached_call(request_params, call, cache)
+            if content:
+                return content
             else:
                 return "I apologize, but I couldn't generate a response at this time."
 
@@ -96,10 +150,113 @@ class BaseAI(ABC):
             logging.error(f"{self.name} response generation failed: {e}")
             return f"Error generating response: {str(e)}"
 
+    def _cached_call(self, request_params: Dict[str, Any], call, cache: bool = True) -> Optional[str]:
+        """Answer a chat completion request from the response cache, calling the provider on a miss"""
+        if not self.response_cache:
+            return call()
+        params = {key: value for key, value in request_params.items() if key not in ('model', 'messages')}
+        return self.response_cache.fetch(self.name, request_params['model'], request_params['messages'],
+                                         params, call, cache=cache)
+
+    def _claim_tasks(self, types, limit: int):
+        """Atomically claim pending tasks of the given types for this agent
+
+        Blocks until a worker is free and claims at most one task per free
+        worker; returns [] once the agent is stopping.
+        """
+        free = self._free_workers()
+        if not free:
+            return []
+        return self.db.claim_tasks(self.name, types, min(limit, free), lease_seconds=self.lease_seconds)
+
+    def _free_workers(self, block: bool = True) -> int:
+        """Block until a worker is free or the agent stops; returns the number of free workers"""
+        with self._slots:
+            if block:
+                self._slots.wait_for(lambda: self.in_flight < self.concurrency or not self.running)
+            return self.concurrency - self.in_flight if self.running else 0
+
+    def _dispatch(self, task: Dict[str, Any], label: str = 'task'):
+        """Process a claimed task on the worker pool (inline when the agent was never started)"""
+        with self._slots:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        executor = self.executor
+        try:
+            if executor:
+                executor.submit(self._execute, task, label)
+                return
+        except RuntimeError:
+            pass  # Pool shut down by stop() after the claim
+        self._execute(task, label)
+
+    def _execute(self, task: Dict[str, Any], label: str):
+        """Process a task, record its outcome and free its worker"""
+        try:
+            # Slow provider calls and rate-limit waits must not outlive the claim
+            with self.db.keep_task_lease(task['id'], self.name, self.lease_seconds):
+                try:
+                    result = self.process_task(task)
+                except Exception as e:
+                    result = {'error': str(e)}
+            if self._finish_task(task, result):
+                logging.info(f"{self.name} completed {label} {task['id']}")
+            elif not result.get('success'):
+                logging.warning(f"{self.name} failed {label} {task['id']}: {result.get('error')}")
+        except Exception as e:
+            logging.error(f"{self.name} could not record {label} {task['id']}: {e}")
+        finally:
+            with self._slots:
+                self.in_flight -= 1
+                self._slots.notify_all()
+
+    def _work_sequence(self, types: List[str]) -> int:
+        """Notifier sequence for task types to pass to _wait_for_work; read it before claiming"""
+        return self.db.task_notifier.sequence_for(types)
+
+    def _wait_for_work(self, since: int, types: List[str]):
+        """Block until tasks of these types become claimable after `since`, the agent stops or poll_interval passes"""
+        self.db.task_notifier.wait(since, self.poll_interval, cancelled=lambda: not self.running, task_types=types)
+
+    def _task_prompt(self, task: Dict[str, Any]) -> str:
+        """Task content followed by the results of the workflow steps it depends on"""
+        prompt = task.get('content', '')
+        inputs = [item for item in task.get('inputs') or () if item.get('result')]
+        if inputs:
+            prompt += "\n\nResults of previous steps:\n" + "\n\n".join(
+                f"[{item.get('step') or item.get('type')}]\n{item['result']}" for item in inputs)
+        return prompt
+
+    @staticmethod
+    def result_text(result: Dict[str, Any]) -> Optional[str]:
+        """The generated text of a process_task result, stored as the task result"""
+        return result.get('content') or result.get('code') or result.get('analysis')
+
+    def _finish_task(self, task: Dict[str, Any], result: Dict[str, Any]) -> bool:
+        """Record a processed task as completed (with its result) or failed
+
+        Returns True only when the completion was recorded; a result for a
+        task whose lease this agent lost is dropped by the database.
+        """
+        if result.get('success'):
+            return self.db.update_task_status(task['id'], 'completed', assigned_agent=self.name,
+                                              result=self.result_text(result))
+        with self._slots:
+            self.tasks_failed += 1
+        self.db.update_task_status(task['id'], 'failed', assigned_agent=self.name,
+                                   error_message=result.get('error', 'Unknown error'))
+        return False
+
     def _log_activity(self):
         """Update last activity timestamp"""
         self.last_activity = time.time()
 
+    def _task_processed(self):
+        """Count a successfully processed task (called from worker threads)"""
+        with self._slots:
+            self.tasks_processed += 1
+        self._log_activity()
+
     def _health_check(self) -> bool:
         """Perform basic health check"""
         # Basic checks that can be overridden by subclasses
@@ -121,14 +278,13 @@ class ContentGeneratorAI(BaseAI):
 
             # Add context from knowledge base
             context = self._get_relevant_context(prompt)
-            enhanced_prompt = f"Context: {context}\n\nTask: {prompt}"
+            enhanced_prompt = f"Context: {context}\n\nTask: {self._task_prompt(task)}"
 
             response = self._generate_response(enhanced_prompt)
             if response:
                 # Save to knowledge base
                 self.db.add_knowledge(prompt, response)
-                self.tasks_processed += 1
-                self._log_activity()
+                self._task_processed()
 
                 return {
                     'success': True,
@@ -156,19 +312,15 @@ class ContentGeneratorAI(BaseAI):
     def _run_loop(self):
         """Main execution loop for content generation"""
         while self.running:
+            claimed_tasks = []
             try:
-                # Look for content generation tasks
-                pending_tasks = self.db.get_pending_tasks(limit=5)
-
-                for task in pending_tasks:
-                    if task['type'] == self.content_type or task['type'] == 'general':
-                        result = self.process_task(task)
-                        if result.get('success'):
-                            self.db.update_task_status(task['id'], 'completed')
-                            logging.info(f"{self.name} completed task {task['id']}")
-                        else:
-                            self.db.update_task_status(task['id'], 'failed')
-                            logging.warning(f"{self.name} failed task {task['id']}: {result.get('error')}")
+                # Claim content generation tasks
+                types = [self.content_type, 'general']
+                since = self._work_sequence(types)
+                claimed_tasks = self._claim_tasks(types, limit=5)
+
+                for task in claimed_tasks:
+                    self._dispatch(task)
 
                 # Health check every minute
                 if not self._health_check():
@@ -177,7 +329,8 @@ class ContentGeneratorAI(BaseAI):
             except Exception as e:
                 logging.error(f"{self.name} run loop error: {e}")
 
-            time.sleep(30)  # Check every 30 seconds
+            if not claimed_tasks:
+                self._wait_for_work(since, types)
 
 class CodeGeneratorAI(BaseAI):
     """Base class for code generation AIs"""
@@ -196,7 +349,7 @@ class CodeGeneratorAI(BaseAI):
             # Enhance prompt for code generation
             code_prompt = f"""You are an expert software developer. Generate high-quality, well-documented code based on this requirement:
 
-{prompt}
+{self._task_prompt(task)}
 
 Requirements:
 - Use modern best practices
@@ -207,12 +360,12 @@ Requirements:
 
 Generate only the code without any explanatory text around it:"""
 
-            code = self._generate_response(code_prompt, max_tokens=2000)
+            # Deterministic, so the same code task is answered from the response cache
+            code = self._generate_response(code_prompt, temperature=0, max_tokens=2000)
             if code:
                 # Save to knowledge base
                 self.db.add_knowledge(prompt, f"```python\n{code}\n```")
-                self.tasks_processed += 1
-                self._log_activity()
+                self._task_processed()
 
                 return {
                     'success': True,
@@ -229,24 +382,21 @@ Generate only the code without any explanatory text around it:"""
     def _run_loop(self):
         """Main execution loop for code generation"""
         while self.running:
+            claimed_tasks = []
             try:
-                # Look for code generation tasks
-                pending_tasks = self.db.get_pending_tasks(limit=3)
-
-                for task in pending_tasks:
-                    if task['type'] == 'code_generation':
-                        result = self.process_task(task)
-                        if result.get('success'):
-                            self.db.update_task_status(task['id'], 'completed')
-                            logging.info(f"{self.name} completed code task {task['id']}")
-                        else:
-                            self.db.update_task_status(task['id'], 'failed')
-                            logging.warning(f"{self.name} failed code task {task['id']}: {result.get('error')}")
+                # Claim code generation tasks
+                types = ['code_generation']
+                since = self._work_sequence(types)
+                claimed_tasks = self._claim_tasks(types, limit=3)
+
+                for task in claimed_tasks:
+                    self._dispatch(task, 'code task')
 
             except Exception as e:
                 logging.error(f"{self.name} code run loop error: {e}")
 
-            time.sleep(45)  # Code generation is more intensive, so less frequent checks
+            if not claimed_tasks:
+                self._wait_for_work(since, types)
 
 class AnalysisAI(BaseAI):
     """Base class for analysis and optimization AIs"""
@@ -264,7 +414,7 @@ class AnalysisAI(BaseAI):
 
             analysis_prompt = f"""Analyze this content and provide insights, improvements, and optimization suggestions:
 
-{content}
+{self._task_prompt(task)}
 
 Provide your analysis in the following format:
 1. Summary (2-3 sentences)
@@ -273,12 +423,12 @@ Provide your analysis in the following format:
 4. Actionable recommendations
 5. Optimized version:"""
 
-            analysis = self._generate_response(analysis_prompt, max_tokens=1500)
+            # At temperature 0, re-analyzing the same content is a response cache hit
+            analysis = self._generate_response(analysis_prompt, temperature=0, max_tokens=1500)
             if analysis:
                 # Save analysis to knowledge base
                 self.db.add_knowledge(f"Analysis of: {content[:100]}...", analysis)
-                self.tasks_processed += 1
-                self._log_activity()
+                self._task_processed()
 
                 return {
                     'success': True,
@@ -295,20 +445,17 @@ Provide your analysis in the following format:
     def _run_loop(self):
         """Main execution loop for analysis"""
         while self.running:
+            claimed_tasks = []
             try:
-                pending_tasks = self.db.get_pending_tasks(limit=5)
-
-                for task in pending_tasks:
-                    if task['type'] == 'analysis':
-                        result = self.process_task(task)
-                        if result.get('success'):
-                            self.db.update_task_status(task['id'], 'completed')
-                            logging.info(f"{self.name} completed analysis task {task['id']}")
-                        else:
-                            self.db.update_task_status(task['id'], 'failed')
-                            logging.warning(f"{self.name} failed analysis task {task['id']}: {result.get('error')}")
+                types = ['analysis']
+                since = self._work_sequence(types)
+                claimed_tasks = self._claim_tasks(types, limit=5)
+
+                for task in claimed_tasks:
+                    self._dispatch(task, 'analysis task')
 
             except Exception as e:
                 logging.error(f"{self.name} analysis run loop error: {e}")
 
-            time.sleep(60)  # Analysis is thoughtful work, check less frequently
+            if not claimed_tasks:
+                self._wait_for_work(since, types)
@@ -11,12 +11,14 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ai.base_ai import BaseAI
+from utils.helpers import rate_limited_call
 
 class ClaudeAI(BaseAI):
     """Anthropic Claude AI integration"""
 
-    def __init__(self, db_manager=None, api_key: str = ""):
-        super().__init__(db_manager)
+    def __init__(self, db_manager=None, api_key: str = "", config: Optional[Dict[str, Any]] = None):
+        super().__init__(db_manager, {'provider': 'claude', **(config or {})})
+        self.db_manager = db_manager
         self.api_key = api_key
         self.client = None
         self.initialized = False
@@ -33,8 +35,8 @@ class ClaudeAI(BaseAI):
             except Exception as e:
                 logging.error(f"Failed to initialize Claude AI: {e}")
 
-    def generate_response(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
-        """Generate response using Claude"""
+    def generate_response(self, prompt: str, context: Optional[Dict[str, Any]] = None, cache: bool = True) -> str:
+        """Generate response using Claude (cache=False skips the response cache)"""
 
         if not self.initialized:
             return "❌ Claude AI not initialized"
@@ -44,20 +46,22 @@ class ClaudeAI(BaseAI):
             if context:
                 system_prompt += f" Context: {context}"
 
-            response = self.client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=1024,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            request = {'model': "claude-3-opus-20240229", 'messages': [{"role": "user", "content": prompt}],
+                       'max_tokens': 1024, 'system': system_prompt}
+            usage = {}
 
-            content = response.content[0].text
+            def call():
+                response = rate_limited_call(self.provider, self.client.messages.create,
+                                             max_wait=self.lease_seconds, **request)
+                usage['tokens'] = response.usage.input_tokens + response.usage.output_tokens
+                return response.content[0].text
 
-            # Log successful interaction
+            # Identical prompts and context are answered from the response cache unless opted out
+            content = self._cached_call(request, call, cache)
+
+            # Log successful interaction (cache hits used no tokens)
             if self.db_manager:
-                self.log_interaction(prompt, content, response.usage.input_tokens + response.usage.output_tokens)
+                self.log_interaction(prompt, content, usage.get('tokens', 0))
 
             return content
 
@@ -13,7 +13,7 @@ from .base_ai import ContentGeneratorAI
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.helpers import safe_execute, measure_execution_time
+from utils.helpers import safe_execute, measure_execution_time, rate_limited_call
 
 class GrokAI(ContentGeneratorAI):
     """Grok AI Agent for content generation and strategic planning"""
@@ -21,6 +21,7 @@ class GrokAI(ContentGeneratorAI):
     def __init__(self, db_manager, config: Dict[str, Any]):
         super().__init__(db_manager, config)
         self.name = "Grok"
+        self.provider = 'grok'
 
         # Initialize Grok client
         try:
@@ -34,7 +35,7 @@ class GrokAI(ContentGeneratorAI):
             logging.error(f"Failed to initialize Grok client: {e}")
             self.client = None
 
-    def _generate_response(self, prompt: str, model: str = None, **kwargs) -> str:
+    def _generate_response(self, prompt: str, model: str = None, cache: bool = True, **kwargs) -> str:
         """Generate response using Grok AI"""
         if not self.client:
             return "Grok AI client not available. Please check API key configuration."
@@ -49,14 +50,22 @@ class GrokAI(ContentGeneratorAI):
                 **kwargs
             }
 
-            # Make API call with error handling
-            response = safe_execute(
-                self.client.chat.completions.create,
-                **request_params
-            )
-
-            if response and hasattr(response, 'choices') and response.choices:
-                return response.choices[0].message.content
+            # Make API call with error handling (identical requests are served from the cache)
+            def call():
+                response = safe_execute(
+                    rate_limited_call,
+                    self.provider,
+                    self.client.chat.completions.create,
+                    max_wait=self.lease_seconds,
+                    **request_params
+                )
+                if response and hasattr(response, 'choices') and response.choices:
+                    return response.choices[0].message.content
+                return None
+
+            content = self._cached_call(request_params, call, cache)
+            if content:
+                return content
             else:
                 return "I apologize, but Grok couldn't generate a response at this time."
 
@@ -207,42 +216,23 @@ Optimized Content:"""
     def _run_loop(self):
         """Main execution loop for Grok AI"""
         while self.running:
+            claimed_tasks = []
             try:
-                # Look for pending tasks
-                pending_tasks = self.db.get_pending_tasks(limit=3)
-
-                for task in pending_tasks:
-                    if task['type'] in ['content_generation', 'strategic_planning',
-                                       'marketing', 'analysis', 'general_content']:
-
-                        # Mark task as processing
-                        self.db.update_task_status(task['id'], 'processing', assigned_agent=self.name)
-
-                        # Process the task
-                        result = self.process_task(task)
-
-                        if result.get('success'):
-                            self.db.update_task_status(
-                                task['id'],
-                                'completed',
-                                assigned_agent=self.name,
-                                result=result.get('content'),
-                            )
-                            logging.info(f"Grok completed task {task['id']}")
-                        else:
-                            self.db.update_task_status(
-                                task['id'],
-                                'failed',
-                                assigned_agent=self.name,
-                                error_message=result.get('error', 'Unknown error'),
-                            )
-                            logging.error(f"Grok failed task {task['id']}: {result.get('error')}")
+                # Claim pending tasks (moves them to 'processing' atomically)
+                types = ['content_generation', 'strategic_planning', 'marketing', 'analysis', 'general_content']
+                since = self._work_sequence(types)
+                claimed_tasks = self._claim_tasks(types, limit=3)
+
+                for task in claimed_tasks:
+                    # Process the task on a free worker
+                    self._dispatch(task)
 
             except Exception as e:
                 logging.error(f"Grok AI run loop error: {e}")
 
-            # Sleep between task checks (Grok is thoughtful and strategic)
-            time.sleep(45)  # Longer pause for strategic thinking
+            # Wait for new tasks unless this round found some (more may be queued)
+            if not claimed_tasks:
+                self._wait_for_work(since, types)
 
     def get_status(self):
         """Get Grok AI status with additional metrics"""
@@ -316,8 +306,37 @@ Trend Forecast:"""
 
     # Integration with the AI system
 
-    def collaborate_with_agents(self, task_description: str) -> Dict[str, Any]:
-        """Plan how to collaborate with other AI agents on a complex task"""
+    def collaborate_with_agents(self, task_description: str, dispatch: bool = True) -> Dict[str, Any]:
+        """Hand a complex task to the other AI agents
+
+        By default the task is queued as a workflow: analysis, code and
+        content branches run in parallel on their agents and Grok joins their
+        results into one strategic plan. With dispatch=False, or when the
+        workflow cannot be queued, Grok only writes a sequential
+        collaboration plan.
+        """
+        if dispatch and self.db:
+            workflow = self.db.create_workflow(f"collaboration: {task_description[:80]}", {
+                'analysis': {'type': 'analysis',
+                             'content': f"Analyze requirements, market and risks for: {task_description}"},
+                'code': {'type': 'code_generation',
+                         'content': f"Implement the core functionality for: {task_description}"},
+                'content': {'type': 'content_generation',
+                            'content': f"Write launch and marketing content for: {task_description}"},
+                'integration': {'type': 'strategic_planning', 'after': ['analysis', 'code', 'content'],
+                                'content': f"Integrate the results of the other agents into one "
+                                           f"delivery plan with quality checks for: {task_description}"}
+            })
+            if workflow:
+                return {
+                    'task': task_description,
+                    'workflow_id': workflow['id'],
+                    'tasks': workflow['tasks'],
+                    'assigned_by': 'Grok',
+                    'timestamp': time.time()
+                }
+            logging.warning("Could not queue collaboration workflow, falling back to a sequential plan")
+
         collaboration_prompt = f"""
 For this complex task: "{task_description}"
 
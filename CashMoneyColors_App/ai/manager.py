@@ -19,11 +19,21 @@ from utils.helpers import safe_execute
 class AIManager:
     """Unified AI Manager for coordinating multiple AI agents"""
 
+    # Task type -> agent that the coordinator dispatches it to
+    TASK_ROUTES = {
+        'content_generation': 'grok_ai',
+        'code_generation': 'deepseek_ai',
+        'prototyping': 'blackbox_ai',
+        'analysis': 'claude_ai'
+    }
+
     def __init__(self, database):
         self.db = database
         self.agents = {}
         self.active_agents = []
         self.coordination_interval = 60  # seconds
+        self.health_check_interval = 60  # seconds, independent of how often tasks wake the coordinator
+        self.busy_poll_interval = 1  # seconds, re-check routes while an agent has no free workers
         self.running = False
 
         # Initialize coordination thread
@@ -142,6 +152,7 @@ class AIManager:
     def stop_all_agents(self):
         """Stop all running agents"""
         self.running = False
+        self.db.task_notifier.wake()
         for agent_name in self.active_agents[:]:  # Copy list to avoid modification during iteration
             self.stop_agent(agent_name)
         logging.info("All AI agents stopped")
@@ -171,10 +182,14 @@ class AIManager:
         if agent_name in self.agents and self.agents[agent_name]['status'] == 'running':
             try:
                 agent = self.agents[agent_name]['instance']
-                if hasattr(agent, 'process_task'):
+                if task.get('lease_expires_at') is not None:
+                    # Claimed under agent.name: run on the agent's bounded worker pool
+                    agent._dispatch(task)
+                    logging.info(f"Dispatched task {task['id']} to agent {agent_name}")
+                elif hasattr(agent, 'process_task'):
                     threading.Thread(
-                        target=agent.process_task,
-                        args=(task,),
+                        target=self._execute_task,
+                        args=(agent_name, agent, task),
                         daemon=True
                     ).start()
                     logging.info(f"Sent task to agent {agent_name}")
@@ -183,6 +198,13 @@ class AIManager:
             except Exception as e:
                 logging.error(f"Failed to send task to agent {agent_name}: {e}")
 
+    def _execute_task(self, agent_name: str, agent, task: Dict[str, Any]):
+        """Run an ad-hoc task that never came from the queue"""
+        try:
+            agent.process_task(task)
+        except Exception as e:
+            logging.error(f"Agent {agent_name} failed ad-hoc task: {e}")
+
     def broadcast_task(self, task: Dict[str, Any]):
         """Send task to all active agents"""
         for agent_name in self.active_agents:
@@ -190,33 +212,39 @@ class AIManager:
 
     def _coordinate_agents(self):
         """Coordinate agents autonomously"""
+        next_health_check = time.monotonic() + self.health_check_interval
         while self.running:
+            since = self.db.task_notifier.sequence_for(list(self.TASK_ROUTES))
+            interval = self.coordination_interval
             try:
-                # Check for pending tasks from database
-                pending_tasks = self.db.get_pending_tasks()
-
-                if pending_tasks:
-                    for task in pending_tasks:
-                        # Distribute tasks based on type
-                        if task['type'] == 'content_generation':
-                            self.send_task_to_agent('grok_ai', task)
-                        elif task['type'] == 'code_generation':
-                            self.send_task_to_agent('deepseek_ai', task)
-                        elif task['type'] == 'prototyping':
-                            self.send_task_to_agent('blackbox_ai', task)
-                        elif task['type'] == 'analysis':
-                            self.send_task_to_agent('claude_ai', task)
-                        else:
-                            # Send to all agents
-                            self.broadcast_task(task)
-
-                # Health check and auto-restart failed agents
-                self._health_check_agents()
+                # Claim routed tasks for running agents so no task is dispatched twice,
+                # never more than the agent has idle workers for
+                for task_type, agent_name in self.TASK_ROUTES.items():
+                    if agent_name not in self.active_agents:
+                        continue
+                    agent = self.agents[agent_name]['instance']
+                    free = agent._free_workers(block=False)
+                    tasks = self.db.claim_tasks(agent.name, [task_type], n=free,
+                                                lease_seconds=agent.lease_seconds) if free else []
+                    for task in tasks:
+                        agent._dispatch(task, task_type)
+                    if len(tasks) == free:
+                        # Every worker is busy and more may be queued; finishing a task
+                        # does not ring the notifier, so come back for the rest soon
+                        interval = min(interval, self.busy_poll_interval)
+
+                # Health check and auto-restart failed agents on their own schedule, not on every wake
+                if time.monotonic() >= next_health_check:
+                    next_health_check = time.monotonic() + self.health_check_interval
+                    self._health_check_agents()
 
             except Exception as e:
                 logging.error(f"Error in agent coordination: {e}")
 
-            time.sleep(self.coordination_interval)
+            # Woken as soon as routed tasks are queued, and in time for the next health check
+            timeout = max(0.0, min(interval, next_health_check - time.monotonic()))
+            self.db.task_notifier.wait(since, timeout, cancelled=lambda: not self.running,
+                                       task_types=list(self.TASK_ROUTES))
 
     def _health_check_agents(self):
         """Perform health checks on agents and restart if necessary"""
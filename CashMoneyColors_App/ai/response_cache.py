@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+RESPONSE CACHE MODULE
+Content-addressed cache for LLM provider responses: an in-memory LRU tier in
+front of an optional SQLite tier with TTL and size-based eviction, with
+concurrent misses for the same request coalesced into one provider call
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from ai.single_flight import SingleFlight
+
+Messages = Union[str, Iterable[Dict[str, Any]]]
+
+
+def normalize_prompt(text: str) -> str:
+    """Canonical form of a prompt for cache keys
+
+    Unicode is NFC-normalized, line endings unified, trailing whitespace
+    stripped from each line and leading/trailing blank lines dropped.
+    Indentation and inner spacing are kept: they matter in code prompts.
+    """
+    text = unicodedata.normalize('NFC', text).replace('\r\n', '\n').replace('\r', '\n')
+    return '\n'.join(line.rstrip() for line in text.split('\n')).strip('\n')
+
+
+def cache_key(model: str, messages: Messages, params: Optional[Dict[str, Any]] = None) -> str:
+    """SHA-256 over the normalized messages, model and request parameters"""
+    if isinstance(messages, str):
+        messages = [{'role': 'user', 'content': messages}]
+    payload = {
+        'model': model,
+        'messages': [{**message, 'content': normalize_prompt(message.get('content') or '')}
+                     if isinstance(message.get('content'), str) else message for message in messages],
+        'params': {name: normalize_prompt(value) if isinstance(value, str) else value
+                   for name, value in (params or {}).items() if value is not None},
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache of provider responses keyed by cache_key()
+
+    Lookups check the in-memory LRU (max_entries responses) first, then the
+    SQLite file at `path` when one is given. Disk entries expire after ttl
+    seconds; once the stored responses exceed max_bytes the least recently
+    used are evicted down to 90% of it.
+
+    Only deterministic requests are cached by default: a request is looked
+    up and stored only when its temperature is set and at most
+    max_temperature (0). Sampled responses are cached only on explicit
+    opt-in, by raising max_temperature or setting it to None (cache every
+    request, including ones left at the provider's default temperature).
+    Callers can also pass cache=False per request to opt out.
+
+    Misses go through a SingleFlight keyed on the cache key: requests that
+    miss while an identical one is already at the provider wait for it
+    instead of calling again. This includes requests that are not cacheable
+    (sampled at a higher temperature): they are not stored, but concurrent
+    identical ones still share one call. Requests passed cache=False are
+    neither cached nor coalesced.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, max_entries: int = 512,
+                 ttl: float = 7 * 86400, max_bytes: int = 64 << 20,
+                 max_temperature: Optional[float] = 0.0):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_temperature = max_temperature
+
+        self._memory: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'skipped': 0,
+                      'expired': 0, 'evicted': 0}
+        self.provider_stats: Dict[str, Dict[str, int]] = {}
+        self.flights = SingleFlight()
+
+        if self.path:
+            try:
+                self._open()
+            except sqlite3.Error as e:
+                logging.error(f"Response cache {self.path} unavailable, caching in memory only: {e}")
+                self._conn = None
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT,
+                model TEXT,
+                response TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_hit REAL NOT NULL,
+                hits INTEGER DEFAULT 0
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_last_hit ON responses(last_hit)')
+        self._conn.execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),))
+        self._disk_bytes = self._conn.execute('SELECT COALESCE(SUM(bytes), 0) FROM responses').fetchone()[0]
+
+    def cacheable(self, params: Optional[Dict[str, Any]] = None) -> bool:
+        """Whether a request with these parameters may be served from or stored in the cache"""
+        if self.max_temperature is None:
+            return True
+        # Without a temperature the provider samples at its default, which is not deterministic
+        temperature = (params or {}).get('temperature')
+        return temperature is not None and temperature <= self.max_temperature
+
+    def get(self, key: str, provider: str = '') -> Optional[str]:
+        """Cached response for `key`, or None"""
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                self._count('memory_hits', provider)
+                return response
+            if self._conn:
+                response = self._disk_get(key)
+                if response is not None:
+                    self._remember(key, response)
+                    self._count('disk_hits', provider)
+                    return response
+            self._count('misses', provider)
+            return None
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        now = time.time()
+        try:
+            row = self._conn.execute('SELECT response, expires_at, bytes FROM responses WHERE key = ?',
+                                     (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._disk_bytes -= row[2]
+                self.stats['expired'] += 1
+                return None
+            self._conn.execute('UPDATE responses SET last_hit = ?, hits = hits + 1 WHERE key = ?', (now, key))
+            return row[0]
+        except sqlite3.Error as e:
+            logging.warning(f"Response cache read failed: {e}")
+            return None
+
+    def put(self, key: str, response: str, provider: str = '', model: str = ''):
+        """Store a response in both tiers"""
+        with self._lock:
+            self._remember(key, response)
+            self._count('stores', provider)
+            if self._conn:
+                self._disk_put(key, response, provider, model)
+
+    def _disk_put(self, key: str, response: str, provider: str, model: str):
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        try:
+            old = self._conn.execute('SELECT bytes FROM responses WHERE key = ?', (key,)).fetchone()
+            self._conn.execute('''
+                INSERT OR REPLACE INTO responses (key, provider, model, response, bytes, created_at, expires_at, last_hit)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (key, provider, model, response, size, now, now + self.ttl, now))
+            self._disk_bytes += size - (old[0] if old else 0)
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+        except sqlite3.Error as e:
+            logging.warning(f"Response cache write failed: {e}")
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones until under 90% of max_bytes"""
+        expired = self._conn.execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),)).rowcount
+        self.stats['expired'] += expired
+        target = self.max_bytes * 0.9
+        total = self._conn.execute('SELECT COALESCE(SUM(bytes), 0) FROM responses').fetchone()[0]
+        evicted = []
+        for key, size in self._conn.execute('SELECT key, bytes FROM responses ORDER BY last_hit').fetchall():
+            if total <= target:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+        self.stats['evicted'] += len(evicted)
+        self._disk_bytes = total
+
+    def _remember(self, key: str, response: str):
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _count(self, stat: str, provider: str):
+        self.stats[stat] += 1
+        if provider:
+            counts = self.provider_stats.setdefault(provider, {'hits': 0, 'misses': 0, 'stores': 0})
+            counts['hits' if stat.endswith('_hits') else stat] += 1
+
+    def fetch(self, provider: str, model: str, messages: Messages, params: Optional[Dict[str, Any]],
+              call: Callable[[], Optional[str]], cache: bool = True) -> Optional[str]:
+        """Cached response for the request, or call() and cache what it returns
+
+        call() returns the response text, or None when the provider failed;
+        failures are never cached.
+        """
+        if not cache:
+            self._skip()
+            return call()
+        key, store = cache_key(model, messages, params), self.cacheable(params)
+        if store:
+            response = self.get(key, provider)
+            if response is not None:
+                return response
+        else:
+            self._skip()
+
+        def load():
+            # A flight for the same key may have landed between the miss and this leader starting
+            response = self._landed(key) if store else None
+            if response is None:
+                response = call()
+                if response and store:
+                    self.put(key, response, provider, model)
+            return response
+
+        return self.flights.do(key, load)
+
+    async def fetch_async(self, provider: str, model: str, messages: Messages, params: Optional[Dict[str, Any]],
+                          call: Callable[[], Awaitable[Optional[str]]], cache: bool = True) -> Optional[str]:
+        """fetch() for async provider clients: call() returns an awaitable"""
+        if not cache:
+            self._skip()
+            return await call()
+        key, store = cache_key(model, messages, params), self.cacheable(params)
+        if store:
+            response = self.get(key, provider)
+            if response is not None:
+                return response
+        else:
+            self._skip()
+
+        async def load():
+            response = self._landed(key) if store else None
+            if response is None:
+                response = await call()
+                if response and store:
+                    self.put(key, response, provider, model)
+            return response
+
+        return await self.flights.do_async(key, load)
+
+    def _skip(self):
+        with self._lock:
+            self.stats['skipped'] += 1
+
+    def _landed(self, key: str) -> Optional[str]:
+        """Response stored in memory since the caller's miss (not counted as a lookup)"""
+        with self._lock:
+            return self._memory.get(key)
+
+    def clear(self):
+        """Drop every cached response from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn:
+                self._conn.execute('DELETE FROM responses')
+                self._disk_bytes = 0
+
+    def close(self):
+        """Close the disk tier"""
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit, miss and eviction counts, hit rate and tier sizes"""
+        with self._lock:
+            hits = self.stats['memory_hits'] + self.stats['disk_hits']
+            lookups = hits + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_bytes': self._disk_bytes if self._conn else None,
+                'providers': {name: dict(counts) for name, counts in self.provider_stats.items()},
+                'single_flight': self.flights.get_stats(),
+            }
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache(path: Optional[Union[str, Path]] = None, **options) -> ResponseCache:
+    """Get the global response cache, creating it on first use
+
+    Arguments only take effect on the call that creates the instance; without
+    a path the cache is memory-only.
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(path, **options)
+    return _response_cache
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+SINGLE FLIGHT MODULE
+Coalesces concurrent identical provider requests into one call whose result
+every caller receives, for threads and asyncio tasks alike
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Flight:
+    """One in-flight call and the number of callers attached to it"""
+    __slots__ = ('future', 'waiters')
+
+    def __init__(self):
+        self.future: Future = Future()
+        # A running future cannot be cancelled, so a cancelled asyncio waiter
+        # never cancels the call for everyone else
+        self.future.set_running_or_notify_cancel()
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is in flight wait for it and receive its result, or its
+    exception. The shared result is a concurrent.futures.Future, so threads
+    block on it and asyncio tasks await it, whichever kind led the call.
+    Nothing is remembered once the call lands; pair it with a cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def _join(self, key: Hashable) -> Tuple[_Flight, bool]:
+        """Attach to the key's flight, starting one if none; returns (flight, is_leader)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+                return flight, True
+            flight.waiters += 1
+            self.coalesced += 1
+            self.max_waiters = max(self.max_waiters, flight.waiters)
+            return flight, False
+
+    def _land(self, key: Hashable, flight: _Flight, result: Any = None, error: BaseException = None):
+        if error is not None:
+            flight.future.set_exception(error)
+        else:
+            flight.future.set_result(result)
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """fn() once for all concurrent callers with this key"""
+        flight, leader = self._join(key)
+        if not leader:
+            return flight.future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """await fn() once for all concurrent callers with this key"""
+        flight, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(flight.future)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result)
+        return result
+
+    def waiters(self) -> Dict[Hashable, int]:
+        """Callers currently waiting on each in-flight key"""
+        with self._lock:
+            return {key: flight.waiters for key, flight in self._flights.items()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Calls made, calls saved by coalescing and current flights"""
+        with self._lock:
+            requests = self.calls + self.coalesced
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'saved_ratio': self.coalesced / requests if requests else 0.0,
+                'max_waiters': self.max_waiters,
+                'in_flight': len(self._flights),
+                'waiting': sum(flight.waiters for flight in self._flights.values()),
+            }
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+AGENT CONCURRENCY BENCHMARK
+Runs an analysis agent whose provider call is simulated by a fixed sleep
+over a queued backlog at several concurrency settings and reports task
+throughput and the peak number of requests in flight
+
+Usage: python benchmarks/agent_concurrency_benchmark.py [--tasks 40] [--latency 0.2] [--concurrency 1 4 8]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ai.base_ai import AnalysisAI
+from db.manager import NexusDatabase
+
+
+class SimulatedAnalysisAI(AnalysisAI):
+    """Analysis agent whose LLM round-trip is a sleep of `latency` seconds"""
+
+    def __init__(self, db_manager, config, latency: float):
+        super().__init__(db_manager, config)
+        self.latency = latency
+
+    def _generate_response(self, prompt: str, model: str = None, **kwargs) -> str:
+        time.sleep(self.latency)
+        return f"Analysis: {prompt[:40]}"
+
+
+def run(tasks: int, latency: float, concurrency: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = NexusDatabase(str(Path(tmp) / 'bench.db'), pool_mode='thread')
+        db.create_tasks_bulk(('analysis', f"Quarterly report {i}", 1) for i in range(tasks))
+        agent = SimulatedAnalysisAI(db, {'concurrency': concurrency}, latency)
+        start = time.perf_counter()
+        agent.start()
+        while db.get_system_stats().get('completed_tasks', 0) < tasks and time.perf_counter() - start < 300:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        agent.stop()
+        status = agent.get_status()
+        db.close()
+    return {'seconds': elapsed, 'tasks_per_s': tasks / elapsed, 'peak': status['peak_in_flight'],
+            'processed': status['tasks_processed']}
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.2, help='simulated provider round-trip in seconds')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    print(f"{'concurrency':>11} {'processed':>9} {'seconds':>8} {'tasks/s':>8} {'peak in flight':>14}")
+    for concurrency in args.concurrency:
+        r = run(args.tasks, args.latency, concurrency)
+        print(f"{concurrency:>11} {r['processed']:>9} {r['seconds']:>8.2f} {r['tasks_per_s']:>8.1f} {r['peak']:>14}")
+
+
+if __name__ == "__main__":
+    main()
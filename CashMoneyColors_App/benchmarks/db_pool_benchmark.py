@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+DATABASE POOL BENCHMARK
+Compares multi-threaded read/write throughput of the single shared connection
+against the per-thread and pooled connection modes of NexusDatabase
+
+Usage: python benchmarks/db_pool_benchmark.py [--readers 8] [--writers 4] [--seconds 5]
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.manager import NexusDatabase
+
+
+def run_mode(mode: str, readers: int, writers: int, seconds: float) -> dict:
+    """Hammer one database with concurrent readers and writers and count operations"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = NexusDatabase(str(Path(tmp) / 'bench.db'), pool_mode=mode,
+                           pool_size=writers, read_pool_size=readers)
+        for i in range(200):
+            db.add_knowledge(f"seed query {i}", f"seed response {i}", category='bench')
+
+        counts = {'reads': 0, 'writes': 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def reader():
+            done = 0
+            while not stop.is_set():
+                db.get_system_stats()
+                db.get_knowledge('seed', limit=5)
+                done += 2
+            with lock:
+                counts['reads'] += done
+
+        def writer(worker_id: int):
+            done = 0
+            while not stop.is_set():
+                db.log_agent_metric(f"bench_{worker_id}", 'write', 0.01)
+                db.create_task('benchmark', f"task {worker_id}-{done}")
+                done += 2
+            with lock:
+                counts['writes'] += done
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        db.close()
+
+    return {
+        'mode': mode,
+        'reads_per_sec': counts['reads'] / elapsed,
+        'writes_per_sec': counts['writes'] / elapsed
+    }
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--modes', nargs='+', default=['single', 'thread', 'pool'])
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'reads/sec':>12} {'writes/sec':>12}")
+    for mode in args.modes:
+        result = run_mode(mode, args.readers, args.writers, args.seconds)
+        print(f"{result['mode']:<8} {result['reads_per_sec']:>12.0f} {result['writes_per_sec']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+DATABASE QUERY BENCHMARK
+Times the public NexusDatabase methods against synthetic datasets of several
+sizes, captures EXPLAIN QUERY PLAN for every statement they run and writes a
+JSON report that can be diffed against the report of an earlier release
+
+Usage: python benchmarks/db_query_benchmark.py [--sizes 10000,100000] [--repeat 5]
+                                               [--output report.json] [--baseline old.json]
+
+A size is the number of knowledge rows; the other tables scale with
+DATASET_RATIOS (--sizes 1000000 gives 1M knowledge rows, 5M agent_metrics
+rows and 500k tasks).
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.manager import NexusDatabase
+
+# Rows per table for each knowledge row
+DATASET_RATIOS = {
+    'knowledge': 1.0,
+    'agent_metrics': 5.0,
+    'tasks': 0.5,
+    'conversations': 0.5,
+    'revenue': 0.1,
+}
+
+INSERT_CHUNK = 50000
+HISTORY_DAYS = 120
+
+AGENTS = ['grok', 'content_ai', 'code_ai', 'analysis_ai', 'coordinator']
+TASK_TYPES = ['content_generation', 'code_generation', 'data_analysis', 'market_research', 'optimization']
+CATEGORIES = ['general', 'business', 'technical', 'marketing', 'finance', 'research']
+SOURCES = ['consulting', 'content', 'automation', 'trading', 'affiliate']
+VOCABULARY = ('revenue growth market customer pricing strategy automation python database '
+              'quantum avatar analysis report content campaign funnel conversion pipeline '
+              'latency throughput cache index query agent model token budget forecast '
+              'invoice payment subscription churn retention onboarding feature release').split()
+
+Case = Tuple[str, Callable[[NexusDatabase], Any]]
+
+
+def benchmark_cases(size: int) -> List[Case]:
+    """Method calls to time; read paths first, then writes, destructive calls last"""
+    return [
+        ('get_knowledge', lambda db: db.get_knowledge('market strategy', limit=5)),
+        ('get_knowledge[category]', lambda db: db.get_knowledge('quantum', limit=5, category='technical')),
+        ('search_knowledge', lambda db: db.search_knowledge('customer churn', limit=10)),
+        ('get_pending_tasks', lambda db: db.get_pending_tasks(limit=10)),
+        ('get_pending_tasks[type]', lambda db: db.get_pending_tasks(limit=10, task_type='data_analysis')),
+        ('get_task_by_id', lambda db: db.get_task_by_id(max(1, size // 4))),
+        ('get_conversation_history', lambda db: db.get_conversation_history(limit=10)),
+        ('get_revenue_stats', lambda db: db.get_revenue_stats(days=30)),
+        ('get_agent_performance', lambda db: db.get_agent_performance(days=7)),
+        ('get_agent_performance[agent]', lambda db: db.get_agent_performance('grok', days=30)),
+        ('get_system_stats', lambda db: db.get_system_stats()),
+        ('get_system_stats[exact]', lambda db: db.get_system_stats(exact=True)),
+        ('add_knowledge', lambda db: db.add_knowledge(f"bench query {time.perf_counter_ns()}", "bench response")),
+        ('update_knowledge_confidence', lambda db: db.update_knowledge_confidence(max(1, size // 2), 0.9)),
+        ('create_task', lambda db: db.create_task('data_analysis', "bench task", priority=2, dedupe=False)),
+        ('update_task_status', lambda db: db.update_task_status(max(1, size // 3), 'completed', result="ok")),
+        ('claim_tasks', lambda db: db.claim_tasks('bench_agent', types=['content_generation'], n=5)),
+        ('requeue_expired_tasks', lambda db: db.requeue_expired_tasks()),
+        ('save_conversation', lambda db: db.save_conversation("bench query", "bench response", 0.2)),
+        ('log_agent_metric', lambda db: db.log_agent_metric('grok', 'generate', 0.3, tokens_used=100)),
+        ('log_revenue', lambda db: db.log_revenue(12.5, 'consulting')),
+        ('compact_rollups', lambda db: db.compact_rollups()),
+        ('cleanup_old_entries', lambda db: db.cleanup_old_entries(days=90)),
+    ]
+
+
+# Methods that change the dataset enough that repeating them measures something else
+RUN_ONCE = {'cleanup_old_entries'}
+
+
+def generate_dataset(db: NexusDatabase, size: int, seed: int = 42) -> Dict[str, int]:
+    """Bulk-load synthetic rows with timestamps spread over the last HISTORY_DAYS days"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    def timestamp() -> str:
+        return (now - timedelta(seconds=rng.randint(0, HISTORY_DAYS * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+
+    def words(n: int) -> str:
+        return ' '.join(rng.choice(VOCABULARY) for _ in range(n))
+
+    generators = {
+        'knowledge': (
+            'INSERT INTO knowledge (query, response, category, confidence, created_at) VALUES (?, ?, ?, ?, ?)',
+            lambda i: (f"{words(4)} #{i}", words(30), rng.choice(CATEGORIES), rng.random(), timestamp())),
+        'agent_metrics': (
+            'INSERT INTO agent_metrics (agent_name, operation, duration, success, tokens_used, cost, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            lambda i: (rng.choice(AGENTS), 'generate', rng.lognormvariate(-1, 0.8), rng.random() > 0.05,
+                       rng.randint(50, 2000), rng.random() / 100, timestamp())),
+        'tasks': (
+            'INSERT INTO tasks (task_type, content, priority, status, result, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            lambda i: _task_row(rng, words, timestamp)),
+        'conversations': (
+            'INSERT INTO conversations (user_query, ai_response, response_time, satisfaction_rating, created_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            lambda i: (words(8), words(40), rng.random() * 3, rng.randint(1, 5), timestamp())),
+        'revenue': (
+            'INSERT INTO revenue (amount, source, description, created_at) VALUES (?, ?, ?, ?)',
+            lambda i: (round(rng.uniform(1, 500), 2), rng.choice(SOURCES), words(5), timestamp())),
+    }
+
+    counts = {}
+    for table, (sql, make_row) in generators.items():
+        total = int(size * DATASET_RATIOS[table])
+        for offset in range(0, total, INSERT_CHUNK):
+            batch = [make_row(i) for i in range(offset, min(total, offset + INSERT_CHUNK))]
+            with db._writer() as conn:
+                conn.executemany(sql, batch)
+        counts[table] = total
+
+    with db._writer() as conn:
+        conn.execute('ANALYZE')
+    return counts
+
+
+def _task_row(rng: random.Random, words, timestamp) -> tuple:
+    status = rng.choices(['pending', 'processing', 'completed', 'failed'], [20, 5, 70, 5])[0]
+    result = words(20) if status in ('completed', 'failed') else None
+    created = timestamp()
+    return (rng.choice(TASK_TYPES), words(12), rng.randint(1, 5), status, result, created, created)
+
+
+def capture_statements(db: NexusDatabase) -> List[str]:
+    """Record every SQL statement the database runs from now on (single connection mode)"""
+    statements: List[str] = []
+    with db._writer() as conn:
+        conn.set_trace_callback(statements.append)
+    return statements
+
+
+def query_plans(db: NexusDatabase, statements: List[str]) -> List[Dict[str, Any]]:
+    """EXPLAIN QUERY PLAN for each distinct data statement, in first-seen order"""
+    plans, seen = [], set()
+    with db._writer() as conn:
+        conn.set_trace_callback(None)
+        for sql in statements:
+            normalized = _statement_shape(sql)
+            verb = normalized.split(' ', 1)[0].upper()
+            if verb not in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH') or normalized in seen:
+                continue
+            seen.add(normalized)
+            try:
+                plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}')]
+            except sqlite3.Error as e:
+                plan = [f'unavailable: {e}']
+            plans.append({'sql': normalized, 'plan': plan, 'full_scan': any(map(_is_full_scan, plan))})
+    return plans
+
+
+def _statement_shape(sql: str) -> str:
+    """Statement text with bound values replaced by ?, so reports from different runs line up"""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'(?<![\w.])-?\d+(?:\.\d+)?(?:e-?\d+)?', '?', sql)
+    return ' '.join(sql.split())
+
+
+def _is_full_scan(step: str) -> bool:
+    """A plan step that reads a whole table rather than an index range"""
+    return (step.startswith('SCAN') and 'USING' not in step
+            and 'VIRTUAL TABLE' not in step and 'CONSTANT ROW' not in step)
+
+
+def run_case(db: NexusDatabase, name: str, call: Callable, repeat: int) -> Dict[str, Any]:
+    """Time one method call `repeat` times; the first call is reported separately (cold caches, compaction)"""
+    statements = capture_statements(db)
+    timings = []
+    for _ in range(1 if name in RUN_ONCE else repeat):
+        start = time.perf_counter()
+        call(db)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'runs': len(timings),
+        'first_ms': timings[0],
+        'median_ms': statistics.median(timings[1:] or timings),
+        'min_ms': min(timings),
+        'max_ms': max(timings),
+        'queries': query_plans(db, statements),
+    }
+
+
+def run_size(size: int, repeat: int, seed: int) -> Dict[str, Any]:
+    """Generate one dataset and run every benchmark case against it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = NexusDatabase(str(Path(tmp) / 'bench.db'), pool_mode='single')
+        start = time.perf_counter()
+        rows = generate_dataset(db, size, seed)
+        generate_seconds = time.perf_counter() - start
+
+        methods = {}
+        for name, call in benchmark_cases(size):
+            methods[name] = run_case(db, name, call, repeat)
+            print(f"  {name:<30} median {methods[name]['median_ms']:>10.3f} ms"
+                  f"   first {methods[name]['first_ms']:>10.3f} ms")
+
+        db_bytes = db.db_path.stat().st_size
+        db.close()
+
+    return {'rows': rows, 'generate_seconds': generate_seconds, 'db_bytes': db_bytes, 'methods': methods}
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            min_ms: float = 0.5) -> List[str]:
+    """Methods whose median got slower than threshold x baseline (and by more than min_ms),
+    or whose plan gained a full scan"""
+    regressions = []
+    for size, result in report['sizes'].items():
+        old_result = baseline.get('sizes', {}).get(size)
+        if not old_result:
+            continue
+        for name, method in result['methods'].items():
+            old = old_result['methods'].get(name)
+            if not old:
+                continue
+            slower = method['median_ms'] - old['median_ms']
+            if method['median_ms'] > old['median_ms'] * threshold and slower > min_ms:
+                regressions.append(f"{size} {name}: {old['median_ms']:.3f} ms -> {method['median_ms']:.3f} ms")
+            old_scans = {q['sql'] for q in old['queries'] if q['full_scan']}
+            for query in method['queries']:
+                if query['full_scan'] and query['sql'] not in old_scans:
+                    regressions.append(f"{size} {name}: new full scan in {query['sql'][:80]}")
+    return regressions
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000',
+                        help='comma-separated knowledge row counts')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='db_query_benchmark.json')
+    parser.add_argument('--baseline', help='earlier report to compare against')
+    parser.add_argument('--threshold', type=float, default=1.5,
+                        help='slowdown factor reported as a regression')
+    parser.add_argument('--min-ms', type=float, default=0.5,
+                        help='ignore slowdowns smaller than this (timer noise)')
+    args = parser.parse_args()
+
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'sizes': {}
+    }
+    for size in (int(s) for s in args.sizes.split(',')):
+        print(f"Dataset size {size}")
+        report['sizes'][str(size)] = run_size(size, args.repeat, args.seed)
+
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Report written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()),
+                              args.threshold, args.min_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+DATABASE WRITE BENCHMARK
+Measures single-row insert throughput of NexusDatabase with and without
+write-behind batching, for each durability level
+
+Usage: python benchmarks/db_write_benchmark.py [--rows 5000] [--threads 4]
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.manager import NexusDatabase
+
+CONFIGURATIONS = [
+    ('direct', {}),
+    ('write-behind/batch', {'write_behind': True, 'write_durability': 'batch'}),
+    ('write-behind/async', {'write_behind': True, 'write_durability': 'async'}),
+]
+
+
+def run_configuration(options: dict, rows: int, threads: int) -> dict:
+    """Insert `rows` metric/conversation rows from several threads and time it until durable"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = NexusDatabase(str(Path(tmp) / 'bench.db'), pool_mode='thread', **options)
+        per_thread = rows // threads
+
+        def worker(worker_id: int):
+            for i in range(per_thread):
+                if i % 2:
+                    db.save_conversation(f"query {worker_id}-{i}", "response", 0.1)
+                else:
+                    db.log_agent_metric(f"agent_{worker_id}", 'generate', 0.25, tokens_used=120)
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        db.flush_writes()
+        elapsed = time.perf_counter() - start
+
+        commits = db.write_buffer.get_stats()['batches'] if db.write_buffer else per_thread * threads
+        db.close()
+
+    return {'inserts_per_sec': per_thread * threads / elapsed, 'commits': commits}
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'configuration':<20} {'inserts/sec':>12} {'commits':>8}")
+    for name, options in CONFIGURATIONS:
+        result = run_configuration(options, args.rows, args.threads)
+        print(f"{name:<20} {result['inserts_per_sec']:>12.0f} {result['commits']:>8}")
+
+
+if __name__ == "__main__":
+    main()
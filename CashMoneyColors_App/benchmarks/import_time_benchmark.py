@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+IMPORT TIME BENCHMARK
+Measures how long each entry point that pulls in the database layer takes to
+import now that the global NexusDatabase is created lazily, and what the old
+import-time construction (first get_database() call) would add on top
+
+Usage: python benchmarks/import_time_benchmark.py [--repeat 5]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+# Modules that import db.manager at module level
+ENTRY_POINTS = ['db.manager', 'main', 'benchmarks.db_query_benchmark',
+                'benchmarks.db_write_benchmark', 'benchmarks.db_pool_benchmark']
+
+PROBE = '''
+import json, sys, time
+from pathlib import Path
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter() - start
+created_on_import = Path('data/nexus.db').exists()
+import db.manager
+start = time.perf_counter()
+db.manager.get_database()
+construct = time.perf_counter() - start
+print(json.dumps({{'import': imported, 'construct': construct, 'created_on_import': created_on_import}}))
+'''
+
+
+def measure(module: str, fresh_database: bool) -> dict:
+    """Import `module` in a clean interpreter; returns seconds spent importing and constructing"""
+    with tempfile.TemporaryDirectory() as tmp:
+        code = PROBE.format(root=str(project_root), module=module)
+        if not fresh_database:
+            # Let the schema exist already so construction only pays the user_version check
+            subprocess.run([sys.executable, '-c', code], cwd=tmp, capture_output=True, check=True)
+        output = subprocess.run([sys.executable, '-c', code], cwd=tmp,
+                                capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'entry point':<34} {'import ms':>10} {'+new db ms':>11} {'+existing db ms':>16} {'db on import':>13}")
+    for module in ENTRY_POINTS:
+        try:
+            fresh = [measure(module, True) for _ in range(args.repeat)]
+            existing = [measure(module, False) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as e:
+            print(f"{module:<34} failed: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            continue
+
+        import_ms = statistics.median(r['import'] for r in fresh) * 1000
+        fresh_ms = statistics.median(r['construct'] for r in fresh) * 1000
+        existing_ms = statistics.median(r['construct'] for r in existing) * 1000
+        created = any(r['created_on_import'] for r in fresh)
+        print(f"{module:<34} {import_ms:>10.1f} {fresh_ms:>11.1f} {existing_ms:>16.1f} {str(created):>13}")
+
+    print("\nThe '+db' columns are what importing cost on top before the instance became lazy.")
+
+
+if __name__ == "__main__":
+    main()
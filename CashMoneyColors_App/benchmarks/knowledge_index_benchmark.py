@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+KNOWLEDGE INDEX BENCHMARK
+Builds the in-process BM25 vector index over synthetic knowledge entries and
+measures build time, on-disk size and top-k query latency, optionally next to
+an FTS5 bm25 query over the same documents
+
+Usage: python benchmarks/knowledge_index_benchmark.py [--sizes 100000,1000000] [--queries 200] [--fts]
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.vector_index import KnowledgeVectorIndex, VECTOR_INDEX_AVAILABLE
+
+VOCABULARY_SIZE = 50000
+QUERY_WORDS, RESPONSE_WORDS = 6, 40
+
+
+def synthetic_documents(size: int, seed: int = 42):
+    """(id, query, response, category) rows with Zipf-distributed words"""
+    rng = random.Random(seed)
+    cum_weights, total = [], 0.0
+    for rank in range(1, VOCABULARY_SIZE + 1):
+        total += 1 / rank
+        cum_weights.append(total)
+    vocabulary = [f"w{i}" for i in range(VOCABULARY_SIZE)]
+
+    for knowledge_id in range(1, size + 1):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=QUERY_WORDS + RESPONSE_WORDS)
+        yield (knowledge_id, ' '.join(words[:QUERY_WORDS]), ' '.join(words[QUERY_WORDS:]),
+               f"category{knowledge_id % 8}")
+
+
+def sample_queries(count: int, seed: int = 7):
+    """Two- and three-word queries drawn from the mid-frequency vocabulary"""
+    rng = random.Random(seed)
+    return [' '.join(f"w{rng.randint(10, 5000)}" for _ in range(rng.choice((2, 3)))) for _ in range(count)]
+
+
+def latency(search, queries):
+    timings = []
+    for text in queries:
+        start = time.perf_counter()
+        search(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def run_size(size: int, queries, with_fts: bool) -> dict:
+    """Build both indexes for one size and time top-5 queries"""
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        index = KnowledgeVectorIndex(Path(tmp) / 'vectors')
+        start = time.perf_counter()
+        index.build(synthetic_documents(size))
+        result['build_s'] = time.perf_counter() - start
+        result['disk_mb'] = sum(f.stat().st_size for f in (Path(tmp) / 'vectors').rglob('*') if f.is_file()) / 2**20
+
+        # Reopen memory-mapped, as the application does after a restart
+        index = KnowledgeVectorIndex(Path(tmp) / 'vectors')
+        index.load()
+        result['vector_p50_ms'], result['vector_p95_ms'] = latency(partial(index.search, k=5), queries)
+
+        # Incremental adds land in the delta segment and are searched alongside the base
+        for knowledge_id, query, response, category in synthetic_documents(1000, seed=size):
+            index.add(size + knowledge_id, query, response, category)
+        result['delta_p50_ms'], _ = latency(partial(index.search, k=5), queries)
+
+        if with_fts:
+            conn = sqlite3.connect(str(Path(tmp) / 'fts.db'))
+            conn.execute('CREATE VIRTUAL TABLE docs USING fts5(query, response)')
+            conn.executemany('INSERT INTO docs (rowid, query, response) VALUES (?, ?, ?)',
+                             (row[:3] for row in synthetic_documents(size)))
+            conn.commit()
+
+            def fts_search(text):
+                match = ' OR '.join(f'"{term}"' for term in text.split())
+                return conn.execute('SELECT rowid FROM docs WHERE docs MATCH ? '
+                                    'ORDER BY bm25(docs, 2.0, 1.0) LIMIT 5', (match,)).fetchall()
+
+            result['fts_p50_ms'], result['fts_p95_ms'] = latency(fts_search, queries)
+            conn.close()
+        del index
+    return result
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--fts', action='store_true', help='also time FTS5 bm25 on the same documents')
+    args = parser.parse_args()
+
+    if not VECTOR_INDEX_AVAILABLE:
+        sys.exit("NumPy is required for the knowledge vector index")
+
+    queries = sample_queries(args.queries)
+    print(f"{'entries':>9} {'build s':>8} {'disk MB':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'+delta p50':>11} {'fts p50':>8} {'fts p95':>8}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        r = run_size(size, queries, args.fts)
+        fts = f"{r['fts_p50_ms']:>8.2f} {r['fts_p95_ms']:>8.2f}" if args.fts else f"{'-':>8} {'-':>8}"
+        print(f"{size:>9} {r['build_s']:>8.1f} {r['disk_mb']:>8.1f} {r['vector_p50_ms']:>8.2f} "
+              f"{r['vector_p95_ms']:>8.2f} {r['delta_p50_ms']:>11.2f} {fts}")
+
+
+if __name__ == "__main__":
+    main()
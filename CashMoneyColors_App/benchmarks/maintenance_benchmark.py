@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+MAINTENANCE BENCHMARK
+Builds a fragmented database (bulk load, then retention-style deletes of
+the oldest rows), then for each tuning profile reports file size, freelist
+ratio and probe query latency before and after one maintenance pass
+
+Usage: python benchmarks/maintenance_benchmark.py [--tasks 50000] [--delete 0.6] [--profiles default balanced throughput]
+"""
+
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.maintenance import TUNING_PROFILES
+from db.manager import NexusDatabase
+
+
+def build(db_path: Path, tasks: int, delete: float):
+    """Load tasks, knowledge and conversations, then delete the oldest share of each"""
+    with NexusDatabase(str(db_path), pool_mode='thread') as db:
+        db.create_tasks_bulk(('content_creation', f"Campaign item {i}: " + "write a post about the offer " * 20,
+                              1 + i % 5) for i in range(tasks))
+        with db._writer() as conn:
+            conn.executemany(
+                'INSERT INTO knowledge (query, response, category, confidence) VALUES (?, ?, ?, ?)',
+                ((f"pricing question {i}", "Tiered pricing answer " * 40, 'sales', 0.9)
+                 for i in range(tasks // 5)))
+            conn.executemany(
+                'INSERT INTO conversations (user_query, ai_response, response_time) VALUES (?, ?, ?)',
+                ((f"question {i}", "answer " * 100, 0.5) for i in range(tasks // 5)))
+            for table in ('tasks', 'knowledge', 'conversations'):
+                conn.execute(f'DELETE FROM {table} WHERE id <= (SELECT MAX(id) * ? FROM {table})', (delete,))
+        with db._writer() as conn:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+def mean_ms(latency: dict) -> float:
+    """Mean of the probe queries' median latencies"""
+    return statistics.mean(latency.values())
+
+
+def run(source: Path, profile: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / source.name
+        shutil.copy(source, db_path)
+        with NexusDatabase(str(db_path), pool_mode='thread', tuning_profile=profile) as db:
+            report = db.run_maintenance(force=True)
+    return {
+        'before_mb': report['before']['file_bytes'] / 2**20,
+        'after_mb': report['after']['file_bytes'] / 2**20,
+        'freelist_before': report['before']['freelist_ratio'],
+        'freelist_after': report['after']['freelist_ratio'],
+        'latency_before': mean_ms(report['latency_before_ms']),
+        'latency_after': mean_ms(report['latency_after_ms']),
+        'queries_after': report['latency_after_ms'],
+        'analyzed': report['analyzed'],
+        'seconds': report['seconds'],
+    }
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=50000)
+    parser.add_argument('--delete', type=float, default=0.6, help='share of the oldest rows deleted')
+    parser.add_argument('--profiles', nargs='+', default=list(TUNING_PROFILES), choices=list(TUNING_PROFILES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'fragmented.db'
+        build(source, args.tasks, args.delete)
+
+        print(f"{'profile':<11} {'MB before':>9} {'MB after':>9} {'free before':>11} {'free after':>10} "
+              f"{'ms before':>9} {'ms after':>9} {'pass s':>7}")
+        results = {}
+        for profile in args.profiles:
+            r = results[profile] = run(source, profile)
+            print(f"{profile:<11} {r['before_mb']:>9.1f} {r['after_mb']:>9.1f} {r['freelist_before']:>11.1%} "
+                  f"{r['freelist_after']:>10.1%} {r['latency_before']:>9.3f} {r['latency_after']:>9.3f} "
+                  f"{r['seconds']:>7.2f}")
+
+    print("\nProbe query p50 ms after maintenance:")
+    names = list(next(iter(results.values()))['queries_after'])
+    print(f"{'profile':<11} " + ' '.join(f"{name:>20}" for name in names))
+    for profile, r in results.items():
+        print(f"{profile:<11} " + ' '.join(f"{r['queries_after'][name]:>20.3f}" for name in names))
+
+
+if __name__ == "__main__":
+    main()
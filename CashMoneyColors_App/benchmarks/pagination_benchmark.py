@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+PAGINATION BENCHMARK
+Fetches one page of conversations at increasing depths with LIMIT/OFFSET and
+with a keyset cursor, then exports the whole table as NDJSON and reports the
+export's throughput and tracemalloc peak memory
+
+Usage: python benchmarks/pagination_benchmark.py [--rows 200000] [--page 100]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.manager import NexusDatabase
+from db.rows import encode_cursor, ndjson_lines
+
+
+def load(db: NexusDatabase, rows: int):
+    with db._writer() as conn:
+        conn.executemany(
+            'INSERT INTO conversations (user_query, ai_response, response_time) VALUES (?, ?, ?)',
+            ((f"question {i} about pricing", "answer " * 60, 0.4) for i in range(rows)))
+
+
+def offset_page(db: NexusDatabase, depth: int, page: int) -> list:
+    """The OFFSET query a page-number API would run"""
+    with db._reader() as conn:
+        return conn.execute('''
+            SELECT id, user_query, ai_response, response_time, satisfaction_rating, created_at
+            FROM conversations ORDER BY id DESC LIMIT ? OFFSET ?
+        ''', (page, depth)).fetchall()
+
+
+def timed(fn, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--page', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = NexusDatabase(str(Path(tmp) / 'bench.db'), compact_rows=True)
+        load(db, args.rows)
+
+        print(f"{'depth':>9} {'OFFSET ms':>10} {'cursor ms':>10}")
+        for depth in (0, args.rows // 100, args.rows // 10, args.rows // 2, args.rows - args.page):
+            # The cursor a client holds after reading `depth` rows (ids count down from args.rows)
+            cursor = encode_cursor((args.rows - depth + 1,))
+            offset_ms = timed(lambda: offset_page(db, depth, args.page))
+            cursor_ms = timed(lambda: list(db.iter_conversation_history(cursor=cursor, limit=args.page)))
+            print(f"{depth:>9} {offset_ms:>10.3f} {cursor_ms:>10.3f}")
+
+        start = time.perf_counter()
+        size = sum(len(line) for line in ndjson_lines(db.iter_conversation_history()))
+        elapsed = time.perf_counter() - start
+
+        # Traced separately: tracemalloc slows allocation-heavy code several times over
+        tracemalloc.start()
+        for _ in ndjson_lines(db.iter_conversation_history()):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"\nNDJSON export: {args.rows} rows, {size / 2**20:.1f} MB in {elapsed:.2f}s "
+              f"({args.rows / elapsed:,.0f} rows/s), peak traced memory {peak / 2**20:.2f} MB")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+RATE LIMITER BENCHMARK
+Times a budget check on the previous list-window limiter and on the token
+bucket with a full minute of calls recorded, then drives a simulated
+provider that returns 429s above its quota from several threads, with the
+limiter set to the real quota and to one 50% too high
+
+Usage: python benchmarks/rate_limiter_benchmark.py [--threads 8] [--seconds 5] [--quota 1200]
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.helpers import RateLimiter, TokenBucket, configure_rate_limiter, rate_limited_call
+
+
+class ListWindowLimiter:
+    """The limiter RateLimiter used to be: a list of call times rebuilt on every check"""
+
+    def __init__(self, calls_per_minute: int):
+        self.calls_per_minute = calls_per_minute
+        self.calls = []
+
+    def can_make_call(self) -> bool:
+        now = time.time()
+        self.calls = [call_time for call_time in self.calls if now - call_time < 60]
+        return len(self.calls) < self.calls_per_minute
+
+
+class RateLimitError(Exception):
+    def __init__(self):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={})
+
+
+class SimulatedProvider:
+    """Accepts `quota` requests per minute (bursts up to 1s of quota), 429 above that"""
+
+    def __init__(self, quota: int):
+        self.bucket = TokenBucket(quota / 60, quota / 60)
+        self.accepted = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def create(self, **request):
+        with self._lock:
+            if self.bucket.available() < 1:
+                self.rejected += 1
+                raise RateLimitError()
+            self.bucket.reserve(1)
+            self.accepted += 1
+        time.sleep(0.005)
+        return SimpleNamespace(usage=SimpleNamespace(total_tokens=50))
+
+
+def check_cost(limiter_check, repeat: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        limiter_check()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def drive(threads: int, seconds: float, quota: int, configured: int) -> dict:
+    provider = SimulatedProvider(quota)
+    limiter = configure_rate_limiter('simulated', requests_per_minute=configured)
+    # Start from an empty bucket so the run measures the sustained rate, not the first burst
+    limiter.requests.drain()
+    deadline = time.monotonic() + seconds
+    failures = []
+
+    def worker():
+        while time.monotonic() < deadline:
+            try:
+                rate_limited_call('simulated', provider.create, max_retries=5,
+                                  messages=[{'role': 'user', 'content': "ping"}], max_tokens=10)
+            except RateLimitError:
+                failures.append(1)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    stats = limiter.get_stats()
+    return {'per_minute': provider.accepted / seconds * 60, 'rejected': provider.rejected,
+            'failed': len(failures), 'scale': limiter.scale, 'waits': stats['wait_histogram']}
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--quota', type=int, default=1200, help='simulated provider quota (requests/min)')
+    args = parser.parse_args()
+
+    calls_per_minute = 10000
+    old = ListWindowLimiter(calls_per_minute)
+    old.calls = [time.time() - i * 60 / calls_per_minute for i in range(calls_per_minute)]
+    new = RateLimiter(calls_per_minute)
+    for _ in range(calls_per_minute):
+        new.record_call()
+    print(f"budget check with {calls_per_minute} calls in the window: "
+          f"list {check_cost(old.can_make_call):.1f} us, token bucket {check_cost(new.can_make_call):.2f} us\n")
+
+    print(f"{'limiter setting':<18} {'accepted/min':>12} {'429s':>6} {'failed':>6} {'final scale':>11}")
+    for label, configured in (('real quota', args.quota), ('quota +50%', int(args.quota * 1.5))):
+        r = drive(args.threads, args.seconds, args.quota, configured)
+        print(f"{label:<18} {r['per_minute']:>12.0f} {r['rejected']:>6} {r['failed']:>6} {r['scale']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+SINGLE FLIGHT BENCHMARK
+Simulates broadcast tasks: each round, every agent thread sends the same
+new prompt at the same moment. Compares provider calls and round latency
+with per-request calls against coalesced calls through the response cache
+
+Usage: python benchmarks/single_flight_benchmark.py [--agents 8] [--rounds 20] [--latency 0.1]
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ai.response_cache import ResponseCache
+
+
+def run(agents: int, rounds: int, latency: float, coalesce: bool) -> dict:
+    cache = ResponseCache()
+    calls = 0
+    calls_lock = threading.Lock()
+    barrier = threading.Barrier(agents)
+
+    def provider(prompt: str) -> str:
+        nonlocal calls
+        with calls_lock:
+            calls += 1
+        time.sleep(latency)
+        return f"Plan for {prompt}"
+
+    def agent():
+        for i in range(rounds):
+            prompt = f"Broadcast task {i}: outline the launch campaign"
+            barrier.wait()
+            if coalesce:
+                cache.fetch('grok', 'grok-4', prompt, {'temperature': 0.7}, lambda: provider(prompt))
+            else:
+                provider(prompt)
+
+    threads = [threading.Thread(target=agent) for _ in range(agents)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {'calls': calls, 'requests': agents * rounds, 'round_ms': elapsed / rounds * 1000,
+            'coalesced': cache.get_stats()['single_flight']['coalesced']}
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--agents', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.1, help='simulated provider round-trip in seconds')
+    args = parser.parse_args()
+
+    print(f"{'mode':<12} {'requests':>8} {'provider calls':>14} {'coalesced':>9} {'ms/round':>9}")
+    for name, coalesce in (('direct', False), ('coalesced', True)):
+        r = run(args.agents, args.rounds, args.latency, coalesce)
+        print(f"{name:<12} {r['requests']:>8} {r['calls']:>14} {r['coalesced']:>9} {r['round_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+TASK BULK BENCHMARK
+Compares task submission throughput of a create_task loop (one commit per
+task) with create_tasks_bulk and the NDJSON import path (one transaction)
+
+Usage: python benchmarks/task_bulk_benchmark.py [--tasks 10000] [--pool-mode single]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.manager import NexusDatabase
+
+
+def campaign(tasks: int):
+    """Content and analysis tasks as a campaign seeding run would submit them"""
+    for i in range(tasks):
+        task_type = 'content_creation' if i % 3 else 'data_analysis'
+        yield {'type': task_type, 'content': f"Campaign item {i}: write a post about offer {i % 50}",
+               'priority': 1 + i % 5}
+
+
+def run(method: str, tasks: int, pool_mode: str) -> float:
+    """Submit `tasks` tasks with one method; returns tasks per second"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = NexusDatabase(str(Path(tmp) / 'bench.db'), pool_mode=pool_mode)
+        source = Path(tmp) / 'tasks.ndjson'
+        if method == 'ndjson':
+            with open(source, 'w', encoding='utf-8') as out:
+                for task in campaign(tasks):
+                    out.write(json.dumps(task) + '\n')
+
+        start = time.perf_counter()
+        if method == 'loop':
+            for task in campaign(tasks):
+                db.create_task(task['type'], task['content'], task['priority'])
+        elif method == 'bulk':
+            ids = db.create_tasks_bulk(campaign(tasks))
+        else:
+            ids = db.import_tasks_ndjson(source)
+        elapsed = time.perf_counter() - start
+
+        if method != 'loop' and len(ids) != tasks:
+            raise RuntimeError(f"{method} created {len(ids)} of {tasks} tasks")
+        db.close()
+    return tasks / elapsed
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--pool-mode', default='single', choices=['single', 'thread', 'pool'])
+    args = parser.parse_args()
+
+    print(f"{'method':<18} {'tasks/sec':>12} {'speedup':>8}")
+    baseline = None
+    for method, label in (('loop', 'create_task loop'), ('bulk', 'create_tasks_bulk'), ('ndjson', 'NDJSON import')):
+        rate = run(method, args.tasks, args.pool_mode)
+        baseline = baseline or rate
+        print(f"{label:<18} {rate:>12.0f} {rate / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
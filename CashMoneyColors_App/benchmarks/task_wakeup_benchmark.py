@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+TASK WAKEUP BENCHMARK
+Queues tasks at random intervals while one agent-style consumer claims them,
+either sleep-polling or blocking on the task notifier (in-process, and through
+the doorbell from a second database instance as another process would), and
+reports queue-to-start latency and the claim queries the consumer ran
+
+Usage: python benchmarks/task_wakeup_benchmark.py [--tasks 40] [--poll 2.0] [--gap 0.1]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.manager import NexusDatabase
+
+
+def consume(db: NexusDatabase, mode: str, poll: float, expected: int, started: dict, stop: threading.Event) -> int:
+    """Claim tasks until `expected` have started; returns the number of claim queries"""
+    claims = 0
+    while len(started) < expected and not stop.is_set():
+        since = db.task_notifier.sequence
+        tasks = db.claim_tasks('bench', ['analysis'], n=5)
+        claims += 1
+        now = time.perf_counter()
+        for task in tasks:
+            started[int(task['content'])] = now
+        if tasks:
+            continue
+        if mode == 'polling':
+            stop.wait(poll)
+        else:
+            db.task_notifier.wait(since, poll * 100, cancelled=stop.is_set)
+    return claims
+
+
+def run(db_path: Path, mode: str, tasks: int, poll: float, gap: float) -> dict:
+    doorbell = mode == 'doorbell'
+    consumer_db = NexusDatabase(str(db_path), pool_mode='thread', task_doorbell=doorbell)
+    producer_db = (NexusDatabase(str(db_path), pool_mode='thread', task_doorbell=True)
+                   if doorbell else consumer_db)
+    queued, started, stop = {}, {}, threading.Event()
+    result = {}
+    consumer = threading.Thread(
+        target=lambda: result.update(claims=consume(consumer_db, mode, poll, tasks, started, stop)))
+    consumer.start()
+
+    rng = random.Random(7)
+    begin = time.perf_counter()
+    for i in range(tasks):
+        time.sleep(rng.uniform(0, 2 * gap))
+        queued[i] = time.perf_counter()
+        producer_db.create_task('analysis', str(i), dedupe=False)
+    consumer.join(timeout=tasks * gap + poll * 10)
+    stop.set()
+    consumer_db.task_notifier.wake()
+    consumer.join()
+    elapsed = time.perf_counter() - begin
+
+    if producer_db is not consumer_db:
+        producer_db.close()
+    consumer_db.close()
+    latency = sorted((started[i] - queued[i]) * 1000 for i in started)
+    return {
+        'started': len(started),
+        'p50': statistics.median(latency),
+        'p95': latency[int(len(latency) * 0.95) - 1],
+        'max': latency[-1],
+        'claims': result.get('claims', 0),
+        'claims_per_s': result.get('claims', 0) / elapsed,
+    }
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=40)
+    parser.add_argument('--poll', type=float, default=2.0,
+                        help='polling interval in seconds (the agents used 30-60)')
+    parser.add_argument('--gap', type=float, default=0.1, help='mean seconds between queued tasks')
+    args = parser.parse_args()
+
+    print(f"{'consumer':<10} {'started':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'claims':>7} {'claims/s':>9}")
+    for mode in ('polling', 'notifier', 'doorbell'):
+        with tempfile.TemporaryDirectory() as tmp:
+            r = run(Path(tmp) / 'bench.db', mode, args.tasks, args.poll, args.gap)
+        print(f"{mode:<10} {r['started']:>7} {r['p50']:>9.2f} {r['p95']:>9.2f} {r['max']:>9.2f} "
+              f"{r['claims']:>7} {r['claims_per_s']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+WORKFLOW BENCHMARK
+Runs multi-agent jobs (three independent branches joined by one integration
+step) on simulated agents whose LLM calls sleep for a fixed time, once with
+every step run in sequence and once as a fan-out / fan-in workflow, and
+reports makespan next to the critical path from get_workflow_status
+
+Usage: python benchmarks/workflow_benchmark.py [--jobs 3] [--scale 1.0]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.manager import NexusDatabase
+
+# Simulated LLM latency per task type (seconds, before --scale)
+LATENCY = {'analysis': 0.8, 'code_generation': 1.2, 'content_generation': 0.5, 'strategic_planning': 0.4}
+
+# Task types each simulated agent claims, as routed in AIManager / GrokAI
+AGENTS = {'claude': ['analysis'], 'deepseek': ['code_generation'],
+          'grok': ['content_generation', 'strategic_planning']}
+
+
+def job_steps(n: int) -> dict:
+    return {
+        'analysis': {'type': 'analysis', 'content': f"job {n}: analyze"},
+        'code': {'type': 'code_generation', 'content': f"job {n}: implement"},
+        'content': {'type': 'content_generation', 'content': f"job {n}: write"},
+        'integration': {'type': 'strategic_planning', 'content': f"job {n}: integrate",
+                        'after': ['analysis', 'code', 'content']},
+    }
+
+
+def run_sequential(jobs: int, scale: float) -> list:
+    """Each job's steps one after another, as collaborate_with_agents ran them"""
+    makespans = []
+    for n in range(jobs):
+        start = time.perf_counter()
+        for step in job_steps(n).values():
+            time.sleep(LATENCY[step['type']] * scale)
+        makespans.append(time.perf_counter() - start)
+    return makespans
+
+
+def run_workflows(jobs: int, scale: float) -> list:
+    """Each job as a workflow, worked on by one polling thread per agent"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = NexusDatabase(str(Path(tmp) / 'bench.db'), pool_mode='thread')
+        stop = threading.Event()
+
+        def agent(name: str, types: list):
+            while not stop.is_set():
+                tasks = db.claim_tasks(name, types, n=1)
+                if not tasks:
+                    time.sleep(0.005)
+                    continue
+                time.sleep(LATENCY[tasks[0]['type']] * scale)
+                db.update_task_status(tasks[0]['id'], 'completed', assigned_agent=name,
+                                      result=f"{name} output")
+
+        workers = [threading.Thread(target=agent, args=item, daemon=True) for item in AGENTS.items()]
+        for worker in workers:
+            worker.start()
+
+        reports = []
+        for n in range(jobs):
+            workflow_id = db.create_workflow(f"job {n}", job_steps(n))['id']
+            while db.get_workflow_status(workflow_id)['status'] != 'completed':
+                time.sleep(0.005)
+            reports.append(db.get_workflow_status(workflow_id))
+
+        stop.set()
+        for worker in workers:
+            worker.join()
+        db.close()
+    return reports
+
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=3)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier for the simulated LLM latencies')
+    args = parser.parse_args()
+
+    sequential = statistics.median(run_sequential(args.jobs, args.scale))
+    reports = run_workflows(args.jobs, args.scale)
+    makespan = statistics.median(r['elapsed_seconds'] for r in reports)
+    critical = statistics.median(r['critical_path_seconds'] for r in reports)
+    work = statistics.median(r['work_seconds'] for r in reports)
+
+    print(f"{'execution':<12} {'makespan s':>11} {'work s':>8} {'critical s':>11}")
+    print(f"{'sequential':<12} {sequential:>11.2f} {sequential:>8.2f} {'-':>11}")
+    print(f"{'workflow':<12} {makespan:>11.2f} {work:>8.2f} {critical:>11.2f}")
+    print(f"\nCritical path: {' -> '.join(reports[0]['critical_path'])}; "
+          f"speedup {sequential / makespan:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,9 @@ except ImportError as e:
 
     API_CONFIG = type('obj', (object,), {})  # Mock config
 
+from ai.response_cache import get_response_cache
+from utils.helpers import rate_limited_call
+
 class NexusChatbot:
     """Unified AI Chatbot Interface"""
 
@@ -39,6 +42,9 @@ class NexusChatbot:
 
         # Initialize AI clients (with error handling)
         self.clients = self._initialize_clients()
+        self.response_cache = get_response_cache()
+        # Past this wait rate_limited_call raises RateLimitExceeded, answered like any failed call
+        self.max_wait = getattr(API_CONFIG, 'chat_rate_limit_wait', 30)
 
         # Track AI performance
         self.ai_performance = {
@@ -146,31 +152,46 @@ class NexusChatbot:
             return "No available AI services at the moment."
 
     def _call_grok_api(self, prompt):
-        """Call Grok API"""
+        """Call Grok API (sampled at 0.7, so cached only if the response cache is opted in)"""
         try:
-            response = self.clients['grok'].chat.completions.create(
-                model="grok-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=2000
-            )
-            return response.choices[0].message.content
+            messages = [{"role": "user", "content": prompt}]
+            params = {'temperature': 0.7, 'max_tokens': 2000}
+
+            def call():
+                response = rate_limited_call(
+                    'grok',
+                    self.clients['grok'].chat.completions.create,
+                    model="grok-4",
+                    messages=messages,
+                    max_wait=self.max_wait,
+                    **params
+                )
+                return response.choices[0].message.content
+
+            return self.response_cache.fetch('grok', "grok-4", messages, params, call)
         except Exception as e:
             logging.error(f"Grok API call failed: {e}")
             return "I'm experiencing issues with my knowledge systems."
 
     def _call_claude_api(self, query, context):
-        """Call Claude API"""
+        """Call Claude API (default temperature, so cached only if the response cache is opted in)"""
         try:
             full_prompt = f"{context}\n\nUser Query: {query}\n\nProvide a detailed and helpful response."
+            messages = [{"role": "user", "content": full_prompt}]
+
+            def call():
+                response = rate_limited_call(
+                    'claude',
+                    self.clients['claude'].messages.create,
+                    model="claude-3.5-sonnet-20241022",
+                    max_tokens=2000,
+                    messages=messages,
+                    max_wait=self.max_wait
+                )
+                return response.content[0].text
 
-            response = self.clients['claude'].messages.create(
-                model="claude-3.5-sonnet-20241022",
-                max_tokens=2000,
-                messages=[{"role": "user", "content": full_prompt}]
-            )
-
-            return response.content[0].text
+            return self.response_cache.fetch('claude', "claude-3.5-sonnet-20241022", messages,
+                                             {'max_tokens': 2000}, call)
         except Exception as e:
             logging.error(f"Claude API call failed: {e}")
             return "I'm experiencing technical difficulties with analysis systems."
@@ -187,10 +208,13 @@ Please optimize this response to be more helpful, accurate, and engaging.
 Ensure it addresses the query directly and provides value.
 """
 
-            optimized = self.clients['claude'].messages.create(
+            optimized = rate_limited_call(
+                'claude',
+                self.clients['claude'].messages.create,
                 model="claude-3-haiku-20240307",  # Faster for optimization
                 max_tokens=1500,
-                messages=[{"role": "user", "content": optimization_prompt}]
+                messages=[{"role": "user", "content": optimization_prompt}],
+                max_wait=self.max_wait
             )
 
             return optimized.content[0].text
@@ -41,6 +41,13 @@ class APIConfiguration:
     log_level: str = "INFO"
     health_check_interval: int = 300
 
+    # LLM response cache: highest temperature whose responses are cached
+    # (0 = deterministic requests only; None caches every request)
+    response_cache_max_temperature: Optional[float] = 0.0
+
+    # Longest an interactive chat request waits for a rate-limit token before giving up
+    chat_rate_limit_wait: float = 30  # seconds
+
     def __post_init__(self):
         """Load configuration from environment variables"""
         self.load_from_environment()
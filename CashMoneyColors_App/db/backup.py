@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+BACKUP MODULE
+Online, throttled SQLite backups with verification and rotating generations
+"""
+
+import sqlite3
+import logging
+import statistics
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def online_backup(source_path: str, target_path: str, pages: int = 256,
+                  pause: float = 0.005) -> Dict[str, Any]:
+    """Copy a live database in steps of `pages` pages, pausing between steps
+
+    In WAL mode the copy is taken inside one read transaction on a dedicated
+    connection: it is a consistent snapshot and writers keep going while it runs.
+    In rollback-journal mode holding that lock would stall writers, so each step
+    locks on its own and SQLite restarts the copy if the source changes.
+    """
+    start = time.perf_counter()
+    steps = 0
+
+    def progress(status, remaining, total):
+        nonlocal steps
+        steps += 1
+        if remaining and pause:
+            time.sleep(pause)
+
+    source = sqlite3.connect(source_path, isolation_level=None)
+    target = sqlite3.connect(target_path)
+    try:
+        snapshot = source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        if snapshot:
+            source.execute('BEGIN')
+            source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        source.backup(target, pages=pages, progress=progress)
+        if snapshot:
+            source.execute('COMMIT')
+        page_count = target.execute('PRAGMA page_count').fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+
+    return {'duration': time.perf_counter() - start, 'steps': steps, 'pages': page_count}
+
+
+def verify_backup(path: str) -> bool:
+    """Run PRAGMA integrity_check on a backup copy"""
+    conn = sqlite3.connect(f'file:{Path(path).as_posix()}?mode=ro', uri=True)
+    try:
+        result = conn.execute('PRAGMA integrity_check').fetchall()
+        return result == [('ok',)]
+    finally:
+        conn.close()
+
+
+class BackupScheduler:
+    """Periodically backs up a NexusDatabase and keeps the newest `keep` verified generations"""
+
+    def __init__(self, db, backup_dir: str = 'backups', interval: float = 300, keep: int = 5,
+                 pages: int = 256, pause: float = 0.005, verify: bool = True):
+        self.db = db
+        self.backup_dir = Path(backup_dir)
+        self.interval = interval
+        self.keep = max(1, keep)
+        self.pages = pages
+        self.pause = pause
+        self.verify = verify
+
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.history: List[Dict[str, Any]] = []
+
+    def start(self):
+        """Start the background backup thread"""
+        if not self.running:
+            self.running = True
+            self._stop.clear()
+            self.thread = threading.Thread(target=self._run_loop, daemon=True, name='nexus-backup')
+            self.thread.start()
+            logging.info(f"Backup scheduler started (every {self.interval}s, keeping {self.keep})")
+
+    def stop(self):
+        """Stop the background backup thread"""
+        self.running = False
+        self._stop.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=5)
+
+    def _run_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_backup()
+            except Exception as e:
+                logging.error(f"Scheduled backup failed: {e}")
+
+    def run_backup(self) -> Dict[str, Any]:
+        """Take, verify and rotate one backup; returns a report including query-latency impact"""
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        final_path = self.backup_dir / f"{self.db.db_path.stem}-{stamp}.db"
+        partial_path = final_path.with_suffix('.db.partial')
+
+        baseline = [self._probe() for _ in range(20)]
+        during: List[float] = []
+        probing = threading.Event()
+        probing.set()
+
+        def probe_loop():
+            while True:
+                during.append(self._probe())
+                if not probing.is_set():
+                    break
+                time.sleep(0.002)
+
+        prober = threading.Thread(target=probe_loop, daemon=True)
+        prober.start()
+        try:
+            report = online_backup(str(self.db.db_path), str(partial_path), self.pages, self.pause)
+        finally:
+            probing.clear()
+            prober.join()
+
+        verified = verify_backup(str(partial_path)) if self.verify else None
+        if verified is False:
+            partial_path.unlink(missing_ok=True)
+            logging.error(f"Backup failed integrity check, discarded: {final_path.name}")
+        else:
+            partial_path.replace(final_path)
+            self._rotate()
+
+        report.update({
+            'path': str(final_path) if verified is not False else None,
+            'verified': verified,
+            'timestamp': time.time(),
+            'baseline_query_ms': statistics.median(baseline) * 1000,
+            'during_query_p50_ms': statistics.median(during) * 1000 if during else None,
+            'during_query_max_ms': max(during) * 1000 if during else None
+        })
+        self.history = (self.history + [report])[-50:]
+        logging.info(f"Backup {final_path.name}: {report['duration']:.2f}s, {report['pages']} pages, "
+                     f"query p50 {report['baseline_query_ms']:.2f}ms -> {report['during_query_p50_ms'] or 0:.2f}ms")
+        return report
+
+    def _probe(self) -> float:
+        """Time a small indexed query against the live database"""
+        start = time.perf_counter()
+        with self.db._reader() as conn:
+            conn.execute('SELECT id FROM tasks ORDER BY id DESC LIMIT 1').fetchone()
+        return time.perf_counter() - start
+
+    def _rotate(self):
+        """Delete generations beyond the newest `keep`"""
+        generations = sorted(self.backup_dir.glob(f"{self.db.db_path.stem}-*.db"))
+        for old in generations[:-self.keep]:
+            old.unlink(missing_ok=True)
+            logging.debug(f"Rotated out backup {old.name}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backup scheduler status and the last report"""
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'keep': self.keep,
+            'generations': len(list(self.backup_dir.glob(f"{self.db.db_path.stem}-*.db"))),
+            'last_backup': self.history[-1] if self.history else None
+        }
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+COUNTERS MODULE
+Trigger-maintained row counters backing NexusDatabase.get_system_stats
+"""
+
+import sqlite3
+from typing import Dict
+
+TASK_STATUSES = ('pending', 'processing', 'completed', 'failed')
+
+COUNTER_NAMES = (
+    'knowledge_entries',
+    'tasks_total', *(f'tasks_{status}' for status in TASK_STATUSES),
+    'conversations_total',
+    'conversations_response_time_sum', 'conversations_response_time_n',
+    'conversations_satisfaction_sum', 'conversations_satisfaction_n',
+)
+
+# Counters holding a table's row count, read instead of COUNT(*) by health checks
+TABLE_ROW_COUNTERS = {
+    'knowledge': 'knowledge_entries',
+    'tasks': 'tasks_total',
+    'conversations': 'conversations_total',
+}
+
+COUNTER_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY,
+        value REAL NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS knowledge_category_counts (
+        category TEXT PRIMARY KEY,
+        entries INTEGER NOT NULL
+    ) WITHOUT ROWID;
+
+    -- Knowledge
+    CREATE TRIGGER IF NOT EXISTS stats_knowledge_insert AFTER INSERT ON knowledge BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'knowledge_entries';
+        INSERT INTO knowledge_category_counts (category, entries)
+        SELECT new.category, 1 WHERE new.category IS NOT NULL
+        ON CONFLICT(category) DO UPDATE SET entries = entries + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_knowledge_delete AFTER DELETE ON knowledge BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'knowledge_entries';
+        UPDATE knowledge_category_counts SET entries = entries - 1 WHERE category = old.category;
+        DELETE FROM knowledge_category_counts WHERE category = old.category AND entries <= 0;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_knowledge_category AFTER UPDATE OF category ON knowledge
+    WHEN old.category IS NOT new.category BEGIN
+        UPDATE knowledge_category_counts SET entries = entries - 1 WHERE category = old.category;
+        DELETE FROM knowledge_category_counts WHERE category = old.category AND entries <= 0;
+        INSERT INTO knowledge_category_counts (category, entries)
+        SELECT new.category, 1 WHERE new.category IS NOT NULL
+        ON CONFLICT(category) DO UPDATE SET entries = entries + 1;
+    END;
+
+    -- Tasks
+    CREATE TRIGGER IF NOT EXISTS stats_tasks_insert AFTER INSERT ON tasks BEGIN
+        UPDATE stats_counters SET value = value + 1
+        WHERE name IN ('tasks_total', 'tasks_' || new.status);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_tasks_delete AFTER DELETE ON tasks BEGIN
+        UPDATE stats_counters SET value = value - 1
+        WHERE name IN ('tasks_total', 'tasks_' || old.status);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_tasks_status AFTER UPDATE OF status ON tasks
+    WHEN old.status IS NOT new.status BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'tasks_' || old.status;
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'tasks_' || new.status;
+    END;
+
+    -- Conversations
+    CREATE TRIGGER IF NOT EXISTS stats_conversations_insert AFTER INSERT ON conversations BEGIN
+        UPDATE stats_counters SET value = value + CASE name
+            WHEN 'conversations_total' THEN 1
+            WHEN 'conversations_response_time_sum' THEN COALESCE(new.response_time, 0)
+            WHEN 'conversations_response_time_n' THEN new.response_time IS NOT NULL
+            WHEN 'conversations_satisfaction_sum' THEN COALESCE(new.satisfaction_rating, 0)
+            WHEN 'conversations_satisfaction_n' THEN new.satisfaction_rating IS NOT NULL
+        END
+        WHERE name LIKE 'conversations_%';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_conversations_delete AFTER DELETE ON conversations BEGIN
+        UPDATE stats_counters SET value = value - CASE name
+            WHEN 'conversations_total' THEN 1
+            WHEN 'conversations_response_time_sum' THEN COALESCE(old.response_time, 0)
+            WHEN 'conversations_response_time_n' THEN old.response_time IS NOT NULL
+            WHEN 'conversations_satisfaction_sum' THEN COALESCE(old.satisfaction_rating, 0)
+            WHEN 'conversations_satisfaction_n' THEN old.satisfaction_rating IS NOT NULL
+        END
+        WHERE name LIKE 'conversations_%';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_conversations_update
+    AFTER UPDATE OF response_time, satisfaction_rating ON conversations BEGIN
+        UPDATE stats_counters SET value = value + CASE name
+            WHEN 'conversations_response_time_sum' THEN COALESCE(new.response_time, 0) - COALESCE(old.response_time, 0)
+            WHEN 'conversations_response_time_n' THEN (new.response_time IS NOT NULL) - (old.response_time IS NOT NULL)
+            WHEN 'conversations_satisfaction_sum' THEN COALESCE(new.satisfaction_rating, 0) - COALESCE(old.satisfaction_rating, 0)
+            WHEN 'conversations_satisfaction_n' THEN (new.satisfaction_rating IS NOT NULL) - (old.satisfaction_rating IS NOT NULL)
+            ELSE 0
+        END
+        WHERE name LIKE 'conversations_%';
+    END;
+'''
+
+
+def increment(conn: sqlite3.Connection, name: str, by: float = 1):
+    """Add to an event counter (one that is not derived from table rows)"""
+    conn.execute('''
+        INSERT INTO stats_counters (name, value) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+    ''', (name, by))
+
+
+def count_exact(conn: sqlite3.Connection) -> Dict[str, float]:
+    """Recount every counter from the base tables (full scans)"""
+    counters = dict.fromkeys(COUNTER_NAMES, 0)
+    counters['knowledge_entries'] = conn.execute('SELECT COUNT(*) FROM knowledge').fetchone()[0]
+
+    for status, count in conn.execute('SELECT status, COUNT(*) FROM tasks GROUP BY status'):
+        counters['tasks_total'] += count
+        if f'tasks_{status}' in counters:
+            counters[f'tasks_{status}'] = count
+
+    row = conn.execute('''
+        SELECT COUNT(*), TOTAL(response_time), COUNT(response_time),
+               TOTAL(satisfaction_rating), COUNT(satisfaction_rating)
+        FROM conversations
+    ''').fetchone()
+    (counters['conversations_total'], counters['conversations_response_time_sum'],
+     counters['conversations_response_time_n'], counters['conversations_satisfaction_sum'],
+     counters['conversations_satisfaction_n']) = row
+    return counters
+
+
+def reconcile(conn: sqlite3.Connection) -> Dict[str, float]:
+    """Overwrite the stored counters with an exact recount; returns the drift that was corrected"""
+    stored = read(conn)
+    exact = count_exact(conn)
+    conn.executemany('INSERT OR REPLACE INTO stats_counters (name, value) VALUES (?, ?)', exact.items())
+    conn.execute('DELETE FROM knowledge_category_counts')
+    conn.execute('''
+        INSERT INTO knowledge_category_counts (category, entries)
+        SELECT category, COUNT(*) FROM knowledge WHERE category IS NOT NULL GROUP BY category
+    ''')
+    return {name: exact[name] - stored.get(name, 0) for name in exact
+            if exact[name] != stored.get(name, 0)}
+
+
+def read(conn: sqlite3.Connection) -> Dict[str, float]:
+    """Read all stored counters"""
+    return dict(conn.execute('SELECT name, value FROM stats_counters').fetchall())
+
+
+def category_count(conn: sqlite3.Connection) -> int:
+    """Number of distinct knowledge categories"""
+    return conn.execute('SELECT COUNT(*) FROM knowledge_category_counts').fetchone()[0]
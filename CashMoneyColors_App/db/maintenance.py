@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+MAINTENANCE MODULE
+Fragmentation and planner-statistics upkeep for the Nexus database: health
+measurements, idle-window PRAGMA optimize / ANALYZE / incremental_vacuum
+passes and cache/mmap tuning profiles
+"""
+
+import logging
+import os
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from . import counters
+
+# Per-connection page cache and memory-mapped I/O settings. Each pooled
+# connection gets its own cache, so the total is cache_size times the
+# number of open connections; mmap pages are shared through the OS.
+TUNING_PROFILES: Dict[str, Dict[str, object]] = {
+    'default': {},  # SQLite defaults: 2 MB cache, no mmap
+    'balanced': {'cache_size': -16384, 'mmap_size': 64 << 20},
+    'throughput': {'cache_size': -65536, 'mmap_size': 256 << 20, 'temp_store': 'MEMORY'},
+}
+
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+
+# Representative hot-path reads, timed before and after maintenance and when comparing profiles
+PROBE_QUERIES = {
+    'pending_tasks': '''SELECT id, task_type, content, priority, created_at FROM tasks
+                        WHERE status = 'pending' ORDER BY priority DESC, created_at ASC LIMIT 10''',
+    'knowledge_like': '''SELECT id, query, category FROM knowledge WHERE query LIKE '%pric%'
+                         ORDER BY confidence DESC, created_at DESC LIMIT 5''',
+    'task_status_counts': 'SELECT status, COUNT(*) FROM tasks GROUP BY status',
+    'recent_conversations': 'SELECT id, user_query FROM conversations ORDER BY created_at DESC LIMIT 10',
+}
+
+
+def tuning_pragmas(profile: Optional[str]) -> Dict[str, object]:
+    """Connection pragmas for a tuning profile (None means SQLite defaults)"""
+    if profile is None:
+        return {}
+    if profile not in TUNING_PROFILES:
+        raise ValueError(f"Unknown tuning profile: {profile}")
+    return dict(TUNING_PROFILES[profile])
+
+
+class DatabaseMaintenance:
+    """Measures fragmentation and statistics staleness and fixes both while the database is idle
+
+    The database counts as idle when neither the database file nor its WAL
+    has been written for idle_seconds (so writes from other processes count
+    too). A pass then:
+      - runs ANALYZE on tables whose row count drifted more than stale_ratio
+        from the count recorded by the last ANALYZE (or never analyzed),
+      - runs PRAGMA optimize,
+      - with auto_vacuum=incremental, returns free pages to the OS in steps
+        of vacuum_step pages once they exceed freelist_threshold of the file;
+        databases created without auto_vacuum are converted by one full
+        VACUUM when allow_vacuum is set,
+      - truncates the WAL after vacuuming,
+      - drops minute rollup buckets older than rollup_minute_days and hour
+        buckets older than rollup_hour_days (day buckets are kept).
+    """
+
+    def __init__(self, db, interval: float = 900, idle_seconds: float = 60,
+                 freelist_threshold: float = 0.1, stale_ratio: float = 0.2, min_rows: int = 100,
+                 vacuum_step: int = 256, pause: float = 0.01, allow_vacuum: bool = True,
+                 analysis_limit: int = 0, rollup_minute_days: int = 7, rollup_hour_days: int = 90):
+        self.db = db
+        self.interval = interval
+        self.idle_seconds = idle_seconds
+        self.freelist_threshold = freelist_threshold
+        self.stale_ratio = stale_ratio
+        self.min_rows = min_rows
+        self.vacuum_step = max(1, vacuum_step)
+        self.pause = pause
+        self.allow_vacuum = allow_vacuum
+        self.analysis_limit = analysis_limit
+        self.rollup_minute_days = rollup_minute_days
+        self.rollup_hour_days = rollup_hour_days
+
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.history: List[Dict[str, Any]] = []
+
+    def start(self):
+        """Start the background maintenance thread"""
+        if not self.running:
+            self.running = True
+            self._stop.clear()
+            self.thread = threading.Thread(target=self._run_loop, daemon=True, name='nexus-maintenance')
+            self.thread.start()
+            logging.info(f"Database maintenance started (every {self.interval}s when idle {self.idle_seconds}s)")
+
+    def stop(self):
+        """Stop the background maintenance thread"""
+        self.running = False
+        self._stop.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=5)
+        self._stop.clear()
+
+    def _run_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run()
+            except Exception as e:
+                logging.error(f"Database maintenance failed: {e}")
+
+    def idle_for(self) -> float:
+        """Seconds since the database file or its WAL was last written"""
+        if str(self.db.db_path) == ':memory:':
+            return float('inf')
+        mtimes = []
+        for suffix in ('', '-wal'):
+            try:
+                mtimes.append(os.stat(f"{self.db.db_path}{suffix}").st_mtime)
+            except OSError:
+                pass
+        return time.time() - max(mtimes) if mtimes else float('inf')
+
+    def health(self) -> Dict[str, Any]:
+        """Page, freelist and file sizes plus per-table statistics staleness"""
+        with self.db._reader() as conn:
+            def pragma(name: str):
+                return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+            page_size, page_count, freelist = pragma('page_size'), pragma('page_count'), pragma('freelist_count')
+            report = {
+                'page_size': page_size,
+                'page_count': page_count,
+                'freelist_count': freelist,
+                'freelist_ratio': freelist / page_count if page_count else 0.0,
+                'auto_vacuum': AUTO_VACUUM_MODES.get(pragma('auto_vacuum'), 'unknown'),
+                'cache_size': pragma('cache_size'),
+                'mmap_size': pragma('mmap_size'),
+                'tables': self._table_stats(conn),
+            }
+
+        report['stale_tables'] = [name for name, stats in report['tables'].items() if stats['stale']]
+        if str(self.db.db_path) != ':memory:':
+            report['file_bytes'] = _file_size(self.db.db_path)
+            report['wal_bytes'] = _file_size(f"{self.db.db_path}-wal")
+        return report
+
+    def _table_stats(self, conn) -> Dict[str, Dict[str, Any]]:
+        """Current row counts next to the counts the last ANALYZE saw
+
+        Counts come from the trigger-maintained counters where a table has
+        one, otherwise from the rowid range (an upper bound once rows were
+        deleted from the middle); WITHOUT ROWID tables use the last ANALYZE
+        count and are only counted in full before their first ANALYZE.
+        """
+        tables = conn.execute('''
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+        ''').fetchall()
+        virtual = [name for name, sql in tables if sql and sql.upper().startswith('CREATE VIRTUAL')]
+
+        analyzed: Dict[str, int] = {}
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+            for table, stat in conn.execute('SELECT tbl, stat FROM sqlite_stat1'):
+                if stat:
+                    analyzed[table] = int(stat.split()[0])
+
+        counted: Dict[str, int] = {}
+        if any(name == 'stats_counters' for name, _ in tables):
+            values = dict(conn.execute('SELECT name, value FROM stats_counters').fetchall())
+            counted = {table: int(values[counter]) for table, counter in counters.TABLE_ROW_COUNTERS.items()
+                       if counter in values}
+
+        stats = {}
+        for name, sql in tables:
+            # FTS5 tables and their shadow tables are maintained by the FTS module
+            if any(name == v or name.startswith(f"{v}_") for v in virtual):
+                continue
+            seen = analyzed.get(name)
+            if name in counted:
+                rows, source = counted[name], 'counter'
+            elif 'WITHOUT ROWID' not in (sql or '').upper():
+                low, high = conn.execute(f'SELECT MIN(rowid), MAX(rowid) FROM "{name}"').fetchone()
+                rows, source = 0 if high is None else high - low + 1, 'rowid_range'
+            elif seen is not None:
+                rows, source = seen, 'sqlite_stat1'
+            else:
+                rows, source = conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0], 'count'
+            staleness = None if seen is None else abs(rows - seen) / max(seen, 1)
+            stats[name] = {
+                'rows': rows,
+                'rows_source': source,
+                'analyzed_rows': seen,
+                'staleness': staleness,
+                'stale': rows >= self.min_rows and (staleness is None or staleness > self.stale_ratio)
+            }
+        return stats
+
+    def measure_latency(self, repeat: int = 20) -> Dict[str, float]:
+        """Median milliseconds of each probe query (the first, cold run is discarded)"""
+        latency = {}
+        with self.db._reader() as conn:
+            for name, sql in PROBE_QUERIES.items():
+                timings = []
+                for _ in range(repeat + 1):
+                    start = time.perf_counter()
+                    conn.execute(sql).fetchall()
+                    timings.append(time.perf_counter() - start)
+                latency[name] = statistics.median(timings[1:]) * 1000
+        return latency
+
+    def run(self, force: bool = False) -> Dict[str, Any]:
+        """One maintenance pass; skipped unless the database is idle (or force=True)"""
+        idle = self.idle_for()
+        if not force and idle < self.idle_seconds:
+            logging.debug(f"Database maintenance skipped: last write {idle:.0f}s ago")
+            return {'skipped': True, 'idle_seconds': idle}
+
+        start = time.perf_counter()
+        before = self.health()
+        latency_before = self.measure_latency()
+        report: Dict[str, Any] = {'skipped': False, 'timestamp': time.time(), 'analyzed': [],
+                                  'vacuumed_pages': 0, 'full_vacuum': False}
+
+        self.db.flush_writes()
+        report['pruned_rollups'] = self.db.prune_rollups(self.rollup_minute_days, self.rollup_hour_days)
+        with self.db._writer() as conn:
+            if self.analysis_limit:
+                conn.execute(f'PRAGMA analysis_limit = {int(self.analysis_limit)}')
+            for table in before['stale_tables']:
+                conn.execute(f'ANALYZE "{table}"')
+                report['analyzed'].append(table)
+            conn.execute('PRAGMA optimize')
+
+        if before['freelist_ratio'] > self.freelist_threshold:
+            if before['auto_vacuum'] == 'incremental':
+                report['vacuumed_pages'] = self._incremental_vacuum()
+            elif before['auto_vacuum'] == 'none' and self.allow_vacuum:
+                report['full_vacuum'] = self._convert_to_incremental()
+            if self.db.wal and (report['vacuumed_pages'] or report['full_vacuum']):
+                with self.db._writer() as conn:
+                    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+
+        after = self.health()
+        report.update({
+            'seconds': time.perf_counter() - start,
+            'before': _summary(before),
+            'after': _summary(after),
+            'latency_before_ms': latency_before,
+            'latency_after_ms': self.measure_latency(),
+        })
+        self.history = (self.history + [report])[-50:]
+        logging.info(f"Database maintenance: analyzed {report['analyzed'] or 'nothing'}, "
+                     f"freelist {before['freelist_ratio']:.1%} -> {after['freelist_ratio']:.1%}, "
+                     f"{report['seconds']:.2f}s")
+        return report
+
+    def _incremental_vacuum(self) -> int:
+        """Release free pages in short write transactions; returns pages released"""
+        released = 0
+        while not self._stop.is_set():
+            with self.db._writer() as conn:
+                free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if not free or conn.in_transaction:
+                    break
+                # executescript steps the pragma to completion (execute() releases one page per call)
+                conn.executescript(f'PRAGMA incremental_vacuum({self.vacuum_step})')
+                released += free - conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if self.pause:
+                time.sleep(self.pause)
+        return released
+
+    def _convert_to_incremental(self) -> bool:
+        """Rebuild a database created without auto_vacuum so later passes can vacuum incrementally
+
+        VACUUM rewrites the whole file under an exclusive lock, which is why
+        it only runs in idle windows and only once per database.
+        """
+        with self.db._writer() as conn:
+            if conn.in_transaction:
+                return False
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+        logging.info(f"Database {self.db.db_path.name} rebuilt with auto_vacuum=incremental")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get maintenance status and the last pass report"""
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'idle_seconds': self.idle_seconds,
+            'last_run': next((r for r in reversed(self.history) if not r['skipped']), None)
+        }
+
+
+def _summary(health: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: health.get(key) for key in ('page_count', 'freelist_count', 'freelist_ratio',
+                                             'file_bytes', 'wal_bytes', 'stale_tables')}
+
+
+def _file_size(path) -> int:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
@@ -4,245 +4,1251 @@ DATABASE MANAGER MODULE
 Manages SQLite database operations for the autonomous AI system
 """
 
+import hashlib
+import json
+import os
+import re
 import sqlite3
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, List, Dict, Any, Optional, Sequence, Set, Union
 from pathlib import Path
 import time
 
+from .backup import online_backup
+from .maintenance import DatabaseMaintenance, tuning_pragmas
+from .notify import TaskNotifier
+from .payloads import FILE_PREFIX, PayloadStore
+from .pool import ConnectionPool
+from .query_cache import QueryCache, cached, invalidates
+from .retention import RETENTION_TABLES, RetentionEngine, RetentionPolicy
+from .rows import ConversationRow, KeysetStream, KnowledgeRow, RankedKnowledgeRow, TaskRow, row_factory
+from .vector_index import KnowledgeVectorIndex, VECTOR_INDEX_AVAILABLE
+from .write_buffer import WriteBehindBuffer
+from . import counters, rollups, workflows
+
+# Bump whenever initialize_database creates or migrates anything new, so
+# existing databases (whose PRAGMA user_version is lower) run the setup again
+SCHEMA_VERSION = 6
+
+# Tasks that still hold a queue slot; at most one of them per content hash
+ACTIVE_TASKS = "status IN ('pending', 'processing')"
+
+# Integer epoch twins of the TEXT timestamp columns, used by every time-range filter
+EPOCH_COLUMNS = {
+    'conversations': ('created',),
+    'tasks': ('created', 'updated'),
+    'revenue': ('created',),
+    'agent_metrics': ('created',),
+}
+
+
 class NexusDatabase:
-    """Advanced database for the AI Nexus system"""
+    """Advanced database for the AI Nexus system
+
+    pool_mode selects how connections are shared between agent threads:
+    'single' keeps one lock-serialized connection, 'thread' opens one
+    connection per thread and 'pool' checks connections out of a bounded
+    pool. Both pooled modes enable WAL journaling and route stats and
+    dashboard reads through a separate read-only pool.
+
+    With write_behind=True, single-row inserts (metrics, conversations,
+    knowledge, tasks, revenue) are buffered and committed in batches; those
+    methods then return 0 instead of the new row ID.
+
+    With vector_index=True (requires NumPy), knowledge retrieval is served by
+    an in-process BM25 index persisted next to the database file, falling
+    back to FTS5 and then LIKE matching when it is unavailable.
+
+    With query_cache=True, repeated knowledge, task, conversation and stats
+    reads are answered from an in-process LRU cache (entries live up to
+    cache_ttl seconds); every write method drops the cached reads of the
+    tables it touches. Writes made by other processes show up once entries
+    expire.
 
-    def __init__(self, db_path: str = 'data/nexus.db'):
+    With compress_payloads=True, knowledge responses and task results of at
+    least payload_threshold bytes are stored compressed (payload_codec 'zlib'
+    or 'lzma'), and those of at least spill_threshold bytes in compressed
+    files under <db name>_blobs next to the database. They are decompressed
+    only for the rows a read returns; full-text search sees the plain text.
+
+    With compact_rows=True, task, knowledge and conversation reads return
+    read-only named tuples (rows.TaskRow etc.) instead of dicts; they keep
+    dict-style access (row['id'], row.get(...), dict(row)). The iter_*
+    methods stream the same rows in keyset-paginated batches.
+
+    tuning_profile picks per-connection page cache and mmap sizes from
+    maintenance.TUNING_PROFILES ('balanced', 'throughput'; None keeps the
+    SQLite defaults). New databases are created with auto_vacuum=incremental
+    so run_maintenance can hand space freed by retention back to the OS.
+
+    task_notifier is rung whenever tasks are queued, re-queued or finished,
+    so agents and wait_for_task block on it instead of sleep-polling; each
+    ring names the task types that became claimable, so agents only wake
+    for tasks they handle. With
+    task_doorbell=True it also rings (and hears) the other processes that
+    opened the same database with task_doorbell=True.
+    """
+
+    def __init__(self, db_path: str = 'data/nexus.db', pool_mode: str = 'single',
+                 pool_size: int = 4, read_pool_size: int = 2,
+                 busy_timeout: float = 5.0, wal: Optional[bool] = None,
+                 write_behind: bool = False, write_batch_size: int = 500,
+                 write_flush_interval: float = 1.0, write_durability: str = 'batch',
+                 vector_index: bool = False, vector_index_path: Optional[str] = None,
+                 query_cache: bool = False, cache_size: int = 256, cache_ttl: float = 30.0,
+                 compress_payloads: bool = False, payload_codec: str = 'zlib',
+                 payload_threshold: int = 4096, spill_threshold: int = 1 << 20,
+                 compact_rows: bool = False, tuning_profile: Optional[str] = None,
+                 task_doorbell: bool = False):
         self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(exist_ok=True)
-        self.conn = None
+        in_memory = str(db_path) == ':memory:'
+        if in_memory:
+            pool_mode = 'single'
+        else:
+            self.db_path.parent.mkdir(exist_ok=True)
+
+        self.pool_mode = pool_mode
+        self.busy_timeout = busy_timeout
+        self.wal = (pool_mode != 'single') if wal is None else wal
+
+        # REPLACE conflict resolution must fire delete triggers to keep the FTS index in sync
+        pragmas = {'recursive_triggers': 'ON', 'auto_vacuum': 'INCREMENTAL', **tuning_pragmas(tuning_profile)}
+        self.tuning_profile = tuning_profile
+        self.fts_enabled = False
+        self.stats_reconcile_interval = 3600  # seconds
+        self._last_stats_reconcile = 0.0
+        self.query_cache = QueryCache(cache_size, cache_ttl) if query_cache else None
+        self.compact_rows = compact_rows
+
+        # Stored payloads are always decodable, so the setting can change between runs
+        blob_dir = None if in_memory else self.db_path.parent / f"{self.db_path.stem}_blobs"
+        self.payloads = PayloadStore(blob_dir, codec=payload_codec if compress_payloads else None,
+                                     compress_threshold=payload_threshold,
+                                     spill_threshold=spill_threshold)
+        functions = {'payload_text': self.payloads.decode}
+
+        doorbell_dir = None if in_memory or not task_doorbell else self.db_path.parent / f"{self.db_path.stem}_doorbell"
+        self.task_notifier = TaskNotifier(doorbell_dir)
+
+        self.pool = ConnectionPool(str(self.db_path), mode=pool_mode, size=pool_size,
+                                   busy_timeout=busy_timeout, wal=self.wal, pragmas=pragmas,
+                                   functions=functions)
+        if pool_mode == 'single':
+            self.read_pool = self.pool
+        else:
+            self.read_pool = ConnectionPool(str(self.db_path), mode=pool_mode, size=read_pool_size,
+                                            read_only=True, busy_timeout=busy_timeout, pragmas=pragmas,
+                                            functions=functions)
         self.initialize_database()
 
+        self.write_buffer = None
+        if write_behind:
+            self.write_buffer = WriteBehindBuffer(self.pool, max_rows=write_batch_size,
+                                                  max_delay=write_flush_interval,
+                                                  durability=write_durability,
+                                                  on_flush=self._writes_flushed)
+
+        self.vector_index = None
+        if vector_index:
+            if in_memory:
+                vector_index_path = None
+            elif vector_index_path is None:
+                vector_index_path = str(self.db_path.parent / f"{self.db_path.stem}_vectors")
+            self._open_vector_index(vector_index_path)
+
+    def _writer(self):
+        """Borrow a read-write connection (commits when the block exits)"""
+        return self.pool.connection()
+
+    def _reader(self):
+        """Borrow a connection for stats and dashboard reads"""
+        if self.pool.in_use():
+            # Stay on the writer inside a write block so callers see their own changes
+            return self.pool.connection()
+        return self.read_pool.connection()
+
+    def _insert(self, table: str, sql: str, params: tuple) -> int:
+        """Insert one row, through the write-behind buffer when enabled
+
+        Returns the new row ID, or 0 when the row was buffered.
+        """
+        if self.write_buffer and not self.pool.in_use():
+            self.write_buffer.submit(table, sql, params)
+            return 0
+
+        with self._writer() as conn:
+            return conn.execute(sql, params).lastrowid
+
+    def _rows(self, conn: sqlite3.Connection, row_type: type, sql: str, params: Sequence[Any] = (),
+              convert=None) -> sqlite3.Cursor:
+        """Cursor yielding row_type instances (compact_rows) or dicts with the same keys"""
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory(row_type, self.compact_rows, convert)
+        return cursor.execute(sql, params)
+
+    def _stream(self, row_type: type, sql: str, params: Sequence[Any], key_fields: Sequence[str],
+                bound, cursor: Optional[str], limit: Optional[int], batch_size: int,
+                convert=None, flush: Optional[str] = None) -> KeysetStream:
+        """Keyset-paginated stream over sql, which takes params, then bound(after key), then LIMIT
+
+        The key is the row's key_fields (the ORDER BY columns), so every batch
+        is an index seek no matter how deep into the result it starts. The
+        connection is returned between batches, so a slow consumer never
+        holds it (or the single-mode lock) while rows are being processed.
+        Raises ValueError for a malformed cursor.
+        """
+        if flush:
+            self._flush_pending(flush)
+
+        def fetch(after: Optional[tuple], n: int) -> Optional[List[Any]]:
+            try:
+                with self._reader() as conn:
+                    return self._rows(conn, row_type, sql, (*params, *bound(after), n), convert).fetchall()
+            except Exception as e:
+                logging.error(f"Failed to stream {row_type.__name__} rows: {e}")
+                return None
+
+        return KeysetStream(fetch, lambda row: tuple(row[field] for field in key_fields),
+                            cursor=cursor, limit=limit, batch_size=batch_size)
+
+    def _tasks_changed(self, task_types: Optional[Iterable[str]] = None):
+        """Wake task waiters once the change is committed
+
+        task_types are the types that became claimable (None: any type); an
+        empty list only wakes wait_for_task callers. Inside a caller's
+        transaction the change is not visible yet, so nothing is rung;
+        waiters pick it up on their fallback poll.
+        """
+        if not self.pool.in_use():
+            self.task_notifier.ring(task_types)
+
+    def _writes_flushed(self, tables: Set[str]):
+        """Drop cached reads of the tables a write-behind flush just wrote"""
+        if self.query_cache is not None:
+            self.query_cache.invalidate(*tables)
+
+    def _flush_pending(self, table: str):
+        """Flush buffered writes before a read that must see them"""
+        if self.write_buffer and self.write_buffer.pending(table):
+            self.write_buffer.flush()
+
+    def flush_writes(self) -> int:
+        """Commit all buffered writes now; returns the number of rows written"""
+        return self.write_buffer.flush() if self.write_buffer else 0
+
     def initialize_database(self):
-        """Initialize database with all required tables"""
-        try:
-            self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
-            self.cursor = self.conn.cursor()
-
-            # Create all tables
-            self.cursor.executescript('''
-                -- Knowledge base for AI learning
-                CREATE TABLE IF NOT EXISTS knowledge (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    query TEXT NOT NULL,
-                    response TEXT NOT NULL,
-                    category TEXT DEFAULT 'general',
-                    confidence REAL DEFAULT 1.0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(query, category)
-                );
+        """Initialize database with all required tables
 
-                -- Conversation history
-                CREATE TABLE IF NOT EXISTS conversations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_query TEXT NOT NULL,
-                    ai_response TEXT NOT NULL,
-                    response_time REAL,
-                    satisfaction_rating INTEGER CHECK(satisfaction_rating >= 1 AND satisfaction_rating <= 5),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
+        Skipped when PRAGMA user_version shows the schema is current. Otherwise
+        the setup runs under the write lock and re-checks the version first,
+        so concurrent processes opening a new database set it up only once.
+        """
+        try:
+            with self._writer() as conn:
+                current = self._schema_current(conn)
+            if not current:
+                with self.pool.connection(immediate=True) as conn:
+                    current = self._schema_current(conn)
+                    if not current:
+                        self._create_schema(conn)
+                        self._migrate_schema(conn)
+                        _execute_script(conn, rollups.ROLLUP_SCHEMA)
+                        _execute_script(conn, workflows.WORKFLOW_SCHEMA)
+                        self._create_counters(conn)
+                        self.fts_enabled = self._create_search_index(conn)
+                        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+                        logging.info(f"Nexus database initialized at {self.db_path} ({self.pool_mode} mode)")
 
-                -- Task queue for AI agents
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    task_type TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    priority INTEGER DEFAULT 1,
-                    status TEXT DEFAULT 'pending' CHECK(status IN ('pending', 'processing', 'completed', 'failed')),
-                    assigned_agent TEXT,
-                    result TEXT,
-                    error_message TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
+            if current:
+                with self._writer() as conn:
+                    self.fts_enabled = self._search_index_ready(conn)
+                self._last_stats_reconcile = time.time()
+                logging.debug(f"Nexus database schema at {self.db_path} is current (v{SCHEMA_VERSION})")
 
-                -- Revenue tracking
-                CREATE TABLE IF NOT EXISTS revenue (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    amount REAL NOT NULL,
-                    currency TEXT DEFAULT 'EUR',
-                    source TEXT NOT NULL,
-                    description TEXT,
-                    transaction_id TEXT UNIQUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
+        except Exception as e:
+            logging.error(f"Database initialization failed: {e}")
+            raise
+
+    def _schema_current(self, conn: sqlite3.Connection) -> bool:
+        """Whether the database was set up by this (or a newer) schema version"""
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version > SCHEMA_VERSION:
+            logging.warning(f"Database schema v{version} is newer than this version (v{SCHEMA_VERSION})")
+        return version >= SCHEMA_VERSION
+
+    def _search_index_ready(self, conn: sqlite3.Connection) -> bool:
+        """Whether the FTS5 knowledge index exists and can be queried"""
+        try:
+            conn.execute('SELECT rowid FROM knowledge_fts LIMIT 0').fetchall()
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        """Create all tables and indexes"""
+        _execute_script(conn, '''
+            -- Knowledge base for AI learning
+            CREATE TABLE IF NOT EXISTS knowledge (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                query TEXT NOT NULL,
+                response TEXT NOT NULL,
+                category TEXT DEFAULT 'general',
+                confidence REAL DEFAULT 1.0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(query, category)
+            );
+
+            -- Conversation history
+            CREATE TABLE IF NOT EXISTS conversations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_query TEXT NOT NULL,
+                ai_response TEXT NOT NULL,
+                response_time REAL,
+                satisfaction_rating INTEGER CHECK(satisfaction_rating >= 1 AND satisfaction_rating <= 5),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_ts INTEGER
+            );
+
+            -- Task queue for AI agents
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_type TEXT NOT NULL,
+                content TEXT NOT NULL,
+                priority INTEGER DEFAULT 1,
+                status TEXT DEFAULT 'pending' CHECK(status IN ('pending', 'processing', 'completed', 'failed')),
+                assigned_agent TEXT,
+                result TEXT,
+                error_message TEXT,
+                attempts INTEGER DEFAULT 0,
+                lease_expires_at REAL,
+                content_hash TEXT,
+                workflow_id INTEGER,
+                workflow_step TEXT,
+                waiting_on INTEGER NOT NULL DEFAULT 0,
+                started_ts REAL,
+                finished_ts REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_ts INTEGER,
+                updated_ts INTEGER
+            );
+
+            -- Revenue tracking
+            CREATE TABLE IF NOT EXISTS revenue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                amount REAL NOT NULL,
+                currency TEXT DEFAULT 'EUR',
+                source TEXT NOT NULL,
+                description TEXT,
+                transaction_id TEXT UNIQUE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_ts INTEGER
+            );
+
+            -- AI agent performance metrics
+            CREATE TABLE IF NOT EXISTS agent_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                agent_name TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                duration REAL,
+                success BOOLEAN DEFAULT TRUE,
+                tokens_used INTEGER,
+                cost REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_ts INTEGER
+            );
+
+            -- Create indexes for performance
+            CREATE INDEX IF NOT EXISTS idx_knowledge_query ON knowledge(query);
+            CREATE INDEX IF NOT EXISTS idx_knowledge_category ON knowledge(category);
+            CREATE INDEX IF NOT EXISTS idx_tasks_queue_order ON tasks(status, priority DESC, created_at, id);
+            CREATE INDEX IF NOT EXISTS idx_conversations_created ON conversations(created_at DESC);
+            CREATE INDEX IF NOT EXISTS idx_revenue_created ON revenue(created_at DESC);
+        ''')
+
+    def _migrate_schema(self, conn: sqlite3.Connection):
+        """Bring tables created by older versions up to the current column set"""
+        added_columns = {
+            'tasks': {
+                'attempts': 'INTEGER DEFAULT 0',
+                'lease_expires_at': 'REAL',
+                'content_hash': 'TEXT',
+                'workflow_id': 'INTEGER',
+                'workflow_step': 'TEXT',
+                'waiting_on': 'INTEGER NOT NULL DEFAULT 0',
+                'started_ts': 'REAL',
+                'finished_ts': 'REAL'
+            }
+        }
+        for table, prefixes in EPOCH_COLUMNS.items():
+            added_columns.setdefault(table, {}).update({f'{prefix}_ts': 'INTEGER' for prefix in prefixes})
+
+        for table, columns in added_columns.items():
+            existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+            for column, declaration in columns.items():
+                if column not in existing:
+                    conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+                    logging.info(f"Migrated {table}: added column {column}")
+
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks(status, lease_expires_at)')
+        # Superseded by idx_tasks_queue_order, which also serves the queue's ORDER BY
+        conn.execute('DROP INDEX IF EXISTS idx_tasks_status_priority')
+        self._migrate_epoch_columns(conn)
+        self._migrate_task_hashes(conn)
+
+    def _migrate_epoch_columns(self, conn: sqlite3.Connection):
+        """Backfill the *_ts epoch columns and keep them in step with their TEXT timestamps
+
+        The application's inserts fill created_ts directly; the triggers cover
+        rows written by other tools and every change to tasks.updated_at.
+        """
+        for table, prefixes in EPOCH_COLUMNS.items():
+            for prefix in prefixes:
+                filled = conn.execute(f'''
+                    UPDATE {table} SET {prefix}_ts = CAST(strftime('%s', {prefix}_at) AS INTEGER)
+                    WHERE {prefix}_ts IS NULL AND {prefix}_at IS NOT NULL
+                ''').rowcount
+                if filled > 0:
+                    logging.info(f"Migrated {table}: backfilled {filled} {prefix}_ts values")
+
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_epoch_insert AFTER INSERT ON {table}
+                WHEN new.created_ts IS NULL BEGIN
+                    UPDATE {table} SET created_ts = CAST(strftime('%s', new.created_at) AS INTEGER)
+                    WHERE id = new.id;
+                END
+            ''')
+
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS tasks_epoch_update AFTER UPDATE OF updated_at ON tasks BEGIN
+                UPDATE tasks SET updated_ts = CAST(strftime('%s', new.updated_at) AS INTEGER)
+                WHERE id = new.id;
+            END
+        ''')
+
+        _execute_script(conn, '''
+            -- Covering indexes for per-agent and per-source time ranges
+            CREATE INDEX IF NOT EXISTS idx_agent_metrics_agent_time
+                ON agent_metrics(agent_name, created_ts, duration, success, tokens_used, cost);
+            CREATE INDEX IF NOT EXISTS idx_revenue_source_time ON revenue(source, created_ts, amount);
+            -- Age-based retention of finished tasks
+            CREATE INDEX IF NOT EXISTS idx_tasks_status_updated ON tasks(status, updated_ts);
+        ''')
+
+    def _migrate_task_hashes(self, conn: sqlite3.Connection):
+        """Hash queued tasks and enforce one active task per type and content
+
+        Duplicates already in the queue keep a NULL hash (they still run, but
+        new submissions only match the oldest copy).
+        """
+        seen = {row[0] for row in conn.execute(
+            f'SELECT content_hash FROM tasks WHERE content_hash IS NOT NULL AND {ACTIVE_TASKS}')}
+        updates = []
+        for task_id, task_type, content in conn.execute(
+                f'SELECT id, task_type, content FROM tasks WHERE content_hash IS NULL AND {ACTIVE_TASKS} ORDER BY id'):
+            content_hash = _content_hash(task_type, content)
+            if content_hash not in seen:
+                seen.add(content_hash)
+                updates.append((content_hash, task_id))
+        conn.executemany('UPDATE tasks SET content_hash = ? WHERE id = ?', updates)
+        if updates:
+            logging.info(f"Migrated tasks: hashed {len(updates)} queued tasks")
+
+        conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_active_hash ON tasks(content_hash) WHERE {ACTIVE_TASKS}')
+
+    def _create_counters(self, conn: sqlite3.Connection):
+        """Create the stats counter triggers, seeding counters for new or older databases"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_counters'"
+        ).fetchone()
+        _execute_script(conn, counters.COUNTER_SCHEMA)
+
+        stored = counters.read(conn)
+        if not exists or set(counters.COUNTER_NAMES) - set(stored):
+            counters.reconcile(conn)
+            logging.info("Stats counters initialized")
+        self._last_stats_reconcile = time.time()
+
+    def _create_search_index(self, conn: sqlite3.Connection) -> bool:
+        """Create the FTS5 knowledge index and its sync triggers, backfilling existing rows
+
+        The index reads decoded responses through the knowledge_text view, so
+        compressed payloads are searchable. Indexes created by older versions
+        (content='knowledge') are replaced and rebuilt.
+        """
+        existing = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'knowledge_fts'"
+        ).fetchone()
+        current = existing is not None and 'knowledge_text' in existing[0]
 
-                -- AI agent performance metrics
-                CREATE TABLE IF NOT EXISTS agent_metrics (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    agent_name TEXT NOT NULL,
-                    operation TEXT NOT NULL,
-                    duration REAL,
-                    success BOOLEAN DEFAULT TRUE,
-                    tokens_used INTEGER,
-                    cost REAL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        try:
+            if existing and not current:
+                _execute_script(conn, '''
+                    DROP TRIGGER IF EXISTS knowledge_fts_insert;
+                    DROP TRIGGER IF EXISTS knowledge_fts_delete;
+                    DROP TRIGGER IF EXISTS knowledge_fts_update;
+                    DROP TABLE knowledge_fts;
+                ''')
+            _execute_script(conn, '''
+                CREATE VIEW IF NOT EXISTS knowledge_text AS
+                    SELECT id, query, payload_text(response) AS response FROM knowledge;
+
+                -- Full-text index over knowledge (external content, kept in sync by triggers)
+                CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(
+                    query, response,
+                    content='knowledge_text', content_rowid='id',
+                    tokenize='porter unicode61'
                 );
 
-                -- Create indexes for performance
-                CREATE INDEX IF NOT EXISTS idx_knowledge_query ON knowledge(query);
-                CREATE INDEX IF NOT EXISTS idx_knowledge_category ON knowledge(category);
-                CREATE INDEX IF NOT EXISTS idx_tasks_status_priority ON tasks(status, priority DESC);
-                CREATE INDEX IF NOT EXISTS idx_conversations_created ON conversations(created_at DESC);
-                CREATE INDEX IF NOT EXISTS idx_revenue_created ON revenue(created_at DESC);
+                CREATE TRIGGER IF NOT EXISTS knowledge_fts_insert AFTER INSERT ON knowledge BEGIN
+                    INSERT INTO knowledge_fts(rowid, query, response)
+                    VALUES (new.id, new.query, payload_text(new.response));
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS knowledge_fts_delete AFTER DELETE ON knowledge BEGIN
+                    INSERT INTO knowledge_fts(knowledge_fts, rowid, query, response)
+                    VALUES ('delete', old.id, old.query, payload_text(old.response));
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS knowledge_fts_update AFTER UPDATE OF query, response ON knowledge BEGIN
+                    INSERT INTO knowledge_fts(knowledge_fts, rowid, query, response)
+                    VALUES ('delete', old.id, old.query, payload_text(old.response));
+                    INSERT INTO knowledge_fts(rowid, query, response)
+                    VALUES (new.id, new.query, payload_text(new.response));
+                END;
             ''')
+        except sqlite3.OperationalError as e:
+            logging.warning(f"FTS5 unavailable, knowledge search falls back to LIKE: {e}")
+            return False
 
-            self.conn.commit()
-            logging.info(f"Nexus database initialized at {self.db_path}")
+        if not current:
+            # Backfill databases created before the index (or its knowledge_text source) existed
+            conn.execute("INSERT INTO knowledge_fts(knowledge_fts) VALUES ('rebuild')")
+            logging.info("Knowledge full-text index built")
+        return True
 
+    @invalidates('knowledge')
+    def rebuild_knowledge_index(self) -> bool:
+        """Rebuild the knowledge full-text (and vector) index from the knowledge table"""
+        if not self.fts_enabled and not self.vector_index:
+            return False
+        try:
+            if self.fts_enabled:
+                with self._writer() as conn:
+                    conn.execute("INSERT INTO knowledge_fts(knowledge_fts) VALUES ('rebuild')")
+            if self.vector_index:
+                self._build_vector_index()
+            return True
         except Exception as e:
-            logging.error(f"Database initialization failed: {e}")
-            raise
+            logging.error(f"Failed to rebuild knowledge index: {e}")
+            return False
+
+    def _open_vector_index(self, path: Optional[str]):
+        """Load the persisted vector index, rebuilding it when missing or out of step with the database"""
+        if not VECTOR_INDEX_AVAILABLE:
+            logging.warning("NumPy not installed, knowledge vector index disabled")
+            return
+
+        try:
+            self.vector_index = KnowledgeVectorIndex(path)
+            with self._reader() as conn:
+                max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM knowledge').fetchone()[0]
+            if not self.vector_index.load() or self.vector_index.last_id > max_id:
+                self._build_vector_index()
+            self._sync_vector_index()
+            logging.info(f"Knowledge vector index ready ({len(self.vector_index)} entries)")
+        except Exception as e:
+            logging.error(f"Knowledge vector index unavailable: {e}")
+            self.vector_index = None
+
+    def _build_vector_index(self):
+        """Index every knowledge row from scratch"""
+        start = time.time()
+        with self._reader() as conn:
+            rows = conn.execute('SELECT id, query, payload_text(response), category FROM knowledge ORDER BY id')
+            self.vector_index.build(rows)
+        logging.info(f"Knowledge vector index built in {time.time() - start:.2f}s")
+
+    def _sync_vector_index(self):
+        """Add knowledge rows written since the index was last updated (by any writer)"""
+        if not self.vector_index:
+            return
+        with self._reader() as conn:
+            rows = conn.execute(
+                'SELECT id, query, payload_text(response), category FROM knowledge WHERE id > ? ORDER BY id',
+                (self.vector_index.last_id,)).fetchall()
+        for row in rows:
+            self.vector_index.add(*row)
 
     # Knowledge Management Methods
+    @invalidates('knowledge')
     def add_knowledge(self, query: str, response: str, category: str = 'general',
-                     confidence: float = 1.0) -> int:
+                      confidence: float = 1.0) -> int:
         """Add knowledge entry to database"""
         try:
-            self.cursor.execute('''
+            knowledge_id = self._insert('knowledge', '''
                 INSERT OR REPLACE INTO knowledge
                 (query, response, category, confidence, updated_at)
                 VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (query.lower().strip(), response.strip(), category.lower(), confidence))
-
-            self.conn.commit()
-            knowledge_id = self.cursor.lastrowid
+            ''', (query.lower().strip(), self.payloads.encode(response.strip()), category.lower(), confidence))
+            if knowledge_id:
+                self._sync_vector_index()
             logging.debug(f"Added knowledge: {query[:50]}...")
             return knowledge_id
 
         except Exception as e:
             logging.error(f"Failed to add knowledge: {e}")
-            self.conn.rollback()
             return -1
 
+    @cached('knowledge')
     def get_knowledge(self, query: str, limit: int = 5, category: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Retrieve relevant knowledge from database"""
+        """Retrieve relevant knowledge from database, BM25-ranked when full-text search is available"""
+        self._flush_pending('knowledge')
+        if self.vector_index:
+            results = self._search_knowledge_vectors(query, limit, category)
+            if results is not None:
+                return results
+
+        match = _fts_match_expression(query) if self.fts_enabled else None
+        if match:
+            return self._search_knowledge_fts(match, limit, category)
+
         try:
-            if category:
-                self.cursor.execute('''
-                    SELECT id, query, response, category, confidence, created_at
-                    FROM knowledge
-                    WHERE category = ? AND query LIKE ?
-                    ORDER BY confidence DESC, created_at DESC
-                    LIMIT ?
-                ''', (category, f'%{query.lower()}%', limit))
-            else:
-                self.cursor.execute('''
+            with self._reader() as conn:
+                if category:
+                    return self._rows(conn, KnowledgeRow, '''
+                        SELECT id, query, response, category, confidence, created_at
+                        FROM knowledge
+                        WHERE category = ? AND query LIKE ?
+                        ORDER BY confidence DESC, created_at DESC
+                        LIMIT ?
+                    ''', (category, f'%{query.lower()}%', limit), self._decode_knowledge).fetchall()
+                return self._rows(conn, KnowledgeRow, '''
                     SELECT id, query, response, category, confidence, created_at
                     FROM knowledge
                     WHERE query LIKE ?
                     ORDER BY confidence DESC, created_at DESC
                     LIMIT ?
-                ''', (f'%{query.lower()}%', limit))
-
-            results = self.cursor.fetchall()
-            return [{
-                'id': row[0],
-                'query': row[1],
-                'content': row[2],
-                'category': row[3],
-                'confidence': row[4],
-                'created_at': row[5]
-            } for row in results]
+                ''', (f'%{query.lower()}%', limit), self._decode_knowledge).fetchall()
 
         except Exception as e:
             logging.error(f"Failed to retrieve knowledge: {e}")
             return []
 
+    def _search_knowledge_fts(self, match: str, limit: int, category: Optional[str]) -> List[Dict[str, Any]]:
+        """Ranked full-text lookup; matches in the query column weigh twice as much as in the response"""
+        try:
+            with self._reader() as conn:
+                return self._rows(conn, RankedKnowledgeRow, '''
+                    SELECT k.id, k.query, k.response, k.category, k.confidence, k.created_at,
+                           bm25(knowledge_fts, 2.0, 1.0) AS score
+                    FROM knowledge_fts
+                    JOIN knowledge k ON k.id = knowledge_fts.rowid
+                    WHERE knowledge_fts MATCH ? AND (? IS NULL OR k.category = ?)
+                    ORDER BY score, k.confidence DESC
+                    LIMIT ?
+                ''', (match, category, category, limit),
+                    lambda row: (*self._decode_knowledge(row[:6]), -row[6])).fetchall()
+
+        except Exception as e:
+            logging.error(f"Failed to search knowledge: {e}")
+            return []
+
+    def _search_knowledge_vectors(self, query: str, limit: int,
+                                  category: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """Top-k lookup in the vector index; rows deleted or replaced since indexing are dropped
+
+        Returns None when the index fails, so callers fall back to FTS.
+        """
+        try:
+            self._sync_vector_index()
+            hits = self.vector_index.search(query, k=limit * 2, category=category.lower() if category else None)
+            if not hits:
+                return []
+
+            scores = dict(hits)
+            placeholders = ', '.join('?' for _ in scores)
+            with self._reader() as conn:
+                rows = conn.execute(
+                    'SELECT id, query, response, category, confidence, created_at '
+                    f'FROM knowledge WHERE id IN ({placeholders})', list(scores)).fetchall()
+
+            found = {row[0]: row for row in rows}
+            stale = [knowledge_id for knowledge_id in scores if knowledge_id not in found]
+            if stale:
+                self.vector_index.remove(stale)
+
+            ranked = [found[knowledge_id] for knowledge_id, _ in hits if knowledge_id in found]
+            make = row_factory(RankedKnowledgeRow, self.compact_rows,
+                               lambda row: (*self._decode_knowledge(row), scores[row[0]]))
+            return [make(None, row) for row in ranked[:limit]]
+
+        except Exception as e:
+            logging.error(f"Vector knowledge search failed: {e}")
+            return None
+
+    def iter_knowledge(self, category: Optional[str] = None, cursor: Optional[str] = None,
+                       limit: Optional[int] = None, batch_size: int = 500) -> KeysetStream:
+        """Stream knowledge entries (optionally of one category) in ID order, from `cursor` on"""
+        return self._stream(KnowledgeRow, '''
+            SELECT id, query, response, category, confidence, created_at
+            FROM knowledge
+            WHERE (? IS NULL OR category = ?) AND id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (category, category), ('id',), lambda after: (after[0] if after else 0,),
+            cursor, limit, batch_size, self._decode_knowledge, flush='knowledge')
+
+    def iter_knowledge_search(self, query: str, category: Optional[str] = None, cursor: Optional[str] = None,
+                              limit: Optional[int] = None, batch_size: int = 100) -> KeysetStream:
+        """Stream all knowledge matching `query`, best match first, from `cursor` on
+
+        Ranked by BM25 like get_knowledge when full-text search is available,
+        otherwise LIKE matches by confidence. The vector index ranks only a
+        top-k, so it is not used here.
+        """
+        # Rows carry the negated rank (score = -bm25, confidence), so the bound negates it back
+        def bound(after: Optional[tuple]) -> tuple:
+            return _ranked_bound(after and (-after[0], after[1]))
+
+        match = _fts_match_expression(query) if self.fts_enabled else None
+        if match:
+            return self._stream(RankedKnowledgeRow, '''
+                SELECT k.id, k.query, k.response, k.category, k.confidence, k.created_at,
+                       bm25(knowledge_fts, 2.0, 1.0) AS score
+                FROM knowledge_fts
+                JOIN knowledge k ON k.id = knowledge_fts.rowid
+                WHERE knowledge_fts MATCH ? AND (? IS NULL OR k.category = ?)
+                  AND (? IS NULL OR score > ? OR (score = ? AND k.id > ?))
+                ORDER BY score, k.id
+                LIMIT ?
+            ''', (match, category, category), ('score', 'id'),
+                bound, cursor, limit, batch_size, lambda row: (*self._decode_knowledge(row[:6]), -row[6]),
+                flush='knowledge')
+
+        return self._stream(KnowledgeRow, '''
+            SELECT id, query, response, category, confidence, created_at
+            FROM knowledge
+            WHERE query LIKE ? AND (? IS NULL OR category = ?)
+              AND (? IS NULL OR -confidence > ? OR (-confidence = ? AND id > ?))
+            ORDER BY confidence DESC, id
+            LIMIT ?
+        ''', (f'%{query.lower()}%', category, category), ('confidence', 'id'),
+            bound, cursor, limit, batch_size, self._decode_knowledge, flush='knowledge')
+
+    def _decode_knowledge(self, row: tuple) -> tuple:
+        return (row[0], row[1], self.payloads.decode(row[2]), *row[3:6])
+
+    @invalidates('knowledge')
     def update_knowledge_confidence(self, knowledge_id: int, new_confidence: float):
         """Update confidence score of knowledge entry"""
         try:
-            self.cursor.execute(
-                'UPDATE knowledge SET confidence = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-                (new_confidence, knowledge_id)
-            )
-            self.conn.commit()
+            with self._writer() as conn:
+                conn.execute(
+                    'UPDATE knowledge SET confidence = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                    (new_confidence, knowledge_id)
+                )
         except Exception as e:
             logging.error(f"Failed to update knowledge confidence: {e}")
 
     # Task Management Methods
-    def create_task(self, task_type: str, content: str, priority: int = 1) -> int:
-        """Create a new task for AI agents"""
+    @invalidates('tasks')
+    def create_task(self, task_type: str, content: str, priority: int = 1, dedupe: bool = True) -> int:
+        """Create a new task for AI agents
+
+        With dedupe=True, a task with the same type and normalized content as
+        a pending or processing task is not queued again: the existing task's
+        ID is returned (wait_for_task() follows it to its result) and the
+        deduplicated_tasks counter records the saved run.
+        """
         try:
-            self.cursor.execute(
-                'INSERT INTO tasks (task_type, content, priority) VALUES (?, ?, ?)',
-                (task_type, content, priority)
-            )
-            self.conn.commit()
-            task_id = self.cursor.lastrowid
-            logging.info(f"Created task {task_id}: {task_type}")
+            content_hash = _content_hash(task_type, content) if dedupe else None
+            now = int(time.time())
+            sql = ('INSERT OR IGNORE INTO tasks (task_type, content, priority, content_hash, created_ts, updated_ts) '
+                   'VALUES (?, ?, ?, ?, ?, ?)')
+            params = (task_type, content, priority, content_hash, now, now)
+            if self.write_buffer and not self.pool.in_use():
+                # Duplicates are dropped when the batch is flushed
+                task_id = self._insert('tasks', sql, params)
+                logging.info(f"Created task (buffered): {task_type}")
+                self._tasks_changed([task_type])  # claim_tasks flushes the buffer first
+                return task_id
+
+            with self.pool.connection(immediate=True) as conn:
+                cursor = conn.execute(sql, params)
+                if cursor.rowcount:
+                    task_id = cursor.lastrowid
+                    logging.info(f"Created task {task_id}: {task_type}")
+                    created = True
+                else:
+                    task_id = conn.execute(f'SELECT id FROM tasks WHERE content_hash = ? AND {ACTIVE_TASKS}',
+                                           (content_hash,)).fetchone()[0]
+                    counters.increment(conn, 'tasks_deduplicated')
+                    created = False
+
+            if created:
+                self._tasks_changed([task_type])
+                return task_id
+            logging.info(f"Task {task_type} already queued as task {task_id}")
             return task_id
         except Exception as e:
             logging.error(f"Failed to create task: {e}")
             return -1
 
+    @invalidates('tasks')
+    def create_tasks_bulk(self, tasks: Iterable[Union[Dict[str, Any], Sequence[Any]]]) -> range:
+        """Create many tasks in one transaction; returns the range of assigned IDs
+
+        Each task is a dict with 'type' (or 'task_type'), 'content' and an
+        optional 'priority', or a (task_type, content[, priority]) tuple. The
+        iterable is consumed lazily, so generators of any length can be fed
+        in. Tasks already queued (see create_task) are skipped and not part
+        of the range. Nothing is inserted if any task is invalid (an empty
+        range is returned and the error logged).
+        """
+        try:
+            self._flush_pending('tasks')
+            now = int(time.time())
+            submitted = 0
+            task_types = set()
+
+            def rows():
+                nonlocal submitted
+                for task in tasks:
+                    submitted += 1
+                    row = _task_row(task, now)
+                    task_types.add(row[0])
+                    yield row
+
+            with self.pool.connection(immediate=True) as conn:
+                cursor = conn.executemany(
+                    'INSERT OR IGNORE INTO tasks (task_type, content, priority, content_hash, created_ts, updated_ts) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', rows())
+                count = cursor.rowcount
+                last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+                if submitted > count:
+                    counters.increment(conn, 'tasks_deduplicated', submitted - count)
+
+            # One writer inside BEGIN IMMEDIATE, and skipped rows take no ID, so the IDs are contiguous
+            ids = range(last_id - count + 1, last_id + 1) if count > 0 else range(0)
+            if ids:
+                self._tasks_changed(task_types)
+            logging.info(f"Created {len(ids)} tasks in bulk ({submitted - count} already queued)")
+            return ids
+        except Exception as e:
+            logging.error(f"Failed to create tasks in bulk: {e}")
+            return range(0)
+
+    def import_tasks_ndjson(self, source: Union[str, Path, IO[str]]) -> range:
+        """Create tasks from newline-delimited JSON (one task object per line, as for create_tasks_bulk)"""
+        def tasks(lines: Iterable[str]):
+            for number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    task = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Line {number}: invalid JSON ({e})") from e
+                if not isinstance(task, dict):
+                    raise ValueError(f"Line {number}: expected a JSON object")
+                if isinstance(task.get('content'), (dict, list)):
+                    task['content'] = json.dumps(task['content'])
+                yield task
+
+        if isinstance(source, (str, Path)):
+            with open(source, encoding='utf-8') as lines:
+                return self.create_tasks_bulk(tasks(lines))
+        return self.create_tasks_bulk(tasks(source))
+
+    @invalidates('tasks')
+    def create_workflow(self, name: str, steps: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Queue a graph of dependent tasks; returns {'id': workflow ID, 'tasks': {step: task ID}}
+
+        Each step is a dict with 'type', 'content', an optional 'priority' and
+        'after', the names of the steps it needs. Steps without 'after' can be
+        claimed at once, so independent branches fan out in parallel to the
+        agents handling their types. A step after several others is a fan-in
+        join, claimed with their results as 'inputs'. When a step fails, the
+        steps downstream of it fail too. Workflow tasks are never deduplicated.
+        """
+        try:
+            order = workflows.topological_order(steps)
+            now = time.time()
+            task_ids: Dict[str, int] = {}
+            ready_types = set()
+            with self.pool.connection(immediate=True) as conn:
+                workflow_id = conn.execute('INSERT INTO workflows (name, created_ts) VALUES (?, ?)',
+                                           (name, now)).lastrowid
+                for step in order:
+                    task_type, content, priority = _task_row(steps[step], 0)[:3]
+                    after = list(dict.fromkeys(steps[step].get('after', ())))
+                    if not after:
+                        ready_types.add(task_type)
+                    task_ids[step] = conn.execute('''
+                        INSERT INTO tasks (task_type, content, priority, workflow_id, workflow_step,
+                                           waiting_on, created_ts, updated_ts)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (task_type, content, priority, workflow_id, step, len(after), int(now), int(now))).lastrowid
+                    conn.executemany('INSERT INTO task_dependencies (task_id, depends_on) VALUES (?, ?)',
+                                     [(task_ids[step], task_ids[parent]) for parent in after])
+
+            self._tasks_changed(ready_types)
+            logging.info(f"Created workflow {workflow_id} ({name}): {len(task_ids)} tasks")
+            return {'id': workflow_id, 'tasks': task_ids}
+        except Exception as e:
+            logging.error(f"Failed to create workflow {name}: {e}")
+            return {}
+
+    def get_workflow_status(self, workflow_id: int) -> Optional[Dict[str, Any]]:
+        """Progress of a workflow with its critical path
+
+        elapsed_seconds is the wall-clock time since the workflow was queued
+        (until its last task finished); work_seconds is what running every
+        task back to back would take, critical_path_seconds the longest chain
+        of dependent tasks, which bounds how fast the workflow can finish.
+        """
+        try:
+            self._flush_pending('tasks')
+            with self._reader() as conn:
+                workflow = conn.execute('SELECT name, created_ts FROM workflows WHERE id = ?',
+                                        (workflow_id,)).fetchone()
+                if not workflow:
+                    return None
+                rows = conn.execute('''
+                    SELECT id, workflow_step, task_type, status, assigned_agent, started_ts, finished_ts,
+                           error_message
+                    FROM tasks WHERE workflow_id = ? ORDER BY id
+                ''', (workflow_id,)).fetchall()
+                edges = conn.execute('''
+                    SELECT d.task_id, d.depends_on FROM task_dependencies d
+                    JOIN tasks t ON t.id = d.task_id WHERE t.workflow_id = ?
+                ''', (workflow_id,)).fetchall()
+
+            steps = {row[0]: row[1] for row in rows}
+            depends_on: Dict[int, List[str]] = {}
+            for task_id, parent_id in edges:
+                depends_on.setdefault(task_id, []).append(steps[parent_id])
+            tasks = [{
+                'id': row[0], 'step': row[1], 'type': row[2], 'status': row[3], 'agent': row[4],
+                'started_ts': row[5], 'finished_ts': row[6], 'error': row[7],
+                'depends_on': depends_on.get(row[0], [])
+            } for row in rows]
+
+            statuses = {task['status'] for task in tasks}
+            if 'failed' in statuses:
+                status = 'failed'
+            elif statuses <= {'completed'}:
+                status = 'completed'
+            elif statuses & {'processing', 'completed'}:
+                status = 'running'
+            else:
+                status = 'pending'
+
+            now = time.time()
+            finished = [task['finished_ts'] for task in tasks if task['finished_ts']]
+            end = max(finished) if status in ('completed', 'failed') and finished else now
+            report = workflows.critical_path(tasks, now)
+            elapsed = max(0.0, end - workflow[1])
+            return {
+                'id': workflow_id,
+                'name': workflow[0],
+                'status': status,
+                'elapsed_seconds': elapsed,
+                **report,
+                'parallel_speedup': report['work_seconds'] / elapsed if elapsed else 0.0,
+                'tasks': {task['step']: task for task in tasks}
+            }
+        except Exception as e:
+            logging.error(f"Failed to get workflow {workflow_id}: {e}")
+            return None
+
+    @cached('tasks')
     def get_pending_tasks(self, limit: int = 10, task_type: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get pending tasks ordered by priority"""
         try:
-            if task_type:
-                self.cursor.execute('''
-                    SELECT id, task_type, content, priority, created_at
-                    FROM tasks
-                    WHERE status = 'pending' AND task_type = ?
-                    ORDER BY priority DESC, created_at ASC
-                    LIMIT ?
-                ''', (task_type, limit))
-            else:
-                self.cursor.execute('''
+            self._flush_pending('tasks')
+            with self._writer() as conn:
+                if task_type:
+                    return self._rows(conn, TaskRow, '''
+                        SELECT id, task_type, content, priority, created_at
+                        FROM tasks
+                        WHERE status = 'pending' AND task_type = ?
+                        ORDER BY priority DESC, created_at ASC
+                        LIMIT ?
+                    ''', (task_type, limit)).fetchall()
+                return self._rows(conn, TaskRow, '''
                     SELECT id, task_type, content, priority, created_at
                     FROM tasks
                     WHERE status = 'pending'
                     ORDER BY priority DESC, created_at ASC
                     LIMIT ?
-                ''', (limit,))
-
-            results = self.cursor.fetchall()
-            return [{
-                'id': row[0],
-                'type': row[1],
-                'content': row[2],
-                'priority': row[3],
-                'created_at': row[4]
-            } for row in results]
+                ''', (limit,)).fetchall()
 
         except Exception as e:
             logging.error(f"Failed to get pending tasks: {e}")
             return []
 
+    def iter_pending_tasks(self, task_type: Optional[str] = None, cursor: Optional[str] = None,
+                           limit: Optional[int] = None, batch_size: int = 500) -> KeysetStream:
+        """Stream pending tasks in get_pending_tasks order (priority, then age), from `cursor` on
+
+        Tasks claimed or created while the stream is open may or may not be seen.
+        """
+        return self._stream(TaskRow, '''
+            SELECT id, task_type, content, priority, created_at
+            FROM tasks
+            WHERE status = 'pending' AND (? IS NULL OR task_type = ?)
+              AND priority <= ? AND (priority < ? OR (created_at, id) > (?, ?))
+            ORDER BY priority DESC, created_at ASC, id ASC
+            LIMIT ?
+        ''', (task_type, task_type), ('priority', 'created_at', 'id'), _pending_task_bound,
+            cursor, limit, batch_size, flush='tasks')
+
+    @invalidates('tasks')
     def update_task_status(self, task_id: int, status: str,
                           assigned_agent: Optional[str] = None,
                           result: Optional[str] = None,
-                          error_message: Optional[str] = None):
-        """Update task status and related information"""
-        try:
-            self.cursor.execute('''
-                UPDATE tasks
-                SET status = ?, assigned_agent = ?, result = ?,
-                    error_message = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (status, assigned_agent, result, error_message, task_id))
-            self.conn.commit()
+                          error_message: Optional[str] = None) -> bool:
+        """Update task status and related information; returns whether the task was updated
+
+        Completing or failing a task with assigned_agent set only succeeds
+        while that agent still holds the task's lease: once the lease expired
+        and the task was re-queued (or claimed by another worker), the late
+        result is dropped and False is returned.
+
+        Re-queueing a finished task (status 'pending') while an identical
+        task is already active also returns False and leaves it unchanged:
+        the content hash admits one active task per content.
+        """
+        owned = assigned_agent is not None and status in ('completed', 'failed')
+        try:
+            with self._writer() as conn:
+                cursor = conn.execute(f'''
+                    UPDATE tasks
+                    SET status = ?, assigned_agent = ?, result = ?,
+                        error_message = ?, updated_at = CURRENT_TIMESTAMP,
+                        lease_expires_at = CASE WHEN ? = 'processing' THEN lease_expires_at END,
+                        finished_ts = CASE WHEN ? IN ('completed', 'failed') THEN ? END
+                    WHERE id = ?{" AND status = 'processing' AND assigned_agent = ?" if owned else ''}
+                ''', (status, assigned_agent, self.payloads.encode(result), error_message, status,
+                      status, time.time(), task_id, *((assigned_agent,) if owned else ())))
+                woken = self._claimable_types(conn, task_id, status) if cursor.rowcount else []
+            if not cursor.rowcount:
+                if owned:
+                    logging.warning(f"Dropped {status} result for task {task_id}: "
+                                    f"no longer held by {assigned_agent}")
+                return False
             logging.debug(f"Updated task {task_id} to status: {status}")
+            if status != 'processing':
+                # Finished tasks unblock workflow steps and wait_for_task callers
+                self._tasks_changed(woken)
+            return True
+        except sqlite3.IntegrityError as e:
+            logging.warning(f"Task {task_id} not set to {status}: an identical task is already active ({e})")
+            return False
         except Exception as e:
             logging.error(f"Failed to update task status: {e}")
+            return False
+
+    @staticmethod
+    def _claimable_types(conn: sqlite3.Connection, task_id: int, status: str) -> List[str]:
+        """Task types a status change made claimable: the task's own when re-queued, ready dependents when completed"""
+        if status == 'completed':
+            rows = conn.execute('''
+                SELECT DISTINCT t.task_type FROM task_dependencies d JOIN tasks t ON t.id = d.task_id
+                WHERE d.depends_on = ? AND t.status = 'pending' AND t.waiting_on = 0
+            ''', (task_id,))
+        else:
+            rows = conn.execute("SELECT task_type FROM tasks WHERE id = ? AND status = 'pending'", (task_id,))
+        return [row[0] for row in rows]
 
+    @invalidates('tasks')
+    def claim_tasks(self, agent: str, types: Optional[List[str]] = None, n: int = 1,
+                    lease_seconds: float = 300, max_attempts: int = 3) -> List[Dict[str, Any]]:
+        """Atomically move up to n pending tasks to 'processing' under a lease held by agent
+
+        Expired leases are re-queued first, so tasks abandoned by a crashed
+        worker become claimable again (or fail once max_attempts is reached).
+        Workflow tasks become claimable once all their dependencies completed;
+        their results are passed along as 'inputs' (step, type and result).
+        """
+        try:
+            self._flush_pending('tasks')
+            with self.pool.connection(immediate=True) as conn:
+                self._requeue_expired(conn, max_attempts)
+
+                if types:
+                    placeholders = ', '.join('?' for _ in types)
+                    rows = conn.execute(f'''
+                        SELECT id, task_type, content, priority, created_at, attempts
+                        FROM tasks
+                        WHERE status = 'pending' AND waiting_on = 0 AND task_type IN ({placeholders})
+                        ORDER BY priority DESC, created_at ASC
+                        LIMIT ?
+                    ''', (*types, n)).fetchall()
+                else:
+                    rows = conn.execute('''
+                        SELECT id, task_type, content, priority, created_at, attempts
+                        FROM tasks
+                        WHERE status = 'pending' AND waiting_on = 0
+                        ORDER BY priority DESC, created_at ASC
+                        LIMIT ?
+                    ''', (n,)).fetchall()
+
+                now = time.time()
+                lease_expires_at = now + lease_seconds
+                conn.executemany('''
+                    UPDATE tasks
+                    SET status = 'processing', assigned_agent = ?, lease_expires_at = ?, started_ts = ?,
+                        attempts = COALESCE(attempts, 0) + 1, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', [(agent, lease_expires_at, now, row[0]) for row in rows])
+                inputs = self._task_inputs(conn, [row[0] for row in rows])
+
+            if rows:
+                logging.debug(f"{agent} claimed tasks {[row[0] for row in rows]}")
+            return [{
+                'id': row[0],
+                'type': row[1],
+                'content': row[2],
+                'priority': row[3],
+                'created_at': row[4],
+                'attempts': (row[5] or 0) + 1,
+                'assigned_agent': agent,
+                'lease_expires_at': lease_expires_at,
+                'inputs': inputs.get(row[0], [])
+            } for row in rows]
+
+        except Exception as e:
+            logging.error(f"Failed to claim tasks for {agent}: {e}")
+            return []
+
+    def _task_inputs(self, conn: sqlite3.Connection, task_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """Results of the tasks each of task_ids depends on"""
+        if not task_ids:
+            return {}
+        placeholders = ', '.join('?' for _ in task_ids)
+        inputs: Dict[int, List[Dict[str, Any]]] = {}
+        for task_id, parent_id, step, task_type, result in conn.execute(f'''
+            SELECT d.task_id, t.id, t.workflow_step, t.task_type, t.result
+            FROM task_dependencies d JOIN tasks t ON t.id = d.depends_on
+            WHERE d.task_id IN ({placeholders})
+            ORDER BY t.id
+        ''', task_ids):
+            inputs.setdefault(task_id, []).append({
+                'id': parent_id, 'step': step, 'type': task_type, 'result': self.payloads.decode(result)})
+        return inputs
+
+    @invalidates('tasks')
+    def renew_task_lease(self, task_id: int, agent: str, lease_seconds: float = 300) -> bool:
+        """Extend the lease on a task still held by agent"""
+        try:
+            with self._writer() as conn:
+                cursor = conn.execute('''
+                    UPDATE tasks SET lease_expires_at = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND status = 'processing' AND assigned_agent = ?
+                ''', (time.time() + lease_seconds, task_id, agent))
+            return cursor.rowcount == 1
+        except Exception as e:
+            logging.error(f"Failed to renew lease on task {task_id}: {e}")
+            return False
+
+    @contextmanager
+    def keep_task_lease(self, task_id: int, agent: str, lease_seconds: float = 300) -> Iterator[threading.Event]:
+        """Renew agent's lease on a claimed task every lease_seconds / 3 while the block runs
+
+        Yields an event that is set once a renewal finds the task no longer
+        held by agent (its lease ran out and it was re-queued).
+        """
+        done, lost = threading.Event(), threading.Event()
+
+        def heartbeat():
+            while not done.wait(lease_seconds / 3):
+                if not self.renew_task_lease(task_id, agent, lease_seconds):
+                    logging.warning(f"{agent} lost the lease on task {task_id}")
+                    lost.set()
+                    return
+
+        thread = threading.Thread(target=heartbeat, daemon=True, name=f'lease-{task_id}')
+        thread.start()
+        try:
+            yield lost
+        finally:
+            done.set()
+            thread.join()
+
+    @invalidates('tasks')
+    def requeue_expired_tasks(self, max_attempts: int = 3) -> int:
+        """Return tasks whose lease has expired to the queue; returns the number of tasks touched"""
+        try:
+            with self.pool.connection(immediate=True) as conn:
+                touched = self._requeue_expired(conn, max_attempts)
+            if touched:
+                self._tasks_changed()
+            return touched
+        except Exception as e:
+            logging.error(f"Failed to requeue expired tasks: {e}")
+            return 0
+
+    def _requeue_expired(self, conn: sqlite3.Connection, max_attempts: int) -> int:
+        """Re-queue or fail processing tasks whose lease ran out"""
+        now = time.time()
+        failed = conn.execute('''
+            UPDATE tasks
+            SET status = 'failed', lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP,
+                error_message = 'Lease expired after ' || attempts || ' attempts'
+            WHERE status = 'processing' AND lease_expires_at < ? AND attempts >= ?
+        ''', (now, max_attempts)).rowcount
+        requeued = conn.execute('''
+            UPDATE tasks
+            SET status = 'pending', assigned_agent = NULL, lease_expires_at = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'processing' AND lease_expires_at < ?
+        ''', (now,)).rowcount
+
+        if failed or requeued:
+            logging.warning(f"Expired task leases: {requeued} re-queued, {failed} failed")
+        return failed + requeued
+
+    @cached('tasks')
     def get_task_by_id(self, task_id: int) -> Optional[Dict[str, Any]]:
         """Get specific task by ID"""
+        return self._read_task(task_id)
+
+    def wait_for_task(self, task_id: int, timeout: Optional[float] = None,
+                      poll_interval: float = 0.5) -> Optional[Dict[str, Any]]:
+        """Block until a task is completed or failed; returns it, or None on timeout
+
+        Lets a submitter whose create_task call was deduplicated share the
+        result of the task already in flight. Wakes on task_notifier; the
+        poll_interval re-check covers finishes it does not hear about.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            since = self.task_notifier.sequence
+            task = self._read_task(task_id)
+            if task is None or task['status'] in ('completed', 'failed'):
+                return task
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            self.task_notifier.wait(since, poll_interval if deadline is None else
+                                    max(0.0, min(poll_interval, deadline - time.monotonic())))
+
+    def _read_task(self, task_id: int) -> Optional[Dict[str, Any]]:
+        """Read a task row, bypassing the query cache"""
         try:
-            self.cursor.execute('''
-                SELECT id, task_type, content, priority, status,
-                       assigned_agent, result, error_message, created_at, updated_at
-                FROM tasks WHERE id = ?
-            ''', (task_id,))
+            self._flush_pending('tasks')
+            with self._writer() as conn:
+                row = conn.execute('''
+                    SELECT id, task_type, content, priority, status,
+                           assigned_agent, result, error_message, created_at, updated_at,
+                           attempts
+                    FROM tasks WHERE id = ?
+                ''', (task_id,)).fetchone()
 
-            row = self.cursor.fetchone()
             if row:
                 return {
                     'id': row[0],
@@ -251,86 +1257,95 @@ class NexusDatabase:
                     'priority': row[3],
                     'status': row[4],
                     'assigned_agent': row[5],
-                    'result': row[6],
+                    'result': self.payloads.decode(row[6]),
                     'error_message': row[7],
                     'created_at': row[8],
-                    'updated_at': row[9]
+                    'updated_at': row[9],
+                    'attempts': row[10] or 0
                 }
         except Exception as e:
             logging.error(f"Failed to get task {task_id}: {e}")
         return None
 
     # Conversation Management
+    @invalidates('conversations')
     def save_conversation(self, user_query: str, ai_response: str,
                          response_time: float = 0.0, satisfaction: Optional[int] = None):
         """Save conversation to history"""
         try:
-            self.cursor.execute(
-                'INSERT INTO conversations (user_query, ai_response, response_time, satisfaction_rating) VALUES (?, ?, ?, ?)',
-                (user_query, ai_response, response_time, satisfaction)
+            self._insert(
+                'conversations',
+                'INSERT INTO conversations (user_query, ai_response, response_time, satisfaction_rating, created_ts) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (user_query, ai_response, response_time, satisfaction, int(time.time()))
             )
-            self.conn.commit()
         except Exception as e:
             logging.error(f"Failed to save conversation: {e}")
 
+    @cached('conversations')
     def get_conversation_history(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent conversation history"""
         try:
-            self.cursor.execute('''
-                SELECT id, user_query, ai_response, response_time, satisfaction_rating, created_at
-                FROM conversations
-                ORDER BY created_at DESC
-                LIMIT ?
-            ''', (limit,))
-
-            results = self.cursor.fetchall()
-            return [{
-                'id': row[0],
-                'user_query': row[1][:100] + '...' if len(row[1]) > 100 else row[1],
-                'ai_response': row[2][:100] + '...' if len(row[2]) > 100 else row[2],
-                'response_time': row[3],
-                'satisfaction': row[4],
-                'created_at': row[5]
-            } for row in results]
+            self._flush_pending('conversations')
+            with self._reader() as conn:
+                return self._rows(conn, ConversationRow, '''
+                    SELECT id, user_query, ai_response, response_time, satisfaction_rating, created_at
+                    FROM conversations
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                ''', (limit,), _conversation_preview).fetchall()
 
         except Exception as e:
             logging.error(f"Failed to get conversation history: {e}")
             return []
 
+    def iter_conversation_history(self, cursor: Optional[str] = None, limit: Optional[int] = None,
+                                  batch_size: int = 500) -> KeysetStream:
+        """Stream conversations newest first, from `cursor` on, with the same truncated previews"""
+        return self._stream(ConversationRow, '''
+            SELECT id, user_query, ai_response, response_time, satisfaction_rating, created_at
+            FROM conversations
+            WHERE id < ?
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (), ('id',), lambda after: (after[0] if after else 1 << 62,),
+            cursor, limit, batch_size, _conversation_preview, flush='conversations')
+
     # Revenue and Analytics
+    @invalidates('revenue')
     def log_revenue(self, amount: float, source: str, description: str = "",
                    currency: str = 'EUR', transaction_id: Optional[str] = None) -> int:
         """Log revenue transaction"""
         try:
-            self.cursor.execute(
-                'INSERT INTO revenue (amount, currency, source, description, transaction_id) VALUES (?, ?, ?, ?, ?)',
-                (amount, currency, source, description, transaction_id)
+            revenue_id = self._insert(
+                'revenue',
+                'INSERT INTO revenue (amount, currency, source, description, transaction_id, created_ts) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (amount, currency, source, description, transaction_id, int(time.time()))
             )
-            self.conn.commit()
-            revenue_id = self.cursor.lastrowid
             logging.info(f"Logged revenue: {amount} {currency} from {source}")
             return revenue_id
         except Exception as e:
             logging.error(f"Failed to log revenue: {e}")
             return -1
 
+    @cached('revenue')
     def get_revenue_stats(self, days: int = 30) -> Dict[str, Any]:
-        """Get revenue statistics"""
+        """Get revenue statistics (answered from the revenue rollups)"""
         try:
-            # Total revenue
-            self.cursor.execute('SELECT SUM(amount) FROM revenue')
-            total_revenue = self.cursor.fetchone()[0] or 0.0
+            self.compact_rollups()
+            now = int(time.time())
+            clause, params = rollups.segments_clause(rollups.window_segments(now - days * rollups.DAY, now))
 
-            # Revenue by source
-            self.cursor.execute('SELECT source, SUM(amount) FROM revenue GROUP BY source')
-            revenue_by_source = dict(self.cursor.fetchall())
+            with self._reader() as conn:
+                # Total revenue and revenue by source from the all-time buckets
+                revenue_by_source = dict(conn.execute(
+                    "SELECT source, amount_sum FROM revenue_rollup WHERE granularity = 'all'").fetchall())
+                total_revenue = sum(revenue_by_source.values())
 
-            # Recent revenue (last N days)
-            self.cursor.execute('''
-                SELECT SUM(amount) FROM revenue
-                WHERE created_at >= datetime('now', '-{} days')
-            '''.format(days))
-            recent_revenue = self.cursor.fetchone()[0] or 0.0
+                # Recent revenue (last N days)
+                recent_revenue = conn.execute(
+                    f'SELECT SUM(amount_sum) FROM revenue_rollup WHERE {clause}', params).fetchone()[0] or 0.0
 
             return {
                 'total_revenue': total_revenue,
@@ -344,122 +1359,153 @@ class NexusDatabase:
             return {'total_revenue': 0, 'revenue_by_source': {}, 'recent_revenue': 0}
 
     # AI Metrics
+    @invalidates('agent_metrics')
     def log_agent_metric(self, agent_name: str, operation: str, duration: float,
                         success: bool = True, tokens_used: Optional[int] = None,
                         cost: Optional[float] = None):
         """Log AI agent performance metrics"""
         try:
-            self.cursor.execute(
-                'INSERT INTO agent_metrics (agent_name, operation, duration, success, tokens_used, cost) VALUES (?, ?, ?, ?, ?, ?)',
-                (agent_name, operation, duration, success, tokens_used, cost)
+            self._insert(
+                'agent_metrics',
+                'INSERT INTO agent_metrics (agent_name, operation, duration, success, tokens_used, cost, created_ts) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (agent_name, operation, duration, success, tokens_used, cost, int(time.time()))
             )
-            self.conn.commit()
         except Exception as e:
             logging.error(f"Failed to log agent metric: {e}")
 
+    @cached('agent_metrics')
     def get_agent_performance(self, agent_name: Optional[str] = None, days: int = 7) -> Dict[str, Any]:
-        """Get AI agent performance statistics"""
+        """Get AI agent performance statistics (answered from the agent_metrics rollups)"""
         try:
+            self.compact_rollups()
+            now = int(time.time())
+            clause, params = rollups.segments_clause(rollups.window_segments(now - days * rollups.DAY, now))
             if agent_name:
-                self.cursor.execute('''
-                    SELECT
-                        COUNT(*) as total_operations,
-                        AVG(duration) as avg_duration,
-                        SUM(CASE WHEN success THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as success_rate,
-                        SUM(tokens_used) as total_tokens,
-                        SUM(cost) as total_cost
-                    FROM agent_metrics
-                    WHERE agent_name = ? AND created_at >= datetime('now', '-{} days')
-                '''.format(days), (agent_name,))
-            else:
-                self.cursor.execute('''
-                    SELECT
-                        agent_name,
-                        COUNT(*) as total_operations,
-                        AVG(duration) as avg_duration,
-                        SUM(CASE WHEN success THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as success_rate,
-                        SUM(tokens_used) as total_tokens,
-                        SUM(cost) as total_cost
-                    FROM agent_metrics
-                    WHERE created_at >= datetime('now', '-{} days')
-                    GROUP BY agent_name
-                '''.format(days))
-
-            results = self.cursor.fetchall()
-            if not results:
-                return {}
+                clause += ' AND agent_name = ?'
+                params.append(agent_name)
+
+            with self._reader() as conn:
+                results = conn.execute(f'''
+                    SELECT agent_name, operations, successes, duration_count, duration_sum,
+                           tokens_sum, cost_sum, latency_sketch
+                    FROM agent_metrics_rollup
+                    WHERE {clause}
+                ''', params).fetchall()
+
+            totals: Dict[str, Dict[str, Any]] = {}
+            for agent, operations, successes, duration_count, duration_sum, tokens, cost, sketch in results:
+                agg = totals.setdefault(agent, {'operations': 0, 'successes': 0, 'duration_count': 0,
+                                                'duration_sum': 0.0, 'tokens': 0, 'cost': 0.0,
+                                                'sketch': rollups.LatencySketch()})
+                agg['operations'] += operations
+                agg['successes'] += successes
+                agg['duration_count'] += duration_count
+                agg['duration_sum'] += duration_sum
+                agg['tokens'] += tokens
+                agg['cost'] += cost
+                agg['sketch'].merge(rollups.LatencySketch.from_json(sketch))
+
+            performance = {agent: _performance_summary(agg) for agent, agg in totals.items()}
 
             if agent_name:
-                row = results[0]
-                return {
-                    'agent_name': agent_name,
-                    'total_operations': row[0],
-                    'avg_duration': row[1],
-                    'success_rate': row[2],
-                    'total_tokens': row[3] or 0,
-                    'total_cost': row[4] or 0
-                }
-            else:
-                return {
-                    agent_row[0]: {
-                        'total_operations': agent_row[1],
-                        'avg_duration': agent_row[2],
-                        'success_rate': agent_row[3],
-                        'total_tokens': agent_row[4] or 0,
-                        'total_cost': agent_row[5] or 0
-                    }
-                    for agent_row in results
-                }
+                return {'agent_name': agent_name,
+                        **performance.get(agent_name, _performance_summary(None))}
+            return performance
 
         except Exception as e:
             logging.error(f"Failed to get agent performance: {e}")
             return {}
 
+    def compact_rollups(self) -> Dict[str, int]:
+        """Fold new agent_metrics and revenue rows into the minute/hour/day rollups"""
+        for table in ('agent_metrics', 'revenue'):
+            self._flush_pending(table)
+
+        with self._reader() as conn:
+            behind = [table for table in ('agent_metrics', 'revenue') if rollups.is_behind(conn, table)]
+        if not behind:
+            return {}
+
+        folded = {}
+        with self.pool.connection(immediate=True) as conn:
+            if 'agent_metrics' in behind:
+                folded['agent_metrics'] = rollups.compact_agent_metrics(conn)
+            if 'revenue' in behind:
+                folded['revenue'] = rollups.compact_revenue(conn)
+        logging.debug(f"Compacted rollups: {folded}")
+        return folded
+
+    @invalidates('agent_metrics', 'revenue')
+    def prune_rollups(self, minute_days: int = 7, hour_days: int = 90) -> int:
+        """Drop fine-grained buckets past their retention; day and all-time buckets are kept"""
+        now = int(time.time())
+        cutoffs = [('minute', now - minute_days * rollups.DAY), ('hour', now - hour_days * rollups.DAY)]
+        removed = 0
+        try:
+            with self._writer() as conn:
+                for table in ('agent_metrics_rollup', 'revenue_rollup'):
+                    for granularity, cutoff in cutoffs:
+                        removed += conn.execute(
+                            f'DELETE FROM {table} WHERE granularity = ? AND bucket_start < ?',
+                            (granularity, cutoff)).rowcount
+        except Exception as e:
+            logging.error(f"Failed to prune rollups: {e}")
+        return removed
+
     # System Statistics
     def get_stats(self) -> Dict[str, Any]:
         """Get overall system statistics (Aliased for compatibility)"""
         return self.get_system_stats()
 
-    def search_knowledge(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def search_knowledge(self, query: str, limit: int = 10, category: Optional[str] = None) -> List[Dict[str, Any]]:
         """Search knowledge base (for UI compatibility)"""
-        return self.get_knowledge(query, limit)
-
-    def get_system_stats(self) -> Dict[str, Any]:
-        """Get overall system statistics"""
-        try:
-            stats = {}
-
-            # Knowledge stats
-            self.cursor.execute('SELECT COUNT(*), COUNT(DISTINCT category) FROM knowledge')
-            knowledge_count, category_count = self.cursor.fetchone()
-            stats['knowledge_entries'] = knowledge_count
-            stats['knowledge_categories'] = category_count
-
-            # Task stats
-            self.cursor.execute('''
-                SELECT
-                    COUNT(*),
-                    SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END),
-                    SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END),
-                    SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END)
-                FROM tasks
-            ''')
-            total_tasks, pending, completed, failed = self.cursor.fetchone()
-            stats['total_tasks'] = total_tasks
-            stats['pending_tasks'] = pending
-            stats['completed_tasks'] = completed
-            stats['failed_tasks'] = failed
-
-            # Conversation stats
-            self.cursor.execute('SELECT COUNT(*), AVG(response_time), AVG(satisfaction_rating) FROM conversations')
-            conv_count, avg_response_time, avg_satisfaction = self.cursor.fetchone()
-            stats['total_conversations'] = conv_count
-            stats['avg_response_time'] = avg_response_time or 0
-            stats['avg_satisfaction'] = avg_satisfaction or 0
+        return self.get_knowledge(query, limit, category)
+
+    @cached('knowledge', 'tasks', 'conversations', 'revenue')
+    def get_system_stats(self, exact: bool = False) -> Dict[str, Any]:
+        """Get overall system statistics
+
+        Served from trigger-maintained counters; exact=True recounts the base tables instead.
+        """
+        try:
+            for table in ('knowledge', 'tasks', 'conversations', 'revenue'):
+                self._flush_pending(table)
+            with self._reader() as conn:
+                if exact:
+                    # Event counters (such as deduplicated tasks) cannot be recounted
+                    values = {**counters.read(conn), **counters.count_exact(conn)}
+                    category_count = conn.execute('SELECT COUNT(DISTINCT category) FROM knowledge').fetchone()[0]
+                else:
+                    values = counters.read(conn)
+                    category_count = counters.category_count(conn)
+
+            def count(name: str) -> int:
+                return int(values.get(name, 0))
+
+            def average(total: str, n: str) -> float:
+                return values.get(total, 0) / values[n] if values.get(n) else 0
+
+            stats = {
+                # Knowledge stats
+                'knowledge_entries': count('knowledge_entries'),
+                'knowledge_categories': category_count,
+
+                # Task stats
+                'total_tasks': count('tasks_total'),
+                'pending_tasks': count('tasks_pending'),
+                'completed_tasks': count('tasks_completed'),
+                'failed_tasks': count('tasks_failed'),
+                'deduplicated_tasks': count('tasks_deduplicated'),  # agent runs (LLM calls) saved
+
+                # Conversation stats
+                'total_conversations': count('conversations_total'),
+                'avg_response_time': average('conversations_response_time_sum', 'conversations_response_time_n'),
+                'avg_satisfaction': average('conversations_satisfaction_sum', 'conversations_satisfaction_n')
+            }
 
             # Revenue stats
-            revenue_stats = self.get_revenue_stats()
-            stats.update(revenue_stats)
+            stats.update(self.get_revenue_stats())
 
             return stats
 
@@ -467,41 +1513,150 @@ class NexusDatabase:
             logging.error(f"Failed to get system stats: {e}")
             return {}
 
-    # Maintenance Methods
-    def cleanup_old_entries(self, days: int = 90):
-        """Clean up old entries to maintain database size"""
+    @invalidates('knowledge', 'tasks', 'conversations')
+    def reconcile_stats(self) -> Dict[str, float]:
+        """Recount the stats counters from the base tables and correct any drift"""
         try:
-            cutoff_date = f"datetime('now', '-{days} days')"
+            with self.pool.connection(immediate=True) as conn:
+                drift = counters.reconcile(conn)
+            self._last_stats_reconcile = time.time()
+            if drift:
+                logging.warning(f"Stats counters drifted and were corrected: {drift}")
+            return drift
+        except Exception as e:
+            logging.error(f"Failed to reconcile stats counters: {e}")
+            return {}
 
-            # Clean old conversations (keep last 1000)
-            self.cursor.execute('DELETE FROM conversations WHERE id NOT IN (SELECT id FROM conversations ORDER BY created_at DESC LIMIT 1000)')
+    def maybe_reconcile_stats(self) -> bool:
+        """Run reconcile_stats if the last pass is older than stats_reconcile_interval"""
+        if time.time() - self._last_stats_reconcile < self.stats_reconcile_interval:
+            return False
+        self.reconcile_stats()
+        return True
 
-            # Clean old task results but keep metadata
-            self.cursor.execute(f'UPDATE tasks SET result = NULL WHERE status IN ("completed", "failed") AND updated_at < {cutoff_date}')
+    # Maintenance Methods
+    def cleanup_old_entries(self, days: int = 90, archive: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Clean up old entries to maintain database size
 
-            self.conn.commit()
-            logging.info(f"Cleaned up entries older than {days} days")
+        Keeps the newest 1000 conversations and clears results of finished tasks
+        older than `days`, in small chunks so live traffic is not locked out.
+        """
+        policies = [
+            RetentionPolicy('conversations', max_rows=1000, archive=archive),
+            RetentionPolicy('tasks', max_age_days=days, time_column='updated_ts',
+                            where="status IN ('completed', 'failed')",
+                            clear_columns=('result',), archive=archive)
+        ]
+        return self.apply_retention(policies)
 
+    @invalidates(*RETENTION_TABLES)
+    def apply_retention(self, policies: List[RetentionPolicy], chunk_size: int = 500,
+                        pause: float = 0.01) -> Dict[str, Dict[str, Any]]:
+        """Apply retention policies in bounded chunks; returns what was evicted per table"""
+        try:
+            report = RetentionEngine(self, chunk_size=chunk_size, pause=pause).run(policies)
+            logging.info(f"Retention pass complete: {report}")
+            self.collect_payload_garbage()
+            return report
         except Exception as e:
             logging.error(f"Failed to cleanup old entries: {e}")
+            return {}
+
+    def collect_payload_garbage(self, grace: float = 3600) -> int:
+        """Delete spilled payload files no longer referenced by any row; returns files deleted"""
+        if not self.payloads.blob_dir:
+            return 0
+        try:
+            self._flush_pending('knowledge')
+            with self._reader() as conn:
+                referenced = {
+                    PayloadStore.file_reference(value)
+                    for table, column in (('knowledge', 'response'), ('tasks', 'result'))
+                    for (value,) in conn.execute(
+                        f'SELECT {column} FROM {table} WHERE substr({column}, 1, ?) = ?',
+                        (len(FILE_PREFIX), FILE_PREFIX))
+                }
+            deleted = self.payloads.collect_garbage(referenced, grace=grace)
+            if deleted:
+                logging.info(f"Deleted {deleted} unreferenced payload files")
+            return deleted
+        except Exception as e:
+            logging.error(f"Failed to collect payload files: {e}")
+            return 0
+
+    def run_maintenance(self, force: bool = False, **options) -> Dict[str, Any]:
+        """One ANALYZE / PRAGMA optimize / incremental_vacuum pass, if the database is idle
+
+        Options are passed to DatabaseMaintenance; for a recurring pass, start()
+        a DatabaseMaintenance instead.
+        """
+        try:
+            return DatabaseMaintenance(self, **options).run(force=force)
+        except Exception as e:
+            logging.error(f"Database maintenance failed: {e}")
+            return {}
+
+    def get_database_health(self) -> Dict[str, Any]:
+        """Freelist ratio, file sizes and planner-statistics staleness per table"""
+        try:
+            return DatabaseMaintenance(self).health()
+        except Exception as e:
+            logging.error(f"Failed to measure database health: {e}")
+            return {}
 
-    def backup_database(self, backup_path: str):
-        """Create database backup"""
+    def backup_database(self, backup_path: str, pages: int = -1, pause: float = 0.0):
+        """Create database backup (copied in steps of `pages` pages when pages > 0)"""
         try:
-            backup_conn = sqlite3.connect(backup_path)
-            self.conn.backup(backup_conn)
-            backup_conn.close()
+            if str(self.db_path) == ':memory:':
+                backup_conn = sqlite3.connect(backup_path)
+                with self._writer() as conn:
+                    conn.backup(backup_conn)
+                backup_conn.close()
+            else:
+                online_backup(str(self.db_path), backup_path, pages=pages, pause=pause)
             logging.info(f"Database backup created: {backup_path}")
             return True
         except Exception as e:
             logging.error(f"Failed to create backup: {e}")
             return False
 
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get query cache hit/miss/eviction counters (empty when the cache is off)"""
+        return self.query_cache.get_stats() if self.query_cache else {}
+
+    def clear_cache(self):
+        """Drop all cached query results"""
+        if self.query_cache:
+            self.query_cache.clear()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get connection pool statistics"""
+        stats = {'writer': self.pool.stats()}
+        if self.read_pool is not self.pool:
+            stats['reader'] = self.read_pool.stats()
+        if self.write_buffer:
+            stats['write_buffer'] = self.write_buffer.get_stats()
+        if self.vector_index:
+            stats['vector_index'] = self.vector_index.get_stats()
+        if self.payloads.codec:
+            stats['payloads'] = self.payloads.get_stats()
+        stats['task_notifier'] = self.task_notifier.get_stats()
+        return stats
+
     def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
-            logging.info("Database connection closed")
+        """Flush buffered writes and close database connections"""
+        if self.write_buffer:
+            self.write_buffer.close()
+        if self.vector_index:
+            try:
+                self.vector_index.flush()
+            except Exception as e:
+                logging.error(f"Failed to persist knowledge vector index: {e}")
+        self.task_notifier.close()
+        if self.read_pool is not self.pool:
+            self.read_pool.close_all()
+        self.pool.close_all()
+        logging.info("Database connection closed")
 
     def __enter__(self):
         """Context manager entry"""
@@ -511,9 +1666,114 @@ class NexusDatabase:
         """Context manager exit"""
         self.close()
 
-# Global database instance for easy access
-database_manager = NexusDatabase()
+def _performance_summary(agg: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Shape aggregated rollup counters like the historical get_agent_performance rows"""
+    if not agg or not agg['operations']:
+        return {'total_operations': 0, 'avg_duration': None, 'success_rate': None,
+                'total_tokens': 0, 'total_cost': 0, 'p50_duration': None,
+                'p95_duration': None, 'p99_duration': None}
+    return {
+        'total_operations': agg['operations'],
+        'avg_duration': agg['duration_sum'] / agg['duration_count'] if agg['duration_count'] else None,
+        'success_rate': agg['successes'] * 100.0 / agg['operations'],
+        'total_tokens': agg['tokens'],
+        'total_cost': agg['cost'],
+        'p50_duration': agg['sketch'].quantile(0.5),
+        'p95_duration': agg['sketch'].quantile(0.95),
+        'p99_duration': agg['sketch'].quantile(0.99)
+    }
+
+def _pending_task_bound(after: Optional[tuple]) -> tuple:
+    """Keyset parameters after (priority, created_at, id) for ORDER BY priority DESC, created_at, id"""
+    if after is None:
+        return (1 << 62, None, '', 0)
+    priority, created_at, task_id = after
+    return (priority, priority, created_at, task_id)
+
+
+def _ranked_bound(after: Optional[tuple]) -> tuple:
+    """Keyset parameters after (rank, id) for `? IS NULL OR rank > ? OR (rank = ? AND id > ?)`"""
+    if after is None:
+        return (None, None, None, None)
+    rank, row_id = after
+    return (rank, rank, rank, row_id)
+
+
+def _conversation_preview(row: tuple) -> tuple:
+    """Truncate the query and response to 100 characters for listings"""
+    return (row[0], _preview(row[1]), _preview(row[2]), *row[3:6])
+
+
+def _preview(text: str) -> str:
+    return text[:100] + '...' if len(text) > 100 else text
+
+
+def _task_row(task: Union[Dict[str, Any], Sequence[Any]], now: int) -> tuple:
+    """Insert parameters for one create_tasks_bulk entry"""
+    if isinstance(task, dict):
+        task_type = task.get('type') or task.get('task_type')
+        content, priority = task.get('content'), task.get('priority', 1)
+    else:
+        task_type, content, priority = (*task, 1)[:3]
+    if not task_type or content is None:
+        raise ValueError(f"Task needs a type and content: {task!r}")
+    return (task_type, content, int(priority), _content_hash(task_type, content), now, now)
+
+
+def _content_hash(task_type: str, content: str) -> str:
+    """Deduplication key of a task: its type and case/whitespace-normalized content"""
+    normalized = ' '.join(str(content).split()).casefold()
+    return hashlib.sha256(f"{task_type}\0{normalized}".encode('utf-8')).hexdigest()
+
+
+def _fts_match_expression(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 OR-query of quoted terms (None if there are no terms)"""
+    terms = dict.fromkeys(re.findall(r'\w+', text.lower()))
+    if not terms:
+        return None
+    return ' OR '.join(f'"{term}"' for term in terms)
+
+def _execute_script(conn: sqlite3.Connection, script: str):
+    """Run a multi-statement script inside the current transaction
+
+    Unlike executescript(), this does not commit an open transaction first.
+    """
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ''
+    if statement.strip():
+        conn.execute(statement)
+
+# Process-wide database instance, created on first use
+_database: Optional[NexusDatabase] = None
+_database_lock = threading.Lock()
+
+def get_database(db_path: str = 'data/nexus.db', **options) -> NexusDatabase:
+    """Get the global database manager instance, creating it on first use
+
+    Arguments only take effect on the call that creates the instance.
+    """
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                _database = NexusDatabase(db_path, **options)
+    return _database
+
+def _reset_after_fork():
+    """Forked children must not share the parent's connections or lock state"""
+    global _database, _database_lock
+    _database = None
+    _database_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
-def get_database() -> NexusDatabase:
-    """Get the global database manager instance"""
-    return database_manager
+def __getattr__(name: str):
+    # Keep `from db.manager import database_manager` working without an import-time instance
+    if name == 'database_manager':
+        return get_database()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+NOTIFY MODULE
+Task queue doorbell: wakes agents blocked waiting for work as soon as tasks
+are queued or finished, in this process (condition variable) and in other
+processes sharing the database (UDP datagrams on the loopback interface)
+"""
+
+import logging
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+_DATAGRAM = b'\x01'  # Ring for every task type
+_TYPED = b'\x02'  # Followed by the rung task types, separated by _SEPARATOR
+_SEPARATOR = '\x1f'
+_MAX_DATAGRAM = 1024
+
+
+class TaskNotifier:
+    """Sequence counter plus condition variable that waiters block on
+
+    ring() bumps the sequence and wakes every waiter; wait(since) returns as
+    soon as the sequence differs from `since`. Reading the sequence before
+    checking the queue and passing it to wait() afterwards means a ring in
+    between is never missed.
+
+    Rings name the task types they concern, and each type has its own
+    sequence: a waiter that reads sequence_for(types) and waits with the same
+    types only returns for rings of those types (or untyped rings), so a task
+    queued for one agent does not send every agent into a claim.
+
+    With doorbell_dir set, each notifier also listens on a loopback UDP port
+    registered as a file in that directory, and ring() sends one datagram to
+    every other registered port, so a task queued by one process wakes the
+    agents of all of them. A process that crashed leaves its registration
+    behind; datagrams to its port are simply dropped. A lost datagram only
+    delays a waiter until its fallback timeout.
+    """
+
+    def __init__(self, doorbell_dir: Optional[Path] = None):
+        self._condition = threading.Condition()
+        self._sequence = 0
+        self._untyped = 0  # Rings that concern every task type
+        self._type_sequences: Dict[str, int] = {}
+        self.rings = 0
+        self.remote_rings = 0
+
+        self.doorbell_dir = Path(doorbell_dir) if doorbell_dir else None
+        self._socket: Optional[socket.socket] = None
+        self._registration: Optional[Path] = None
+        self._listener: Optional[threading.Thread] = None
+        self._closed = False
+        if self.doorbell_dir:
+            try:
+                self._open_doorbell()
+            except OSError as e:
+                logging.warning(f"Task doorbell unavailable, waking local waiters only: {e}")
+                self._close_doorbell()
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    def sequence_for(self, task_types: Optional[Iterable[str]] = None) -> int:
+        """Sequence that only moves for rings concerning task_types (all rings when None)"""
+        if task_types is None:
+            return self._sequence
+        return self._untyped + sum(self._type_sequences.get(task_type, 0) for task_type in task_types)
+
+    def ring(self, task_types: Optional[Iterable[str]] = None, broadcast: bool = True):
+        """Wake waiters for task_types, every waiter when None (and, with broadcast, those of other processes)
+
+        An empty task_types only wakes waiters on the plain sequence, such
+        as wait_for_task callers.
+        """
+        task_types = None if task_types is None else set(task_types)
+        with self._condition:
+            self._sequence += 1
+            self.rings += 1
+            if task_types is None:
+                self._untyped += 1
+            else:
+                for task_type in task_types:
+                    self._type_sequences[task_type] = self._type_sequences.get(task_type, 0) + 1
+            self._condition.notify_all()
+        sock = self._socket
+        if broadcast and sock:
+            self._broadcast(sock, task_types)
+
+    def wake(self):
+        """Let waiters re-check their cancel condition without counting as new work"""
+        with self._condition:
+            self._condition.notify_all()
+
+    def wait(self, since: int, timeout: Optional[float] = None,
+             cancelled: Optional[Callable[[], bool]] = None,
+             task_types: Optional[Iterable[str]] = None) -> int:
+        """Block until sequence_for(task_types) moves past `since`, cancelled() is true or timeout
+
+        Returns sequence_for(task_types).
+        """
+        task_types = None if task_types is None else tuple(task_types)
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.sequence_for(task_types) != since or (cancelled is not None and cancelled()),
+                timeout)
+            return self.sequence_for(task_types)
+
+    def _open_doorbell(self):
+        self.doorbell_dir.mkdir(parents=True, exist_ok=True)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind(('127.0.0.1', 0))
+        self._socket.settimeout(1.0)
+        port = self._socket.getsockname()[1]
+        self._registration = self.doorbell_dir / f"{os.getpid()}-{port}.port"
+        self._registration.touch()
+        self._listener = threading.Thread(target=self._listen, args=(self._socket,), daemon=True,
+                                          name='nexus-doorbell')
+        self._listener.start()
+        logging.debug(f"Task doorbell listening on 127.0.0.1:{port}")
+
+    def _listen(self, sock: socket.socket):
+        while not self._closed:
+            try:
+                datagram = sock.recv(_MAX_DATAGRAM)
+            except (socket.timeout, ConnectionResetError):
+                # Windows reports an earlier send to a dead peer as a reset on this socket
+                continue
+            except OSError:
+                if not self._closed:
+                    logging.debug("Task doorbell socket closed")
+                return
+            if self._closed:
+                return
+            self.remote_rings += 1
+            if datagram.startswith(_TYPED):
+                payload = datagram[len(_TYPED):].decode('utf-8', 'replace')
+                self.ring(payload.split(_SEPARATOR) if payload else (), broadcast=False)
+            else:
+                self.ring(broadcast=False)
+
+    def _peers(self) -> List[Tuple[Path, int]]:
+        peers = []
+        for entry in os.scandir(self.doorbell_dir):
+            path = Path(entry.path)
+            if path.suffix == '.port' and path != self._registration:
+                try:
+                    peers.append((path, int(path.stem.rsplit('-', 1)[1])))
+                except (IndexError, ValueError):
+                    continue
+        return peers
+
+    def _broadcast(self, sock: socket.socket, task_types: Optional[set] = None):
+        try:
+            peers = self._peers()
+        except OSError as e:
+            logging.debug(f"Task doorbell directory unreadable: {e}")
+            return
+        datagram = _DATAGRAM
+        if task_types is not None:
+            datagram = _TYPED + _SEPARATOR.join(sorted(task_types)).encode('utf-8')
+            if len(datagram) > _MAX_DATAGRAM:
+                datagram = _DATAGRAM  # Too many types to list: wake everyone
+        for path, port in peers:
+            try:
+                sock.sendto(datagram, ('127.0.0.1', port))
+            except OSError:
+                if self._closed:
+                    return
+                path.unlink(missing_ok=True)
+                logging.debug(f"Dropped stale task doorbell peer {path.name}")
+
+    def _close_doorbell(self):
+        self._closed = True
+        if self._registration:
+            self._registration.unlink(missing_ok=True)
+        sock, self._socket = self._socket, None
+        if sock:
+            try:
+                # Unblock the listener's recv() so it sees the close at once
+                sock.sendto(_DATAGRAM, sock.getsockname())
+            except OSError:
+                pass
+            if self._listener and self._listener.is_alive():
+                self._listener.join(timeout=2)
+            sock.close()
+
+    def close(self):
+        """Unregister from the doorbell directory and wake all waiters"""
+        self._close_doorbell()
+        self.wake()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Ring counts and doorbell peers"""
+        stats: Dict[str, Any] = {'sequence': self._sequence, 'rings': self.rings,
+                                 'remote_rings': self.remote_rings, 'doorbell': bool(self._socket)}
+        if self._socket:
+            try:
+                stats['peers'] = len(self._peers())
+            except OSError:
+                stats['peers'] = None
+        return stats
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+PAYLOADS MODULE
+Size-tiered storage for large TEXT payloads (task results, knowledge responses):
+small values stay plain TEXT, larger ones become compressed BLOBs and very
+large ones spill to content-addressed files next to the database
+"""
+
+import hashlib
+import logging
+import lzma
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+# Stored BLOB layout: MAGIC + kind + body
+MAGIC = b'NXP1'
+KIND_ZLIB, KIND_LZMA, KIND_FILE = b'z', b'x', b'f'
+FILE_PREFIX = MAGIC + KIND_FILE  # Values referencing a spilled file
+
+CODECS = {
+    'zlib': (KIND_ZLIB, lambda data: zlib.compress(data, 6), zlib.decompress),
+    'lzma': (KIND_LZMA, lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+_DECOMPRESS = {kind: decompress for kind, _, decompress in CODECS.values()}
+_SUFFIX = {KIND_ZLIB: '.z', KIND_LZMA: '.xz'}
+
+# Compressed values are only kept when they save at least this fraction
+MIN_SAVING = 0.1
+
+
+class PayloadStore:
+    """Encodes payload text for storage and decodes it again on read
+
+    encode() returns the text itself below compress_threshold bytes, a
+    compressed BLOB above it, and a BLOB referencing a compressed file under
+    blob_dir above spill_threshold (when a blob_dir is configured). decode()
+    accepts any of the three, so rows written with other settings, or before
+    compression existed, read back unchanged.
+    """
+
+    def __init__(self, blob_dir: Optional[str] = None, codec: Optional[str] = 'zlib',
+                 compress_threshold: int = 4096, spill_threshold: int = 1 << 20):
+        if codec is not None and codec not in CODECS:
+            raise ValueError(f"Unknown payload codec: {codec}")
+
+        self.blob_dir = Path(blob_dir) if blob_dir else None
+        self.codec = codec
+        self.compress_threshold = compress_threshold
+        self.spill_threshold = spill_threshold
+        self.stats = {'plain': 0, 'compressed': 0, 'spilled': 0, 'decoded': 0,
+                      'bytes_in': 0, 'bytes_stored': 0}
+
+    def encode(self, text: Optional[str]) -> Union[str, bytes, None]:
+        """Storage value for text"""
+        if text is None:
+            return None
+        raw = text.encode('utf-8')
+        self.stats['bytes_in'] += len(raw)
+        if self.codec is None or len(raw) < self.compress_threshold:
+            self.stats['plain'] += 1
+            self.stats['bytes_stored'] += len(raw)
+            return text
+
+        kind, compress, _ = CODECS[self.codec]
+        packed = compress(raw)
+        if len(packed) > len(raw) * (1 - MIN_SAVING):
+            self.stats['plain'] += 1
+            self.stats['bytes_stored'] += len(raw)
+            return text
+
+        if self.blob_dir and len(raw) >= self.spill_threshold:
+            name = hashlib.sha256(raw).hexdigest() + _SUFFIX[kind]
+            path = self.blob_dir / name[:2] / name
+            if not path.exists():
+                # Content-addressed: identical payloads share one file
+                path.parent.mkdir(parents=True, exist_ok=True)
+                partial = path.with_suffix(path.suffix + '.partial')
+                partial.write_bytes(packed)
+                os.replace(partial, path)
+            value = FILE_PREFIX + kind + name.encode('ascii')
+            self.stats['spilled'] += 1
+        else:
+            value = MAGIC + kind + packed
+            self.stats['compressed'] += 1
+        self.stats['bytes_stored'] += len(value)
+        return value
+
+    def decode(self, value: Any) -> Any:
+        """Text for a stored value (non-payload values are returned unchanged)"""
+        if not isinstance(value, bytes) or not value.startswith(MAGIC):
+            return value
+        self.stats['decoded'] += 1
+        kind, body = value[4:5], value[5:]
+        if kind == KIND_FILE:
+            kind, name = body[:1], body[1:].decode('ascii')
+            if not self.blob_dir:
+                raise FileNotFoundError(f"Payload {name} is stored in a file but no blob directory is set")
+            body = (self.blob_dir / name[:2] / name).read_bytes()
+        return _DECOMPRESS[kind](body).decode('utf-8')
+
+    @staticmethod
+    def file_reference(value: Any) -> Optional[str]:
+        """File name referenced by a stored value, if it spilled to a file"""
+        if isinstance(value, bytes) and value.startswith(FILE_PREFIX):
+            return value[6:].decode('ascii')
+        return None
+
+    def collect_garbage(self, referenced: Iterable[str], grace: float = 3600) -> int:
+        """Delete payload files no row references; files younger than grace seconds are kept
+        (they may belong to a write that has not committed yet). Returns files deleted."""
+        if not self.blob_dir or not self.blob_dir.exists():
+            return 0
+        keep = set(referenced)
+        cutoff = time.time() - grace
+        deleted = 0
+        for path in self.blob_dir.glob('*/*'):
+            if path.name not in keep and path.stat().st_mtime < cutoff:
+                try:
+                    path.unlink()
+                    deleted += 1
+                except OSError as e:
+                    logging.warning(f"Could not delete payload file {path}: {e}")
+        return deleted
+
+    def disk_usage(self) -> int:
+        """Bytes used by spilled payload files"""
+        if not self.blob_dir or not self.blob_dir.exists():
+            return 0
+        return sum(path.stat().st_size for path in self.blob_dir.glob('*/*'))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get encode/decode counters"""
+        return {
+            **self.stats,
+            'codec': self.codec,
+            'compress_threshold': self.compress_threshold,
+            'spill_threshold': self.spill_threshold,
+            'ratio': self.stats['bytes_stored'] / self.stats['bytes_in'] if self.stats['bytes_in'] else 1.0,
+            'file_bytes': self.disk_usage()
+        }
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+CONNECTION POOL MODULE
+Thread-aware SQLite connection handling for the Nexus database
+"""
+
+import sqlite3
+import logging
+import threading
+import queue
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+POOL_MODES = ('single', 'thread', 'pool')
+
+
+class _ThreadConnection:
+    """Thread-local holder for a 'thread' mode connection; collected when its thread exits"""
+
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+class ConnectionPool:
+    """Hands out SQLite connections per thread, from a bounded pool or from one shared connection
+
+    Modes:
+        single - one shared connection serialized by a lock (legacy behaviour)
+        thread - one lazily opened connection per thread
+        pool   - up to `size` connections checked out on demand
+    """
+
+    def __init__(self, db_path: str, mode: str = 'thread', size: int = 4,
+                 read_only: bool = False, busy_timeout: float = 5.0,
+                 wal: bool = True, pragmas: Optional[Dict[str, object]] = None,
+                 functions: Optional[Dict[str, Callable]] = None):
+        if mode not in POOL_MODES:
+            raise ValueError(f"Unknown pool mode: {mode}")
+
+        self.db_path = str(db_path)
+        self.mode = mode
+        self.size = max(1, size)
+        self.read_only = read_only
+        self.busy_timeout = busy_timeout
+        self.wal = wal
+        self.pragmas = dict(pragmas or {})
+        self.functions = dict(functions or {})
+
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._connections: List[sqlite3.Connection] = []
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._shared: Optional[sqlite3.Connection] = None
+        self._closed = False
+
+    def _open(self) -> sqlite3.Connection:
+        """Open and configure a new connection"""
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}')
+
+        # Only takes effect while a new database is still empty, i.e. before journal_mode is written
+        if 'auto_vacuum' in self.pragmas and not self.read_only:
+            conn.execute(f"PRAGMA auto_vacuum = {self.pragmas['auto_vacuum']}")
+
+        if self.wal and self.db_path != ':memory:' and not self.read_only:
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+
+        for name, value in self.pragmas.items():
+            if name == 'auto_vacuum':
+                continue
+            conn.execute(f'PRAGMA {name} = {value}')
+
+        # Deterministic one-argument SQL functions, usable in triggers and views
+        for name, function in self.functions.items():
+            conn.create_function(name, 1, function, deterministic=True)
+
+        if self.read_only:
+            conn.execute('PRAGMA query_only = ON')
+
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Check out a connection for the current thread"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+
+        if self.mode == 'single':
+            self._lock.acquire()
+            try:
+                if self._shared is None:
+                    self._shared = self._open()
+            except Exception:
+                self._lock.release()
+                raise
+            return self._shared
+
+        if self.mode == 'thread':
+            holder = getattr(self._local, 'owned', None)
+            if holder is None:
+                holder = self._local.owned = _ThreadConnection(self._open())
+                # Thread-local values are dropped when their thread exits; close the connection with them
+                weakref.finalize(holder, self._discard, holder.conn)
+            return holder.conn
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._connections) < self.size:
+                return self._open()
+
+        try:
+            return self._idle.get(timeout=self.busy_timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"No pooled connection available within {self.busy_timeout}s")
+
+    def _release(self, conn: sqlite3.Connection):
+        """Return a connection once the outermost caller is done with it"""
+        if self.mode == 'single':
+            self._lock.release()
+        elif self.mode == 'pool':
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        """Close a 'thread' mode connection whose owning thread has exited"""
+        with self._lock:
+            if conn not in self._connections:
+                return  # Already closed by close_all
+            self._connections.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logging.debug(f"Error closing thread connection: {e}")
+
+    @contextmanager
+    def connection(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection; nested calls on the same thread reuse it
+
+        The outermost borrower commits on success and rolls back on error.
+        With immediate=True the write lock is taken up front (BEGIN IMMEDIATE),
+        so read-then-write sequences are atomic across threads and processes.
+        """
+        depth = getattr(self._local, 'depth', 0)
+        if depth:
+            self._local.depth = depth + 1
+            try:
+                conn = self._local.current
+                if immediate and not conn.in_transaction:
+                    conn.execute('BEGIN IMMEDIATE')
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.current = conn
+        self._local.depth = 1
+        try:
+            if immediate:
+                conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth = 0
+            self._local.current = None
+            self._release(conn)
+
+    def in_use(self) -> bool:
+        """Whether the current thread is inside a `connection()` block"""
+        return bool(getattr(self._local, 'depth', 0))
+
+    def close_all(self):
+        """Close every connection opened by this pool"""
+        with self._lock:
+            self._closed = True
+            for conn in self._connections:
+                try:
+                    if not self.read_only:
+                        # Refresh planner statistics the connection's queries showed to be missing or stale
+                        conn.execute('PRAGMA optimize')
+                    conn.close()
+                except sqlite3.Error as e:
+                    logging.debug(f"Error closing pooled connection: {e}")
+            self._connections.clear()
+            self._shared = None
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+    def stats(self) -> Dict[str, object]:
+        """Get pool usage statistics"""
+        return {
+            'mode': self.mode,
+            'read_only': self.read_only,
+            'open_connections': len(self._connections),
+            'idle_connections': self._idle.qsize() if self.mode == 'pool' else None,
+            'max_size': self.size if self.mode == 'pool' else None,
+            'path': Path(self.db_path).name
+        }
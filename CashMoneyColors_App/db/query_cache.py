@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+QUERY CACHE MODULE
+LRU + TTL cache for NexusDatabase read results with per-table invalidation
+"""
+
+import copy
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+_MISSING = object()
+
+
+class QueryCache:
+    """Bounded least-recently-used result cache whose entries expire after ttl seconds
+
+    Every entry records the tables it was read from; invalidate(table) drops
+    them. A result computed while one of its tables was written is not
+    stored, so a slow read cannot put pre-write data back into the cache.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 30.0):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, float, Tuple[str, ...]]]' = OrderedDict()
+        self._by_table: Dict[str, Set[Hashable]] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def version(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        """Write generation of each table, to pass back to put()"""
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def get(self, key: Hashable) -> Any:
+        """Cached value (a private copy) or the _MISSING sentinel"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return _MISSING
+            value, expires, _ = entry
+            if expires < time.monotonic():
+                self._drop(key)
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+        return copy.deepcopy(value)
+
+    def put(self, key: Hashable, value: Any, tables: Tuple[str, ...], version: Tuple[int, ...]):
+        """Store a result read from `tables` unless they were written since `version` was taken"""
+        value = copy.deepcopy(value)
+        with self._lock:
+            if tuple(self._versions.get(table, 0) for table in tables) != version:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tables)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+
+    def invalidate(self, *tables: str):
+        """Drop every entry read from any of `tables`"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                for key in list(self._by_table.pop(table, ())):
+                    if key in self._entries:
+                        self._drop(key)
+                        self.stats['invalidations'] += 1
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            for table in list(self._versions) + list(self._by_table):
+                self._versions[table] = self._versions.get(table, 0) + 1
+            self._entries.clear()
+            self._by_table.clear()
+
+    def _drop(self, key: Hashable):
+        _, _, tables = self._entries.pop(key)
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys:
+                keys.discard(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hit_rate': self.stats['hits'] / lookups if lookups else 0.0
+            }
+
+
+def cached(*tables: str) -> Callable:
+    """Serve a read method from self.query_cache (when enabled), keyed by method and arguments"""
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache: Optional[QueryCache] = getattr(self, 'query_cache', None)
+            if cache is None:
+                return method(self, *args, **kwargs)
+            key = (method.__name__, args, tuple(sorted(kwargs.items())))
+            try:
+                value = cache.get(key)
+            except TypeError:  # Unhashable arguments are not cached
+                return method(self, *args, **kwargs)
+            if value is not _MISSING:
+                return value
+
+            version = cache.version(tables)
+            value = method(self, *args, **kwargs)
+            cache.put(key, value, tables, version)
+            return value
+        return wrapper
+    return decorator
+
+
+def invalidates(*tables: str) -> Callable:
+    """Drop cached reads of `tables` whenever the decorated write method runs"""
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache: Optional[QueryCache] = getattr(self, 'query_cache', None)
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                if cache is not None:
+                    cache.invalidate(*tables)
+        return wrapper
+    return decorator
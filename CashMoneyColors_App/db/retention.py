@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+RETENTION MODULE
+Chunked, index-driven retention for NexusDatabase tables with optional compressed archiving
+"""
+
+import gzip
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+RETENTION_TABLES = ('conversations', 'tasks', 'knowledge', 'agent_metrics', 'revenue')
+
+
+@dataclass
+class RetentionPolicy:
+    """Which rows of a table to evict, and what eviction means
+
+    A row is evicted when it matches `where` (if given) and is older than
+    max_age_days, outside the newest max_rows rows, or among the oldest rows
+    that push the table over max_bytes. With clear_columns set, those columns
+    are set to NULL instead of deleting the row.
+
+    time_column is normally an integer epoch column (*_ts); TEXT timestamp
+    columns such as knowledge.created_at are compared as UTC strings.
+    """
+
+    table: str
+    max_age_days: Optional[float] = None
+    max_rows: Optional[int] = None
+    max_bytes: Optional[int] = None
+    time_column: str = 'created_ts'
+    where: Optional[str] = None
+    clear_columns: Tuple[str, ...] = ()
+    archive: bool = False
+
+    def __post_init__(self):
+        if self.table not in RETENTION_TABLES:
+            raise ValueError(f"No retention support for table: {self.table}")
+
+
+class RetentionEngine:
+    """Applies retention policies in bounded chunks, yielding between chunks"""
+
+    def __init__(self, db, chunk_size: int = 500, pause: float = 0.01,
+                 archive_dir: Optional[str] = None):
+        self.db = db
+        self.chunk_size = max(1, chunk_size)
+        self.pause = pause
+        self.archive_dir = Path(archive_dir) if archive_dir else self.db.db_path.parent / 'archive'
+
+    def run(self, policies: List[RetentionPolicy]) -> Dict[str, Dict[str, Any]]:
+        """Apply each policy; returns per-table counts of evicted rows, chunks and archived rows"""
+        return {policy.table: self.apply(policy) for policy in policies}
+
+    def apply(self, policy: RetentionPolicy) -> Dict[str, Any]:
+        """Apply one policy"""
+        start = time.perf_counter()
+        columns = self._columns(policy.table)
+        for column in (policy.time_column, *policy.clear_columns):
+            if column not in columns:
+                raise ValueError(f"Unknown column {policy.table}.{column}")
+
+        predicate, params = self._predicate(policy)
+        report = {'rows': 0, 'chunks': 0, 'archived': 0, 'seconds': 0.0}
+        if predicate is None:
+            return report
+
+        last_id = 0
+        while True:
+            # Select and evict each chunk in one write transaction, so a row that
+            # stops matching the predicate in between is never evicted
+            with self.db.pool.connection(immediate=True) as conn:
+                rows = conn.execute(f'''
+                    SELECT * FROM {policy.table}
+                    WHERE id > ? AND {predicate}
+                    ORDER BY id LIMIT ?
+                ''', (last_id, *params, self.chunk_size)).fetchall()
+                if not rows:
+                    break
+
+                ids = [row[columns.index('id')] for row in rows]
+                if policy.archive:
+                    report['archived'] += self._archive(policy, columns, rows)
+
+                placeholders = ', '.join('?' for _ in ids)
+                if policy.clear_columns:
+                    assignments = ', '.join(f'{column} = NULL' for column in policy.clear_columns)
+                    conn.execute(f'UPDATE {policy.table} SET {assignments} WHERE id IN ({placeholders})', ids)
+                else:
+                    conn.execute(f'DELETE FROM {policy.table} WHERE id IN ({placeholders})', ids)
+
+            report['rows'] += len(ids)
+            report['chunks'] += 1
+            last_id = ids[-1]
+            if len(rows) < self.chunk_size:
+                break
+            time.sleep(self.pause)  # Let other writers in between chunks
+
+        report['seconds'] = time.perf_counter() - start
+        if report['rows']:
+            logging.info(f"Retention on {policy.table}: {report['rows']} rows in {report['chunks']} chunks")
+        return report
+
+    def _predicate(self, policy: RetentionPolicy) -> Tuple[Optional[str], List[Any]]:
+        """Build the eviction condition; None when no limit is exceeded"""
+        limits, params = [], []
+
+        cutoff = None
+        if policy.max_age_days is not None:
+            cutoff = _age_cutoff(policy.time_column, policy.max_age_days)
+            limits.append(f'{policy.time_column} < ?')
+            params.append(cutoff)
+
+        boundaries = []
+        if policy.max_rows is not None:
+            boundaries.append(self._keep_newest_boundary(policy.table, policy.max_rows))
+        if policy.max_bytes is not None:
+            boundaries.append(self._size_boundary(policy.table, policy.max_bytes))
+        boundary = max((b for b in boundaries if b is not None), default=None)
+        if boundary is not None:
+            limits.append('id < ?')
+            params.append(boundary)
+
+        if not limits:
+            return None, []
+
+        # Upper id bound so the chunk scan stops at the last evictable row
+        upper = boundary - 1 if boundary is not None else None
+        if cutoff is not None:
+            scope = f' AND ({policy.where})' if policy.where else ''
+            with self.db._reader() as conn:
+                age_upper = conn.execute(
+                    f'SELECT MAX(id) FROM {policy.table} WHERE {policy.time_column} < ?{scope}',
+                    (cutoff,)).fetchone()[0]
+            upper = max(upper or 0, age_upper or 0)
+
+        predicate = '(' + ' OR '.join(limits) + ') AND id <= ?'
+        params.append(upper)
+        if policy.where:
+            predicate += f' AND ({policy.where})'
+        if policy.clear_columns:
+            # Skip rows that were already cleared on an earlier pass
+            predicate += ' AND (' + ' OR '.join(f'{c} IS NOT NULL' for c in policy.clear_columns) + ')'
+        return predicate, params
+
+    def _keep_newest_boundary(self, table: str, max_rows: int) -> Optional[int]:
+        """Lowest id that survives a keep-newest-N policy (walks the primary key)"""
+        if max_rows <= 0:
+            return self._max_id(table) + 1
+        with self.db._reader() as conn:
+            row = conn.execute(f'SELECT id FROM {table} ORDER BY id DESC LIMIT 1 OFFSET ?',
+                               (max_rows - 1,)).fetchone()
+        return row[0] if row else None
+
+    def _size_boundary(self, table: str, max_bytes: int) -> Optional[int]:
+        """Lowest id that survives once the oldest rows bringing the table over max_bytes are gone"""
+        size, rows = self.table_size(table)
+        if size <= max_bytes or not rows:
+            return None
+        excess_rows = math.ceil((size - max_bytes) / (size / rows))
+        return self._keep_newest_boundary(table, rows - excess_rows)
+
+    def _max_id(self, table: str) -> int:
+        with self.db._reader() as conn:
+            return conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+
+    def table_size(self, table: str) -> Tuple[int, int]:
+        """Approximate on-disk bytes and row count of a table (dbstat when compiled in)"""
+        with self.db._reader() as conn:
+            rows = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            try:
+                size = conn.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = ?', (table,)).fetchone()[0]
+            except Exception:
+                # Estimate from the payload of the newest rows
+                columns = self._columns(table)
+                payload = ' + '.join(f'COALESCE(LENGTH({c}), 0)' for c in columns)
+                sample = conn.execute(f'''
+                    SELECT AVG({payload}), COUNT(*) FROM
+                    (SELECT * FROM {table} ORDER BY id DESC LIMIT 1000)
+                ''').fetchone()
+                size = (sample[0] or 0) * rows
+        return int(size or 0), rows
+
+    def _columns(self, table: str) -> List[str]:
+        with self.db._reader() as conn:
+            return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+    def _archive(self, policy: RetentionPolicy, columns: List[str], rows) -> int:
+        """Append evicted rows (or the cleared values) to a gzip-compressed NDJSON side file"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self.archive_dir / f"{policy.table}-{datetime.now().strftime('%Y%m%d')}.ndjson.gz"
+        kept = ('id', *policy.clear_columns) if policy.clear_columns else columns
+        indexes = [columns.index(column) for column in kept]
+
+        # Appending creates a new gzip member; readers see one continuous stream
+        with gzip.open(path, 'at', encoding='utf-8') as archive:
+            for row in rows:
+                record = {column: self.db.payloads.decode(row[i]) for column, i in zip(kept, indexes)}
+                archive.write(json.dumps(record) + '\n')
+        return len(rows)
+
+
+def _age_cutoff(time_column: str, max_age_days: float):
+    """Bound parameter for `time_column < ?`: epoch seconds, or a UTC timestamp string for TEXT columns"""
+    cutoff = time.time() - max_age_days * 86400
+    if time_column.endswith('_ts'):
+        return int(cutoff)
+    return datetime.fromtimestamp(cutoff, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+ROLLUPS MODULE
+Time-bucketed aggregates of agent_metrics and revenue, maintained by incremental compaction
+"""
+
+import json
+import math
+import sqlite3
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+
+# Granularity name -> bucket width in seconds ('all' is a single all-time bucket)
+GRANULARITIES = {'minute': MINUTE, 'hour': HOUR, 'day': DAY, 'all': None}
+
+COMPACTION_CHUNK = 50000
+
+ROLLUP_SCHEMA = '''
+    -- Compaction watermarks (last raw row folded into the rollups)
+    CREATE TABLE IF NOT EXISTS rollup_state (
+        source_table TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS agent_metrics_rollup (
+        granularity TEXT NOT NULL,
+        bucket_start INTEGER NOT NULL,
+        agent_name TEXT NOT NULL,
+        operations INTEGER NOT NULL,
+        successes INTEGER NOT NULL,
+        duration_count INTEGER NOT NULL,
+        duration_sum REAL NOT NULL,
+        duration_min REAL,
+        duration_max REAL,
+        tokens_sum INTEGER NOT NULL,
+        cost_sum REAL NOT NULL,
+        latency_sketch TEXT NOT NULL,
+        PRIMARY KEY (granularity, bucket_start, agent_name)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS revenue_rollup (
+        granularity TEXT NOT NULL,
+        bucket_start INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        transactions INTEGER NOT NULL,
+        amount_sum REAL NOT NULL,
+        amount_min REAL,
+        amount_max REAL,
+        PRIMARY KEY (granularity, bucket_start, source)
+    ) WITHOUT ROWID;
+'''
+
+
+class LatencySketch:
+    """Log-bucketed latency histogram; quantiles are accurate to about 5%"""
+
+    GAMMA = 1.1
+    MIN_VALUE = 1e-4  # seconds; smaller durations share the lowest bin
+
+    def __init__(self, bins: Optional[Dict[int, int]] = None):
+        self.bins: Dict[int, int] = defaultdict(int, bins or {})
+
+    def _bin(self, value: float) -> int:
+        return math.ceil(math.log(max(value, self.MIN_VALUE) / self.MIN_VALUE, self.GAMMA))
+
+    def add(self, value: float, count: int = 1):
+        self.bins[self._bin(value)] += count
+
+    def merge(self, other: 'LatencySketch'):
+        for index, count in other.bins.items():
+            self.bins[index] += count
+
+    def count(self) -> int:
+        return sum(self.bins.values())
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at quantile q (0..1), None when empty"""
+        total = self.count()
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Midpoint of the bin in log space
+                return self.MIN_VALUE * self.GAMMA ** (index - 0.5)
+        return self.MIN_VALUE * self.GAMMA ** max(self.bins)
+
+    def to_json(self) -> str:
+        return json.dumps({str(k): v for k, v in self.bins.items()}, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text: Optional[str]) -> 'LatencySketch':
+        return cls({int(k): v for k, v in json.loads(text or '{}').items()})
+
+
+def bucket_start(epoch: int, granularity: str) -> int:
+    """Start of the bucket containing epoch"""
+    width = GRANULARITIES[granularity]
+    return 0 if width is None else epoch - epoch % width
+
+
+def window_segments(start: int, end: int) -> List[Tuple[str, int, int]]:
+    """Cover [start, end] with the fewest rollup buckets: minutes at the edges, hours, then days
+
+    The minute containing `end` is always included, so rows written in the
+    same second as a window ending "now" are counted.
+    """
+    start -= start % MINUTE
+    end += MINUTE - end % MINUTE
+    h1, h2 = -(-start // HOUR) * HOUR, end - end % HOUR
+    d1, d2 = -(-start // DAY) * DAY, end - end % DAY
+
+    if d1 < d2:
+        segments = [('minute', start, h1), ('hour', h1, d1), ('day', d1, d2),
+                    ('hour', d2, h2), ('minute', h2, end)]
+    elif h1 < h2:
+        segments = [('minute', start, h1), ('hour', h1, h2), ('minute', h2, end)]
+    else:
+        segments = [('minute', start, end)]
+    return [segment for segment in segments if segment[1] < segment[2]]
+
+
+# window_segments returns at most this many segments
+MAX_SEGMENTS = 5
+
+
+def segments_clause(segments: Iterable[Tuple[str, int, int]]) -> Tuple[str, List[Any]]:
+    """SQL condition and parameters selecting the rollup rows of a window cover
+
+    The SQL text is the same for every window (unused segments get an empty
+    range), so callers can reuse one prepared statement.
+    """
+    segments = list(segments)
+    segments += [('minute', 0, 0)] * (MAX_SEGMENTS - len(segments))
+    params = []
+    for granularity, lo, hi in segments:
+        params.extend((granularity, lo, hi))
+    return _SEGMENTS_SQL, params
+
+
+_SEGMENTS_SQL = '(' + ' OR '.join(
+    ['(granularity = ? AND bucket_start >= ? AND bucket_start < ?)'] * MAX_SEGMENTS) + ')'
+
+
+def _watermark(conn: sqlite3.Connection, table: str) -> int:
+    row = conn.execute('SELECT last_id FROM rollup_state WHERE source_table = ?', (table,)).fetchone()
+    return row[0] if row else 0
+
+
+def is_behind(conn: sqlite3.Connection, table: str) -> bool:
+    """Whether raw rows exist that have not been folded into the rollups yet"""
+    latest = conn.execute(f'SELECT MAX(id) FROM {table}').fetchone()[0] or 0
+    return latest > _watermark(conn, table)
+
+
+def compact_agent_metrics(conn: sqlite3.Connection, chunk: int = COMPACTION_CHUNK) -> int:
+    """Fold agent_metrics rows past the watermark into the rollup tables; returns rows folded"""
+    folded = 0
+    while True:
+        last_id = _watermark(conn, 'agent_metrics')
+        rows = conn.execute('''
+            SELECT id, agent_name, created_ts, duration, success, tokens_used, cost
+            FROM agent_metrics WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, chunk)).fetchall()
+        if not rows:
+            return folded
+
+        buckets: Dict[Tuple[str, int, str], Dict[str, Any]] = {}
+        for _, agent, epoch, duration, success, tokens, cost in rows:
+            for granularity in GRANULARITIES:
+                key = (granularity, bucket_start(epoch or 0, granularity), agent)
+                agg = buckets.get(key)
+                if agg is None:
+                    agg = buckets[key] = _empty_metric_bucket()
+                agg['operations'] += 1
+                agg['successes'] += 1 if success else 0
+                agg['tokens_sum'] += tokens or 0
+                agg['cost_sum'] += cost or 0.0
+                if duration is not None:
+                    agg['duration_count'] += 1
+                    agg['duration_sum'] += duration
+                    agg['duration_min'] = _min(agg['duration_min'], duration)
+                    agg['duration_max'] = _max(agg['duration_max'], duration)
+                    agg['sketch'].add(duration)
+
+        for (granularity, start, agent), agg in buckets.items():
+            existing = conn.execute('''
+                SELECT operations, successes, duration_count, duration_sum, duration_min,
+                       duration_max, tokens_sum, cost_sum, latency_sketch
+                FROM agent_metrics_rollup
+                WHERE granularity = ? AND bucket_start = ? AND agent_name = ?
+            ''', (granularity, start, agent)).fetchone()
+            if existing:
+                agg['operations'] += existing[0]
+                agg['successes'] += existing[1]
+                agg['duration_count'] += existing[2]
+                agg['duration_sum'] += existing[3]
+                agg['duration_min'] = _min(agg['duration_min'], existing[4])
+                agg['duration_max'] = _max(agg['duration_max'], existing[5])
+                agg['tokens_sum'] += existing[6]
+                agg['cost_sum'] += existing[7]
+                agg['sketch'].merge(LatencySketch.from_json(existing[8]))
+
+            conn.execute('''
+                INSERT OR REPLACE INTO agent_metrics_rollup
+                (granularity, bucket_start, agent_name, operations, successes, duration_count,
+                 duration_sum, duration_min, duration_max, tokens_sum, cost_sum, latency_sketch)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (granularity, start, agent, agg['operations'], agg['successes'],
+                  agg['duration_count'], agg['duration_sum'], agg['duration_min'],
+                  agg['duration_max'], agg['tokens_sum'], agg['cost_sum'], agg['sketch'].to_json()))
+
+        _set_watermark(conn, 'agent_metrics', rows[-1][0])
+        folded += len(rows)
+
+
+def compact_revenue(conn: sqlite3.Connection, chunk: int = COMPACTION_CHUNK) -> int:
+    """Fold revenue rows past the watermark into the rollup tables; returns rows folded"""
+    folded = 0
+    while True:
+        last_id = _watermark(conn, 'revenue')
+        rows = conn.execute('''
+            SELECT id, source, created_ts, amount
+            FROM revenue WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, chunk)).fetchall()
+        if not rows:
+            return folded
+
+        buckets: Dict[Tuple[str, int, str], List[Any]] = {}
+        for _, source, epoch, amount in rows:
+            for granularity in GRANULARITIES:
+                key = (granularity, bucket_start(epoch or 0, granularity), source)
+                agg = buckets.setdefault(key, [0, 0.0, None, None])
+                agg[0] += 1
+                agg[1] += amount
+                agg[2] = _min(agg[2], amount)
+                agg[3] = _max(agg[3], amount)
+
+        conn.executemany('''
+            INSERT INTO revenue_rollup
+            (granularity, bucket_start, source, transactions, amount_sum, amount_min, amount_max)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(granularity, bucket_start, source) DO UPDATE SET
+                transactions = transactions + excluded.transactions,
+                amount_sum = amount_sum + excluded.amount_sum,
+                amount_min = MIN(amount_min, excluded.amount_min),
+                amount_max = MAX(amount_max, excluded.amount_max)
+        ''', [(*key, *agg) for key, agg in buckets.items()])
+
+        _set_watermark(conn, 'revenue', rows[-1][0])
+        folded += len(rows)
+
+
+def _set_watermark(conn: sqlite3.Connection, table: str, last_id: int):
+    conn.execute('INSERT OR REPLACE INTO rollup_state (source_table, last_id) VALUES (?, ?)',
+                 (table, last_id))
+
+
+def _empty_metric_bucket() -> Dict[str, Any]:
+    return {'operations': 0, 'successes': 0, 'duration_count': 0, 'duration_sum': 0.0,
+            'duration_min': None, 'duration_max': None, 'tokens_sum': 0, 'cost_sum': 0.0,
+            'sketch': LatencySketch()}
+
+
+def _min(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+ROWS MODULE
+Compact, read-only row objects for NexusDatabase result sets, the sqlite3
+row factories that build them (or the plain dicts returned by default) and
+keyset-paginated row streams with resumable cursors
+"""
+
+import base64
+import binascii
+import json
+from collections import namedtuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+class RowMixin:
+    """Dict-style access for namedtuple rows: row['id'], row.get('score'), dict(row)
+
+    A row is a tuple, so it costs one allocation and no per-row __dict__,
+    while code written against the dict results keeps working.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if isinstance(key, str) else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+    def values(self) -> tuple:
+        return tuple(self)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return zip(self._fields, self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict copy (e.g. for JSON encoding)"""
+        return dict(zip(self._fields, self))
+
+
+def _row_type(name: str, fields: str) -> type:
+    return type(name, (RowMixin, namedtuple(name, fields)), {'__slots__': ()})
+
+
+TaskRow = _row_type('TaskRow', 'id type content priority created_at')
+KnowledgeRow = _row_type('KnowledgeRow', 'id query content category confidence created_at')
+RankedKnowledgeRow = _row_type('RankedKnowledgeRow', 'id query content category confidence created_at score')
+ConversationRow = _row_type('ConversationRow', 'id user_query ai_response response_time satisfaction created_at')
+
+
+def row_factory(row_type: type, compact: bool,
+                convert: Optional[Callable[[tuple], tuple]] = None) -> Callable[[Any, tuple], Any]:
+    """sqlite3 row_factory producing row_type instances (compact) or dicts with the same keys
+
+    convert, when given, maps each raw row tuple to the row's field values first.
+    """
+    if compact:
+        make = row_type._make
+        if convert:
+            return lambda cursor, row: make(convert(row))
+        return lambda cursor, row: make(row)
+
+    fields = row_type._fields
+    if convert:
+        return lambda cursor, row: dict(zip(fields, convert(row)))
+    return lambda cursor, row: dict(zip(fields, row))
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    """Opaque, URL-safe cursor for a row's ordering key"""
+    raw = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Ordering key from encode_cursor; raises ValueError for anything else"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor!r}") from None
+    if not isinstance(key, list) or not key:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return tuple(key)
+
+
+class KeysetStream:
+    """Rows fetched batch by batch in key order, resumable from an opaque cursor
+
+    fetch(after, n) returns up to n rows ordered after the key `after` (None
+    for the start), or None when the read failed. Once iteration stops,
+    next_cursor resumes right after the last row handed out; it is None
+    when the rows are exhausted, so a page is the last one exactly when its
+    next_cursor is None (or it was cut short by limit at the very end).
+    """
+
+    def __init__(self, fetch: Callable[[Optional[tuple], int], Optional[List[Any]]],
+                 key: Callable[[Any], tuple], cursor: Optional[str] = None,
+                 limit: Optional[int] = None, batch_size: int = 500):
+        self._fetch = fetch
+        self._key = key
+        self._after = decode_cursor(cursor) if cursor else None
+        self.limit = limit
+        self.batch_size = max(1, batch_size)
+        self.exhausted = False
+        self.failed = False
+
+    def __iter__(self) -> Iterator[Any]:
+        remaining = self.limit
+        while remaining is None or remaining > 0:
+            n = self.batch_size if remaining is None else min(self.batch_size, remaining)
+            batch = self._fetch(self._after, n)
+            if batch is None:
+                self.failed = True
+                return
+            for row in batch:
+                self._after = self._key(row)
+                yield row
+            if len(batch) < n:
+                self.exhausted = True
+                return
+            if remaining is not None:
+                remaining -= n
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        if self.exhausted or self._after is None:
+            return None
+        return encode_cursor(self._after)
+
+
+def ndjson_lines(stream: KeysetStream) -> Iterable[bytes]:
+    """Encode a stream as NDJSON, one row per line, ending with a {"next_cursor": ...} line
+
+    The trailer tells clients whether (and where) to continue; a response
+    without it was cut off.
+    """
+    for row in stream:
+        yield json.dumps(row.to_dict() if isinstance(row, RowMixin) else row,
+                         default=str, ensure_ascii=False).encode('utf-8') + b'\n'
+    trailer = {'next_cursor': stream.next_cursor}
+    if stream.failed:
+        trailer['error'] = 'read failed; resume from next_cursor'
+    yield json.dumps(trailer).encode('utf-8') + b'\n'
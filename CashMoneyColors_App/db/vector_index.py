@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+VECTOR INDEX MODULE
+In-process BM25/TF-IDF retrieval over knowledge text, backed by a sparse
+term-document matrix in memory-mapped NumPy files
+"""
+
+import json
+import logging
+import math
+import re
+import shutil
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency: without NumPy the index stays disabled
+    np = None
+
+VECTOR_INDEX_AVAILABLE = np is not None
+
+INDEX_VERSION = 1
+SCORING_METHODS = ('bm25', 'tfidf')
+
+# Terms from the knowledge query count twice, matching the FTS5 bm25 column weights
+QUERY_WEIGHT = 2
+
+_TOKEN = re.compile(r'\w+')
+
+# Persisted arrays of one generation: term-major CSR postings plus per-document columns
+_ARRAYS = ('indptr', 'postings', 'tf', 'doc_ids', 'doc_len', 'doc_cat')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens"""
+    return _TOKEN.findall((text or '').lower())
+
+
+class KnowledgeVectorIndex:
+    """Sparse term-document index with vectorized top-k scoring
+
+    The base segment is a CSR matrix (one row of postings per term) stored as
+    .npy files and opened with mmap_mode='r', so a large index costs page
+    cache rather than heap. New documents go to an in-memory delta segment
+    that is searched alongside the base and merged into a new on-disk
+    generation by compact(). Removed documents are masked until then.
+    """
+
+    def __init__(self, path: Optional[str] = None, scoring: str = 'bm25',
+                 k1: float = 1.2, b: float = 0.75, max_delta_docs: int = 20000):
+        if np is None:
+            raise RuntimeError("KnowledgeVectorIndex requires NumPy")
+        if scoring not in SCORING_METHODS:
+            raise ValueError(f"Unknown scoring method: {scoring}")
+
+        self.path = Path(path) if path else None
+        self.scoring = scoring
+        self.k1 = k1
+        self.b = b
+        self.max_delta_docs = max(1, max_delta_docs)
+
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._vocab: Dict[str, int] = {}
+        self._categories: Dict[str, int] = {}
+        self._last_id = 0
+        self._set_base(self._empty_base())
+        self._clear_delta()
+
+    # -- state ---------------------------------------------------------------
+
+    @staticmethod
+    def _empty_base() -> Dict[str, Any]:
+        return {
+            'indptr': np.zeros(1, dtype=np.int64),
+            'postings': np.zeros(0, dtype=np.int32),
+            'tf': np.zeros(0, dtype=np.float32),
+            'doc_ids': np.zeros(0, dtype=np.int64),
+            'doc_len': np.zeros(0, dtype=np.float32),
+            'doc_cat': np.zeros(0, dtype=np.int32),
+        }
+
+    def _set_base(self, arrays: Dict[str, Any]):
+        self._base = arrays
+        self._base_terms = len(arrays['indptr']) - 1
+        self._base_docs = len(arrays['doc_ids'])
+        self._base_deleted = np.zeros(self._base_docs, dtype=bool)
+        self._base_len_sum = float(arrays['doc_len'].sum(dtype=np.float64))
+        self._positions = None  # knowledge id -> document index, built on first remove()
+
+    def _clear_delta(self):
+        self._delta_postings: Dict[int, Tuple[List[int], List[float]]] = {}
+        self._delta_ids: List[int] = []
+        self._delta_len: List[float] = []
+        self._delta_cat: List[int] = []
+        self._delta_deleted: set = set()
+
+    @property
+    def last_id(self) -> int:
+        """Highest knowledge id added to the index"""
+        return self._last_id
+
+    def __len__(self) -> int:
+        return (self._base_docs - int(self._base_deleted.sum())
+                + len(self._delta_ids) - len(self._delta_deleted))
+
+    # -- updates -------------------------------------------------------------
+
+    def _term_frequencies(self, query: str, response: str) -> Dict[int, float]:
+        counts: Dict[int, float] = {}
+        for weight, text in ((QUERY_WEIGHT, query), (1, response)):
+            for term in tokenize(text):
+                term_id = self._vocab.setdefault(term, len(self._vocab))
+                counts[term_id] = counts.get(term_id, 0) + weight
+        return counts
+
+    def _category_code(self, category: Optional[str]) -> int:
+        return self._categories.setdefault(category or 'general', len(self._categories))
+
+    def add(self, knowledge_id: int, query: str, response: str, category: Optional[str] = 'general'):
+        """Index one knowledge row; ids at or below last_id are already indexed and ignored"""
+        with self._lock:
+            if knowledge_id <= self._last_id:
+                return
+            doc = self._base_docs + len(self._delta_ids)
+            counts = self._term_frequencies(query, response)
+            for term_id, tf in counts.items():
+                docs, tfs = self._delta_postings.setdefault(term_id, ([], []))
+                docs.append(doc)
+                tfs.append(tf)
+            self._delta_ids.append(knowledge_id)
+            self._delta_len.append(sum(counts.values()))
+            self._delta_cat.append(self._category_code(category))
+            self._last_id = knowledge_id
+
+            if len(self._delta_ids) >= self.max_delta_docs:
+                self.compact()
+
+    def remove(self, knowledge_ids: Iterable[int]):
+        """Mask documents (deleted or replaced knowledge rows) out of search results"""
+        with self._lock:
+            if self._positions is None:
+                self._positions = {int(k): i for i, k in enumerate(self._base['doc_ids'])}
+            delta_positions = {k: i for i, k in enumerate(self._delta_ids)}
+            for knowledge_id in knowledge_ids:
+                if knowledge_id in delta_positions:
+                    self._delta_deleted.add(self._base_docs + delta_positions[knowledge_id])
+                elif knowledge_id in self._positions:
+                    self._base_deleted[self._positions[knowledge_id]] = True
+
+    def build(self, rows: Iterable[Sequence[Any]]):
+        """Replace the index with (id, query, response, category) rows, in id order"""
+        with self._lock:
+            self._vocab, self._categories, self._last_id = {}, {}, 0
+            terms, docs, tfs = array('i'), array('i'), array('f')
+            doc_ids, doc_len, doc_cat = array('q'), array('f'), array('i')
+
+            for doc, (knowledge_id, query, response, category) in enumerate(rows):
+                counts = self._term_frequencies(query, response)
+                terms.extend(counts.keys())
+                docs.extend([doc] * len(counts))
+                tfs.extend(counts.values())
+                doc_ids.append(knowledge_id)
+                doc_len.append(sum(counts.values()))
+                doc_cat.append(self._category_code(category))
+                self._last_id = max(self._last_id, knowledge_id)
+
+            self._set_base(self._csr(
+                np.frombuffer(terms, dtype=np.int32), np.frombuffer(docs, dtype=np.int32),
+                np.frombuffer(tfs, dtype=np.float32), np.frombuffer(doc_ids, dtype=np.int64),
+                np.frombuffer(doc_len, dtype=np.float32), np.frombuffer(doc_cat, dtype=np.int32)))
+            self._clear_delta()
+            self._save()
+
+    def compact(self):
+        """Merge the delta segment into the base, dropping removed documents, and persist it"""
+        with self._lock:
+            base = self._base
+            counts = np.diff(base['indptr'])
+            terms = [np.repeat(np.arange(self._base_terms, dtype=np.int32), counts)]
+            docs, tfs = [np.asarray(base['postings'])], [np.asarray(base['tf'])]
+            for term_id, (delta_docs, delta_tfs) in self._delta_postings.items():
+                terms.append(np.full(len(delta_docs), term_id, dtype=np.int32))
+                docs.append(np.asarray(delta_docs, dtype=np.int32))
+                tfs.append(np.asarray(delta_tfs, dtype=np.float32))
+            terms, docs, tfs = np.concatenate(terms), np.concatenate(docs), np.concatenate(tfs)
+
+            deleted = np.concatenate([self._base_deleted, np.zeros(len(self._delta_ids), dtype=bool)])
+            deleted[list(self._delta_deleted)] = True
+            doc_ids = np.concatenate([base['doc_ids'], np.asarray(self._delta_ids, dtype=np.int64)])
+            doc_len = np.concatenate([base['doc_len'], np.asarray(self._delta_len, dtype=np.float32)])
+            doc_cat = np.concatenate([base['doc_cat'], np.asarray(self._delta_cat, dtype=np.int32)])
+
+            # Renumber surviving documents densely
+            keep_docs = ~deleted
+            renumber = np.cumsum(keep_docs, dtype=np.int64) - 1
+            keep = keep_docs[docs]
+            self._set_base(self._csr(terms[keep], renumber[docs[keep]].astype(np.int32), tfs[keep],
+                                     doc_ids[keep_docs], doc_len[keep_docs], doc_cat[keep_docs]))
+            self._clear_delta()
+            self._save()
+
+    def flush(self):
+        """Persist pending additions and removals (no-op when there are none)"""
+        with self._lock:
+            if self._delta_ids or self._base_deleted.any():
+                self.compact()
+
+    def _csr(self, terms, docs, tfs, doc_ids, doc_len, doc_cat) -> Dict[str, Any]:
+        """Sort (term, doc, tf) triplets into term-major CSR arrays"""
+        order = np.lexsort((docs, terms))
+        indptr = np.zeros(len(self._vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self._vocab)), out=indptr[1:])
+        return {
+            'indptr': indptr,
+            'postings': docs[order].astype(np.int32),
+            'tf': tfs[order].astype(np.float32),
+            'doc_ids': np.ascontiguousarray(doc_ids, dtype=np.int64),
+            'doc_len': np.ascontiguousarray(doc_len, dtype=np.float32),
+            'doc_cat': np.ascontiguousarray(doc_cat, dtype=np.int32),
+        }
+
+    # -- search --------------------------------------------------------------
+
+    def search(self, text: str, k: int = 5, category: Optional[str] = None) -> List[Tuple[int, float]]:
+        """Top-k (knowledge_id, score) pairs for free text, best first"""
+        with self._lock:
+            term_ids = {self._vocab[t] for t in tokenize(text) if t in self._vocab}
+            if not term_ids or k <= 0:
+                return []
+            category_code = None
+            if category is not None:
+                category_code = self._categories.get(category)
+                if category_code is None:
+                    return []
+
+            base, n_base = self._base, self._base_docs
+            n_docs = n_base + len(self._delta_ids)
+            live = len(self)
+            if not live:
+                return []
+            avg_len = (self._base_len_sum + sum(self._delta_len)) / n_docs or 1.0
+            delta_len = np.asarray(self._delta_len, dtype=np.float32)
+            scores = np.zeros(n_docs, dtype=np.float32)
+
+            for term_id in term_ids:
+                if term_id < self._base_terms:
+                    lo, hi = base['indptr'][term_id], base['indptr'][term_id + 1]
+                    base_docs, base_tf = base['postings'][lo:hi], base['tf'][lo:hi]
+                else:
+                    base_docs = base_tf = np.zeros(0, dtype=np.int32)
+                delta_docs, delta_tf = self._delta_postings.get(term_id, ((), ()))
+
+                df = len(base_docs) + len(delta_docs)
+                if not df:
+                    continue
+                idf = self._idf(df, n_docs)
+                if len(base_docs):
+                    scores[base_docs] += self._weights(base_tf, base['doc_len'][base_docs], idf, avg_len)
+                if delta_docs:
+                    delta_docs = np.asarray(delta_docs, dtype=np.int64)
+                    scores[delta_docs] += self._weights(np.asarray(delta_tf, dtype=np.float32),
+                                                        delta_len[delta_docs - n_base], idf, avg_len)
+
+            scores[:n_base][self._base_deleted] = 0
+            if self._delta_deleted:
+                scores[list(self._delta_deleted)] = 0
+            if category_code is not None:
+                scores[:n_base][base['doc_cat'] != category_code] = 0
+                scores[n_base:][np.asarray(self._delta_cat, dtype=np.int32) != category_code] = 0
+
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+            return [(self._doc_id(int(doc)), float(scores[doc])) for doc in candidates]
+
+    def _idf(self, df: int, n_docs: int) -> float:
+        if self.scoring == 'bm25':
+            return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        return math.log((1 + n_docs) / (1 + df)) + 1
+
+    def _weights(self, tf, doc_len, idf: float, avg_len: float):
+        if self.scoring == 'bm25':
+            norm = self.k1 * (1 - self.b + self.b * doc_len / avg_len)
+            return idf * tf * (self.k1 + 1) / (tf + norm)
+        return idf * (1 + np.log(tf)) / np.sqrt(np.maximum(doc_len, 1))
+
+    def _doc_id(self, doc: int) -> int:
+        if doc < self._base_docs:
+            return int(self._base['doc_ids'][doc])
+        return self._delta_ids[doc - self._base_docs]
+
+    # -- persistence ---------------------------------------------------------
+
+    def _save(self):
+        """Write the base segment as a new generation and switch to it (delta must be empty)"""
+        if not self.path:
+            return
+        with self._lock:
+            self._generation += 1
+            target = self.path / f"gen-{self._generation:06d}"
+            target.mkdir(parents=True, exist_ok=True)
+            for name in _ARRAYS:
+                np.save(target / f"{name}.npy", np.asarray(self._base[name]))
+            meta = {
+                'version': INDEX_VERSION,
+                'generation': self._generation,
+                'last_id': self._last_id,
+                'scoring': self.scoring,
+                'vocabulary': sorted(self._vocab, key=self._vocab.get),
+                'categories': sorted(self._categories, key=self._categories.get),
+            }
+            (target / 'meta.json').write_text(json.dumps(meta))
+            (self.path / 'CURRENT.tmp').write_text(target.name)
+            (self.path / 'CURRENT.tmp').replace(self.path / 'CURRENT')
+
+            # Re-open the new generation memory-mapped
+            self._load_generation(target, meta)
+            self._remove_old_generations(target.name)
+
+    def load(self) -> bool:
+        """Open the current on-disk generation; False when there is none or it is unusable"""
+        if not self.path or not (self.path / 'CURRENT').exists():
+            return False
+        with self._lock:
+            try:
+                target = self.path / (self.path / 'CURRENT').read_text().strip()
+                meta = json.loads((target / 'meta.json').read_text())
+                if meta.get('version') != INDEX_VERSION:
+                    return False
+                self._load_generation(target, meta)
+                self._clear_delta()
+                return True
+            except (OSError, ValueError) as e:
+                logging.warning(f"Knowledge vector index at {self.path} unreadable, rebuilding: {e}")
+                return False
+
+    def _load_generation(self, target: Path, meta: Dict[str, Any]):
+        self._generation = meta['generation']
+        self._vocab = {term: i for i, term in enumerate(meta['vocabulary'])}
+        self._categories = {category: i for i, category in enumerate(meta['categories'])}
+        arrays = {name: np.load(target / f"{name}.npy", mmap_mode='r') for name in _ARRAYS}
+        self._set_base(arrays)
+        self._last_id = meta['last_id']
+
+    def _remove_old_generations(self, current: str):
+        for old in self.path.glob('gen-*'):
+            if old.name != current:
+                # Still-mapped files cannot be deleted on Windows; a later save retries
+                shutil.rmtree(old, ignore_errors=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index size statistics"""
+        with self._lock:
+            return {
+                'documents': len(self),
+                'base_documents': self._base_docs,
+                'delta_documents': len(self._delta_ids),
+                'terms': len(self._vocab),
+                'postings': len(self._base['postings']),
+                'generation': self._generation,
+                'last_id': self._last_id,
+                'scoring': self.scoring
+            }
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+WORKFLOWS MODULE
+Task dependency graphs (fan-out / fan-in) for the NexusDatabase task queue,
+with critical-path reporting
+"""
+
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+WORKFLOW_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS workflows (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        created_ts REAL NOT NULL
+    );
+
+    -- task_id runs only after depends_on has completed
+    CREATE TABLE IF NOT EXISTS task_dependencies (
+        task_id INTEGER NOT NULL,
+        depends_on INTEGER NOT NULL,
+        PRIMARY KEY (task_id, depends_on)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_task_dependencies_parent ON task_dependencies(depends_on);
+    CREATE INDEX IF NOT EXISTS idx_tasks_workflow ON tasks(workflow_id) WHERE workflow_id IS NOT NULL;
+
+    -- A completed task unblocks its dependents
+    CREATE TRIGGER IF NOT EXISTS workflow_task_completed AFTER UPDATE OF status ON tasks
+    WHEN new.status = 'completed' AND old.status IS NOT 'completed' BEGIN
+        UPDATE tasks SET waiting_on = waiting_on - 1
+        WHERE id IN (SELECT task_id FROM task_dependencies WHERE depends_on = new.id);
+    END;
+
+    -- A failed task fails everything downstream of it (recursively, via recursive_triggers)
+    CREATE TRIGGER IF NOT EXISTS workflow_task_failed AFTER UPDATE OF status ON tasks
+    WHEN new.status = 'failed' AND old.status IS NOT 'failed' BEGIN
+        UPDATE tasks SET status = 'failed', updated_at = CURRENT_TIMESTAMP,
+            error_message = 'Dependency ' || new.id || ' failed'
+        WHERE status = 'pending'
+          AND id IN (SELECT task_id FROM task_dependencies WHERE depends_on = new.id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS workflow_task_delete AFTER DELETE ON tasks BEGIN
+        DELETE FROM task_dependencies WHERE task_id = old.id;
+    END;
+'''
+
+
+def topological_order(steps: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Step names ordered so every step comes after the steps it runs 'after'
+
+    Raises ValueError for unknown dependencies and cycles.
+    """
+    order, state = [], {}
+
+    def visit(name: str, path: tuple):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"Workflow has a cycle: {' -> '.join(path + (name,))}")
+        state[name] = 'visiting'
+        for parent in steps[name].get('after', ()):
+            if parent not in steps:
+                raise ValueError(f"Step {name!r} depends on unknown step {parent!r}")
+            visit(parent, path + (name,))
+        state[name] = 'done'
+        order.append(name)
+
+    for name in steps:
+        visit(name, ())
+    return order
+
+
+def critical_path(tasks: Iterable[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Any]:
+    """Longest chain of task run times through the graph
+
+    Each task needs 'step', 'depends_on' (step names), 'started_ts' and
+    'finished_ts'; tasks still running count up to `now`, tasks not started
+    count as zero. Returns the steps on the chain and its length in seconds,
+    next to the total run time of all tasks (the sequential cost).
+    """
+    now = time.time() if now is None else now
+    tasks = {task['step']: task for task in tasks}
+
+    def duration(task):
+        if task['started_ts'] is None:
+            return 0.0
+        return max(0.0, (task['finished_ts'] or now) - task['started_ts'])
+
+    longest: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for step in topological_order({name: {'after': task['depends_on']} for name, task in tasks.items()}):
+        parent = max(tasks[step]['depends_on'], key=lambda name: longest[name], default=None)
+        longest[step] = duration(tasks[step]) + (longest[parent] if parent else 0.0)
+        previous[step] = parent
+
+    end = max(longest, key=longest.get, default=None)
+    path = []
+    while end is not None:
+        path.append(end)
+        end = previous[end]
+    return {
+        'critical_path': path[::-1],
+        'critical_path_seconds': longest[path[0]] if path else 0.0,
+        'work_seconds': sum(duration(task) for task in tasks.values())
+    }
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+WRITE BUFFER MODULE
+Write-behind batching for high-volume, fire-and-forget database inserts
+"""
+
+import sqlite3
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+# Durability level -> PRAGMA synchronous used while a batch is committed
+DURABILITY_LEVELS = {
+    'batch': 'FULL',   # fsync once per flushed batch
+    'async': 'OFF'     # leave flushing to the OS; fastest, may lose the last batches on power loss
+}
+
+
+class WriteBehindBuffer:
+    """Collects single-row writes and commits them in one transaction per batch
+
+    A batch is flushed when it reaches max_rows, when max_delay seconds have
+    passed since the first buffered row, or when the buffer is closed.
+    After each flush, on_flush (if given) is called with the set of tables
+    written, e.g. to invalidate cached reads of them.
+    """
+
+    def __init__(self, pool, max_rows: int = 500, max_delay: float = 1.0,
+                 durability: str = 'batch', on_flush: Optional[Callable[[Set[str]], None]] = None):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability level: {durability}")
+
+        self.pool = pool
+        self.max_rows = max(1, max_rows)
+        self.max_delay = max_delay
+        self.durability = durability
+        self.on_flush = on_flush
+
+        self._rows: List[Tuple[str, str, Sequence[Any]]] = []
+        self._tables: Counter = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = True
+
+        self.stats = {
+            'rows_buffered': 0,
+            'rows_flushed': 0,
+            'rows_dropped': 0,
+            'batches': 0,
+            'last_flush_seconds': 0.0
+        }
+
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True,
+                                        name='nexus-write-behind')
+        self._thread.start()
+
+    def submit(self, table: str, sql: str, params: Sequence[Any]):
+        """Queue a write; it becomes visible to readers after the next flush"""
+        with self._lock:
+            self._rows.append((table, sql, params))
+            self._tables[table] += 1
+            self.stats['rows_buffered'] += 1
+            full = len(self._rows) >= self.max_rows
+            first = len(self._rows) == 1
+
+        if full or first:
+            # Wake the flusher to flush now (full) or to start the max_delay timer (first row)
+            self._wakeup.set()
+
+    def pending(self, table: Optional[str] = None) -> int:
+        """Number of buffered rows, optionally for a single table"""
+        with self._lock:
+            return self._tables[table] if table else len(self._rows)
+
+    def flush(self) -> int:
+        """Commit all buffered rows in one transaction; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                self._tables.clear()
+            if not rows:
+                return 0
+
+            start = time.perf_counter()
+            written = self._commit(rows)
+            self.stats['rows_flushed'] += written
+            self.stats['rows_dropped'] += len(rows) - written
+            self.stats['batches'] += 1
+            self.stats['last_flush_seconds'] = time.perf_counter() - start
+            if self.on_flush and written:
+                self.on_flush({table for table, _, _ in rows})
+            return written
+
+    def _commit(self, rows: List[Tuple[str, str, Sequence[Any]]]) -> int:
+        """Write rows, grouping consecutive identical statements into executemany calls"""
+        with self.pool.connection() as conn:
+            if conn.in_transaction:
+                # Flushed from inside a caller's transaction: join it, the caller commits
+                for sql, batch in _group_statements(rows):
+                    conn.executemany(sql, batch)
+                return len(rows)
+
+            previous = conn.execute('PRAGMA synchronous').fetchone()[0]
+            conn.execute(f'PRAGMA synchronous = {DURABILITY_LEVELS[self.durability]}')
+            try:
+                try:
+                    conn.execute('BEGIN')
+                    for sql, batch in _group_statements(rows):
+                        conn.executemany(sql, batch)
+                    conn.commit()
+                    return len(rows)
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    logging.warning(f"Batched write failed ({e}), retrying row by row")
+
+                # Salvage the good rows of a batch that contains a bad one
+                written = 0
+                conn.execute('BEGIN')
+                for _, sql, params in rows:
+                    try:
+                        conn.execute(sql, params)
+                        written += 1
+                    except sqlite3.Error as e:
+                        logging.error(f"Dropped buffered write: {e}")
+                conn.commit()
+                return written
+            finally:
+                conn.execute(f'PRAGMA synchronous = {previous}')
+
+    def _flush_loop(self):
+        """Background flusher: waits for the first row, then for max_delay or a full batch"""
+        while self._running:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._running:
+                break
+
+            deadline = time.monotonic() + self.max_delay
+            while self._running and self.pending() < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._wakeup.wait(remaining):
+                    break
+            self._wakeup.clear()
+
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Write-behind flush failed: {e}")
+
+    def close(self):
+        """Stop the flusher and write out anything still buffered"""
+        self._running = False
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get buffer statistics"""
+        return {
+            **self.stats,
+            'pending': self.pending(),
+            'durability': self.durability,
+            'max_rows': self.max_rows,
+            'max_delay': self.max_delay
+        }
+
+
+def _group_statements(rows):
+    """Yield (sql, [params, ...]) for each run of consecutive rows sharing a statement"""
+    current_sql, batch = None, []
+    for _, sql, params in rows:
+        if sql != current_sql and batch:
+            yield current_sql, batch
+            batch = []
+        current_sql = sql
+        batch.append(params)
+    if batch:
+        yield current_sql, batch
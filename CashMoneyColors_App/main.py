@@ -27,7 +27,10 @@ from core.services.gmail_service import GmailService
 from core.services.event_service import EventService
 from ai.manager import AIManager
 from ai.grok_ai import GrokAI
-from db.manager import get_database, NexusDatabase
+from ai.response_cache import get_response_cache
+from db.manager import get_database
+from db.backup import BackupScheduler
+from db.maintenance import DatabaseMaintenance
 from ui.main_window import MainWindow
 from utils.logger import setup_logging
 from utils.helpers import safe_execute, create_directories, config_manager
@@ -45,6 +48,8 @@ class CashMoneyColorsApp:
         self.ai_manager = None
         self.chatbot = None
         self.gmail_service = None
+        self.backup_scheduler = None
+        self.db_maintenance = None
 
     def setup_bootstrap(self):
         """Setup the application bootstrap components"""
@@ -59,7 +64,9 @@ class CashMoneyColorsApp:
         ])
 
         # Initialize core components
-        self.db = safe_execute(NexusDatabase, 'data/nexus.db')
+        self.db = safe_execute(get_database, 'data/nexus.db', pool_mode='thread',
+                               vector_index=True, query_cache=True, compress_payloads=True,
+                               tuning_profile='balanced', task_doorbell=True)
         if not self.db:
             logging.error("Failed to initialize database")
             return False
@@ -67,6 +74,9 @@ class CashMoneyColorsApp:
         self.event_service = safe_execute(EventService)
         self.gmail_service = safe_execute(GmailService, API_CONFIG.gmail_credentials)
 
+        # Shared LLM response cache (before any agent or the chatbot is created)
+        get_response_cache('data/llm_cache.db', max_temperature=API_CONFIG.response_cache_max_temperature)
+
         # Setup AI Manager
         self.ai_manager = safe_execute(AIManager, self.db)
         if not self.ai_manager:
@@ -171,6 +181,14 @@ class CashMoneyColorsApp:
         # AI coordination
         threading.Thread(target=self._ai_coordination, daemon=True).start()
 
+        # Online database backups
+        self.backup_scheduler = BackupScheduler(self.db, 'backups', interval=API_CONFIG.backup_frequency)
+        self.backup_scheduler.start()
+
+        # ANALYZE / incremental vacuum while the database is idle
+        self.db_maintenance = DatabaseMaintenance(self.db)
+        self.db_maintenance.start()
+
     def _revenue_monitor(self):
         """Monitor revenue in background"""
         while True:
@@ -184,7 +202,9 @@ class CashMoneyColorsApp:
         """Monitor system health"""
         while True:
             try:
-                # Implement health monitoring logic here
+                # Correct any drift in the O(1) stats counters (hourly)
+                if self.db:
+                    self.db.maybe_reconcile_stats()
                 time.sleep(300)  # Health check every 5 minutes
             except Exception as e:
                 logging.error(f"Health monitor error: {e}")
@@ -204,8 +224,13 @@ class CashMoneyColorsApp:
         try:
             if self.ai_manager:
                 self.ai_manager.shutdown()
+            if self.backup_scheduler:
+                self.backup_scheduler.stop()
+            if self.db_maintenance:
+                self.db_maintenance.stop()
             if self.db:
                 self.db.close()
+            get_response_cache().close()
         except Exception as e:
             logging.error(f"Error during shutdown: {e}")
 
@@ -588,6 +588,7 @@ Components Status:
             stats_text += f"Total Conversations: {stats.get('total_conversations', 0)}\n"
             stats_text += f"Avg Response Time: {stats.get('avg_response_time', 0):.2f}s\n"
             stats_text += f"Tasks: {stats.get('total_tasks', 0)} total ({stats.get('pending_tasks', 0)} pending)\n"
+            stats_text += f"Duplicate Tasks Skipped: {stats.get('deduplicated_tasks', 0)}\n"
             stats_text += f"Revenue: €{stats.get('total_revenue', 0):.2f} total, €{stats.get('recent_revenue', 0):.2f} this month\n"
 
             # AI Performance (if available)
@@ -6,9 +6,13 @@ Provides utility functions for the autonomous AI system
 
 import os
 import time
+import asyncio
+import logging
+import threading
 import traceback
 import functools
-from typing import Any, Callable, Optional, List, Dict
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Optional, List, Dict, Tuple
 from pathlib import Path
 import json
 
@@ -211,44 +215,88 @@ def calculate_similarity(text1: str, text2: str) -> float:
 
     return intersection / union if union > 0 else 0.0
 
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second
+
+    Every operation is O(1): the balance is brought up to date from the
+    elapsed time when it is read. reserve() may take the balance negative;
+    the returned wait is how long the caller must sleep before using its
+    tokens, which queues concurrent callers fairly without a list of calls.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> float:
+        """Tokens available right now (negative while reservations are outstanding)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens
+
+    def wait_time(self, amount: float = 1) -> float:
+        """Seconds until `amount` tokens would be available"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (amount - self.tokens) / self.rate)
+
+    def reserve(self, amount: float = 1) -> float:
+        """Take `amount` tokens now and return the seconds to wait before using them"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount: float):
+        """Return tokens (negative amounts take more), e.g. after a usage estimate was corrected"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def set_rate(self, rate: float):
+        """Change the refill rate; tokens accrued so far are credited at the old rate"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    def drain(self):
+        """Empty the bucket"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0)
+
 class RateLimiter:
-    """Rate limiting utility"""
+    """Rate limiting utility (a token bucket of calls_per_minute calls)"""
 
     def __init__(self, calls_per_minute: int = 60):
         self.calls_per_minute = calls_per_minute
-        self.calls = []
         self.minute_window = 60
+        self.bucket = TokenBucket(calls_per_minute, calls_per_minute / self.minute_window)
 
     def can_make_call(self) -> bool:
         """Check if a call can be made"""
-        now = time.time()
-
-        # Remove calls outside the window
-        self.calls = [call_time for call_time in self.calls
-                     if now - call_time < self.minute_window]
-
-        return len(self.calls) < self.calls_per_minute
+        return self.bucket.available() >= 1
 
     def record_call(self):
         """Record a call"""
-        self.calls.append(time.time())
+        self.bucket.reserve(1)
 
     def get_remaining_calls(self) -> int:
         """Get remaining calls in current window"""
-        now = time.time()
-        self.calls = [call_time for call_time in self.calls
-                     if now - call_time < self.minute_window]
-
-        return self.calls_per_minute - len(self.calls)
+        return max(0, int(self.bucket.available()))
 
     def wait_for_call(self):
         """Wait until a call can be made"""
-        if not self.can_make_call():
-            now = time.time()
-            oldest_call = min(self.calls) if self.calls else now
-            wait_time = self.minute_window - (now - oldest_call)
-            if wait_time > 0:
-                time.sleep(min(wait_time, 10))  # Max wait 10 seconds
+        wait_time = self.bucket.wait_time(1)
+        if wait_time > 0:
+            time.sleep(wait_time)
 
 # Global rate limiter for API calls
 api_rate_limiter = RateLimiter(calls_per_minute=60)
@@ -266,6 +314,242 @@ def safe_api_call(func: Callable, *args, **kwargs):
         print(f"API call failed: {e}")
         return None
 
+# Upper bounds (seconds) of the wait-time histogram buckets; the last bucket is open-ended
+WAIT_BUCKETS = (0.0, 0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+# Per-provider quotas: requests per minute and tokens (prompt + completion) per minute.
+# Set them to the account's real limits with configure_rate_limiter().
+PROVIDER_RATE_LIMITS: Dict[str, Dict[str, Optional[int]]] = {
+    'grok': {'requests_per_minute': 60, 'tokens_per_minute': 100000},
+    'claude': {'requests_per_minute': 50, 'tokens_per_minute': 40000},
+    'openai': {'requests_per_minute': 60, 'tokens_per_minute': 90000},
+    'deepseek': {'requests_per_minute': 60, 'tokens_per_minute': None},
+}
+DEFAULT_RATE_LIMIT = {'requests_per_minute': 60, 'tokens_per_minute': None}
+
+class RateLimitExceeded(Exception):
+    """Raised when a rate limiter cannot grant a request within its timeout"""
+
+class ProviderRateLimiter:
+    """Request and token budgets for one LLM provider
+
+    Two token buckets (requests/min and tokens/min) hold at most one
+    minute of quota, so bursts never exceed what the provider allows.
+    acquire() reserves a request and the estimated tokens and sleeps until
+    both are covered; acquire_async() does the same with asyncio.sleep, so
+    threads and asyncio tasks can share one limiter.
+
+    A 429 (rate_limited()) pauses every caller until Retry-After, or an
+    exponential backoff when the provider sends none, and cuts the refill
+    rate by backoff_factor; each success raises it again by `recovery`
+    (additive increase), so the limiter settles just under the real ceiling.
+    """
+
+    def __init__(self, name: str, requests_per_minute: int = 60, tokens_per_minute: Optional[int] = None,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0, backoff_factor: float = 0.5,
+                 recovery: float = 0.05, min_scale: float = 0.1):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.backoff_factor = backoff_factor
+        self.recovery = recovery
+        self.min_scale = min_scale
+
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute else None
+        self.scale = 1.0
+        self.blocked_until = 0.0
+        self.strikes = 0
+
+        self._lock = threading.Lock()
+        self.stats = {'acquired': 0, 'rejected': 0, 'rate_limited': 0, 'waited': 0.0}
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def _reserve(self, tokens: int, timeout: Optional[float]) -> float:
+        """Reserve a request and `tokens`; returns the wait, or raises RateLimitExceeded past timeout"""
+        # A request larger than a minute of token quota waits for a full bucket
+        tokens = min(tokens, self.tokens.capacity) if self.tokens else 0
+        with self._lock:
+            blocked = max(0.0, self.blocked_until - time.monotonic())
+            wait = max(blocked, self.requests.wait_time(1), self.tokens.wait_time(tokens) if tokens else 0.0)
+            if timeout is not None and wait > timeout:
+                self.stats['rejected'] += 1
+                raise RateLimitExceeded(f"{self.name}: no budget within {timeout:.1f}s (needs {wait:.1f}s)")
+            wait = max(blocked, self.requests.reserve(1), self.tokens.reserve(tokens) if tokens else 0.0)
+            self.stats['acquired'] += 1
+            self.stats['waited'] += wait
+            self.wait_histogram[self._bucket_index(wait)] += 1
+            return wait
+
+    @staticmethod
+    def _bucket_index(wait: float) -> int:
+        for index, bound in enumerate(WAIT_BUCKETS):
+            if wait <= bound:
+                return index
+        return len(WAIT_BUCKETS)
+
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> float:
+        """Block until a request with `tokens` estimated tokens may be sent; returns seconds waited"""
+        wait = self._reserve(tokens, timeout)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 0, timeout: Optional[float] = None) -> float:
+        """acquire() for asyncio tasks: waits without blocking the event loop"""
+        wait = self._reserve(tokens, timeout)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def record_usage(self, actual_tokens: int, estimated_tokens: int = 0):
+        """Correct the token budget once the response reports the tokens actually used"""
+        if self.tokens:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+
+    def succeeded(self):
+        """Record a successful call: recover the refill rate additively"""
+        with self._lock:
+            self.strikes = 0
+            if self.scale < 1.0:
+                self._set_scale(min(1.0, self.scale + self.recovery))
+
+    def rate_limited(self, retry_after: Optional[float] = None) -> float:
+        """Record a 429: pause all callers and cut the refill rate; returns the pause in seconds"""
+        with self._lock:
+            self.strikes += 1
+            self.stats['rate_limited'] += 1
+            if retry_after is None:
+                retry_after = min(self.backoff_max, self.backoff_base * 2 ** (self.strikes - 1))
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self._set_scale(max(self.min_scale, self.scale * self.backoff_factor))
+            # No burst once the pause ends: requests resume at the reduced rate
+            self.requests.drain()
+            return retry_after
+
+    def _set_scale(self, scale: float):
+        self.scale = scale
+        self.requests.set_rate(self.requests_per_minute / 60 * scale)
+        if self.tokens:
+            self.tokens.set_rate(self.tokens_per_minute / 60 * scale)
+
+    def get_budget(self) -> Dict[str, Any]:
+        """Requests and tokens available now, the rate scale and any 429 pause"""
+        return {
+            'requests_available': self.requests.available(),
+            'tokens_available': self.tokens.available() if self.tokens else None,
+            'scale': self.scale,
+            'blocked_for': max(0.0, self.blocked_until - time.monotonic()),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters, budget and the wait-time histogram (bucket upper bound -> count)"""
+        with self._lock:
+            labels = [f"<={bound:g}s" for bound in WAIT_BUCKETS] + [f">{WAIT_BUCKETS[-1]:g}s"]
+            stats = {**self.stats, 'wait_histogram': dict(zip(labels, self.wait_histogram)),
+                     'requests_per_minute': self.requests_per_minute,
+                     'tokens_per_minute': self.tokens_per_minute}
+        stats['budget'] = self.get_budget()
+        return stats
+
+_rate_limiters: Dict[str, ProviderRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str) -> ProviderRateLimiter:
+    """Get the shared limiter for a provider, created from PROVIDER_RATE_LIMITS on first use"""
+    limiter = _rate_limiters.get(provider)
+    if limiter is None:
+        with _rate_limiters_lock:
+            limiter = _rate_limiters.get(provider)
+            if limiter is None:
+                limits = PROVIDER_RATE_LIMITS.get(provider, DEFAULT_RATE_LIMIT)
+                limiter = _rate_limiters[provider] = ProviderRateLimiter(provider, **limits)
+    return limiter
+
+def configure_rate_limiter(provider: str, requests_per_minute: int,
+                           tokens_per_minute: Optional[int] = None, **options) -> ProviderRateLimiter:
+    """Replace a provider's limiter with one for the given quota"""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters[provider] = ProviderRateLimiter(provider, requests_per_minute,
+                                                                 tokens_per_minute, **options)
+    return limiter
+
+def parse_retry_after(value: Any) -> Optional[float]:
+    """Seconds from a Retry-After header value (delta-seconds or HTTP date)"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def rate_limit_retry_after(error: Exception) -> Tuple[bool, Optional[float]]:
+    """(is the error a 429, Retry-After seconds if the response carried one)"""
+    response = getattr(error, 'response', None)
+    status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    if status != 429 and type(error).__name__ != 'RateLimitError':
+        return False, None
+    headers = getattr(response, 'headers', None) or {}
+    return True, parse_retry_after(headers.get('retry-after') or headers.get('Retry-After'))
+
+def estimate_request_tokens(request: Dict[str, Any]) -> int:
+    """Rough token count of a chat request: ~4 characters per prompt token plus max_tokens"""
+    chars = len(str(request.get('system') or ''))
+    for message in request.get('messages') or ():
+        content = message.get('content') if isinstance(message, dict) else message
+        chars += len(str(content or ''))
+    return chars // 4 + int(request.get('max_tokens') or 0)
+
+def response_tokens(response: Any) -> Optional[int]:
+    """Tokens used as reported by an OpenAI-style or Anthropic-style response"""
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return None
+    total = getattr(usage, 'total_tokens', None)
+    if total is not None:
+        return total
+    prompt, completion = getattr(usage, 'input_tokens', None), getattr(usage, 'output_tokens', None)
+    return prompt + completion if prompt is not None and completion is not None else None
+
+def rate_limited_call(provider: str, func: Callable, *args, max_retries: int = 3,
+                      max_wait: Optional[float] = None, **request):
+    """Call a provider API within its rate limits, retrying 429s after the backoff
+
+    The request's tokens are estimated from its messages and max_tokens,
+    then corrected from the response's usage (or refunded when the call
+    fails). With max_wait set, RateLimitExceeded is raised instead of
+    sleeping longer than max_wait for the budget, e.g. past a task lease.
+    """
+    limiter = get_rate_limiter(provider)
+    estimate = estimate_request_tokens(request)
+    for attempt in range(max_retries + 1):
+        limiter.acquire(estimate, timeout=max_wait)
+        try:
+            response = func(*args, **request)
+        except Exception as e:
+            limited, retry_after = rate_limit_retry_after(e)
+            if not limited:
+                # The provider never processed the request
+                limiter.record_usage(0, estimate)
+                raise
+            pause = limiter.rate_limited(retry_after)
+            if attempt == max_retries:
+                raise
+            logging.warning(f"{provider} rate limited, retrying in {pause:.2f}s")
+            continue
+        limiter.succeeded()
+        used = response_tokens(response)
+        if used is not None:
+            limiter.record_usage(used, estimate)
+        return response
+
+
 class ConfigManager:
     """Manage application configuration"""
 
@@ -5,24 +5,38 @@ RESTful API Server für Live-Dashboard-Zugriff und System-Monitoring
 Bietet echte Live-Data-Endpunkte für Production-Use
 """
 
-from flask import Flask, jsonify, request, render_template_string
+from flask import Flask, Response, jsonify, request, render_template_string
 import json
+import sys
 import threading
 import time
 import random
 from datetime import datetime
+from pathlib import Path
 import os
 
 # Import Live-System-Komponenten
 from live_api_integration import get_live_market_data
 from system_status_integrator import get_quantum_status
 
+# Nexus-Datenbank der Desktop-App für die NDJSON-Export-Endpunkte
+NEXUS_DB_PATH = os.environ.get('NEXUS_DB_PATH',
+                               str(Path(__file__).parent / 'CashMoneyColors_App' / 'data' / 'nexus.db'))
+try:
+    sys.path.insert(0, str(Path(__file__).parent / 'CashMoneyColors_App'))
+    from db.manager import get_database
+    from db.rows import ndjson_lines
+except ImportError:
+    print("Warning: Nexus database not available. /api/nexus endpoints disabled.")
+    get_database = None
+
 class ProductionWebServer:
     """Professioneller HTTP-Server für KI-System"""
 
     def __init__(self):
         self.app = Flask(__name__)
         self.server_thread = None
+        self.nexus_db = None
 
         # Setup routes
         self.setup_routes()
@@ -459,6 +473,35 @@ System Load: ${{data.system_load || 'N/A'}}%</pre>`;
                     "status": "ERROR"
                 }), 500
 
+        @self.app.route('/api/nexus/<dataset>')
+        def export_nexus_rows(dataset):
+            """API: Nexus-Daten als NDJSON-Stream mit Keyset-Cursor (konstanter Speicher bei jeder Seitentiefe)"""
+            db = self._nexus_database()
+            if db is None:
+                return jsonify({"error": "Nexus database not available"}), 503
+
+            args = request.args
+            cursor, limit = args.get('cursor'), args.get('limit', type=int)
+            if limit is not None and limit < 1:
+                return jsonify({"error": "limit must be a positive integer"}), 400
+            try:
+                if dataset == 'conversations':
+                    stream = db.iter_conversation_history(cursor=cursor, limit=limit)
+                elif dataset == 'tasks':
+                    stream = db.iter_pending_tasks(task_type=args.get('type'), cursor=cursor, limit=limit)
+                elif dataset == 'knowledge' and args.get('q'):
+                    stream = db.iter_knowledge_search(args['q'], category=args.get('category'),
+                                                      cursor=cursor, limit=limit)
+                elif dataset == 'knowledge':
+                    stream = db.iter_knowledge(category=args.get('category'), cursor=cursor, limit=limit)
+                else:
+                    return jsonify({"error": f"Unknown dataset: {dataset}"}), 404
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            # Generator-Body: Werkzeug sendet die Zeilen chunked, ohne die Ergebnismenge zu puffern
+            return Response(ndjson_lines(stream), mimetype='application/x-ndjson')
+
         @self.app.route('/docs')
         def api_docs():
             """API-Dokumentation-HTML-Seite"""
@@ -515,6 +558,14 @@ System Load: ${{data.system_load || 'N/A'}}%</pre>`;
                     <div class="description">Autonome Entscheidungen, System-Events und Activity Logs</div>
                 </div>
 
+                <h2>🗄️ Nexus Data Export</h2>
+                <div class="endpoint">
+                    <div class="method">GET</div>
+                    <strong>/api/nexus/conversations | /api/nexus/tasks | /api/nexus/knowledge</strong>
+                    <div class="description">NDJSON-Stream (eine Zeile pro Datensatz), letzte Zeile: { "next_cursor": ... }</div>
+                    <div class="description">Query: limit, cursor (aus next_cursor), type (tasks), category und q (knowledge-Suche)</div>
+                </div>
+
                 <h2>🎛️ System Control</h2>
                 <div class="endpoint">
                     <div class="method">POST</div>
@@ -546,6 +597,15 @@ GET /api/status
             """
             return render_template_string(docs_html)
 
+    def _nexus_database(self):
+        """Nexus-Datenbank beim ersten Zugriff öffnen; None wenn nicht verfügbar"""
+        if self.nexus_db is None and get_database is not None:
+            try:
+                self.nexus_db = get_database(NEXUS_DB_PATH, pool_mode='thread', compact_rows=True)
+            except Exception as e:
+                print(f"❌ Nexus database unavailable: {e}")
+        return self.nexus_db
+
     def start_server(self):
         """Starte HTTP-Server in separatem Thread"""
         def run_server():
@@ -0,0 +1,135 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+import unittest
+from functools import partial
+
+from CashMoneyColors_App.ai.base_ai import AnalysisAI
+from CashMoneyColors_App.ai.manager import AIManager
+from CashMoneyColors_App.db.manager import NexusDatabase
+
+
+class BlockingAnalysisAI(AnalysisAI):
+    """Analysis agent whose provider call blocks until `release` is set"""
+
+    def __init__(self, db_manager, config, release):
+        super().__init__(db_manager, config)
+        self.release = release
+
+    def process_task(self, task):
+        self.release.wait(5)
+        self._task_processed()
+        return {'success': True, 'analysis': f"analysis of {task['content']}"}
+
+
+class RoutedAnalysisAI(BlockingAnalysisAI):
+    """Blocking agent that never claims on its own, so only the coordinator feeds it"""
+
+    def _run_loop(self):
+        pass
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class ConcurrentAgentTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = NexusDatabase(str(Path(self._tmp.name) / "nexus.db"), pool_mode='thread')
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.db.close()
+        self._tmp.cleanup()
+
+    def statuses(self, task_ids):
+        return [self.db.get_task_by_id(task_id)['status'] for task_id in task_ids]
+
+    def test_claims_only_free_workers(self):
+        task_ids = [self.db.create_task('analysis', f"report {i}") for i in range(10)]
+        agent = BlockingAnalysisAI(self.db, {'concurrency': 4}, self.release)
+        agent.start()
+        try:
+            self.assertTrue(wait_until(lambda: agent.get_status()['in_flight'] == 4))
+            self.assertEqual(self.statuses(task_ids).count('processing'), 4)
+            self.release.set()
+            self.assertTrue(wait_until(lambda: self.statuses(task_ids).count('completed') == 10))
+        finally:
+            agent.stop()
+        status = agent.get_status()
+        self.assertEqual(status['peak_in_flight'], 4)
+        self.assertEqual(status['tasks_processed'], 10)
+        self.assertEqual(status['in_flight'], 0)
+
+    def test_stop_drains_in_flight_tasks(self):
+        task_ids = [self.db.create_task('analysis', f"report {i}") for i in range(2)]
+        agent = BlockingAnalysisAI(self.db, {'concurrency': 2}, self.release)
+        agent.start()
+        self.assertTrue(wait_until(lambda: agent.in_flight == 2))
+        threading.Timer(0.1, self.release.set).start()
+        agent.stop()
+        self.assertEqual(self.statuses(task_ids), ['completed', 'completed'])
+        self.assertIsNone(agent.executor)
+
+    def test_lease_outlasting_task_is_renewed(self):
+        task_id = self.db.create_task('analysis', "slow report")
+        agent = BlockingAnalysisAI(self.db, {}, self.release)
+        agent.lease_seconds = 0.3
+        agent.start()
+        try:
+            self.assertTrue(wait_until(lambda: agent.in_flight == 1))
+            threading.Event().wait(0.6)  # twice the lease
+            self.assertEqual(self.db.claim_tasks('other', ['analysis']), [])
+            self.release.set()
+            self.assertTrue(wait_until(lambda: self.statuses([task_id]) == ['completed']))
+        finally:
+            agent.stop()
+        self.assertEqual(self.db.get_task_by_id(task_id)['assigned_agent'], agent.name)
+
+    def test_result_after_lost_lease_is_dropped(self):
+        task_id = self.db.create_task('analysis', "stolen report")
+        agent = BlockingAnalysisAI(self.db, {}, self.release)
+        agent.start()
+        try:
+            self.assertTrue(wait_until(lambda: agent.in_flight == 1))
+            with self.db._writer() as conn:
+                conn.execute('UPDATE tasks SET lease_expires_at = 0 WHERE id = ?', (task_id,))
+            self.assertEqual(self.db.claim_tasks('other', ['analysis'])[0]['id'], task_id)
+            self.release.set()
+            self.assertTrue(wait_until(lambda: agent.in_flight == 0))
+        finally:
+            agent.stop()
+        task = self.db.get_task_by_id(task_id)
+        self.assertEqual((task['status'], task['assigned_agent']), ('processing', 'other'))
+
+    def test_coordinator_dispatches_only_to_free_workers(self):
+        task_ids = [self.db.create_task('analysis', f"report {i}") for i in range(5)]
+        manager = AIManager(self.db)
+        manager.busy_poll_interval = 0.05
+        manager.register_agent('claude_ai', partial(RoutedAnalysisAI, release=self.release), {'concurrency': 2})
+        manager.start_agent({'name': 'claude_ai'})
+        agent = manager.agents['claude_ai']['instance']
+        manager.running = True
+        manager.coordinator_thread.start()
+        try:
+            self.assertTrue(wait_until(lambda: agent.in_flight == 2))
+            self.assertEqual(self.statuses(task_ids).count('processing'), 2)
+            self.release.set()
+            self.assertTrue(wait_until(lambda: self.statuses(task_ids).count('completed') == 5))
+        finally:
+            manager.shutdown()
+        self.assertEqual(agent.peak_in_flight, 2)
+        self.assertEqual({self.db.get_task_by_id(task_id)['assigned_agent'] for task_id in task_ids},
+                         {agent.name})
+
+
+if __name__ == "__main__":
+    unittest.main()
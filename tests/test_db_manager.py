@@ -0,0 +1,848 @@
+import gzip
+import json
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+import unittest
+
+from CashMoneyColors_App.db.backup import BackupScheduler, verify_backup
+from CashMoneyColors_App.db import manager, rollups
+from CashMoneyColors_App.db.manager import NexusDatabase
+from CashMoneyColors_App.db.retention import RetentionPolicy
+from CashMoneyColors_App.db.rows import ndjson_lines
+from CashMoneyColors_App.db.vector_index import KnowledgeVectorIndex, VECTOR_INDEX_AVAILABLE, np
+
+
+class DatabaseTestCase(unittest.TestCase):
+    pool_mode = 'single'
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self._tmp.name) / "nexus.db"
+        self.db = NexusDatabase(str(self.db_path), pool_mode=self.pool_mode)
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+
+class ConnectionPoolTests(DatabaseTestCase):
+    pool_mode = 'thread'
+
+    def test_pooled_mode_uses_wal(self):
+        with self.db._writer() as conn:
+            mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_read_pool_is_read_only(self):
+        with self.db._reader() as conn:
+            with self.assertRaises(Exception):
+                conn.execute("INSERT INTO tasks (task_type, content) VALUES ('x', 'y')")
+
+    def test_concurrent_writers(self):
+        def worker(n):
+            for i in range(25):
+                self.db.create_task('general', f"task {n}-{i}")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.db.get_system_stats()['total_tasks'], 100)
+
+    def test_thread_connections_closed_when_threads_exit(self):
+        def worker(n):
+            self.db.create_task('general', f"short-lived {n}")
+            self.db.get_task_by_id(1)
+
+        for n in range(50):
+            thread = threading.Thread(target=worker, args=(n,))
+            thread.start()
+            thread.join()
+        self.assertEqual(self.db.get_system_stats()['total_tasks'], 50)
+        self.assertLessEqual(self.db.pool.stats()['open_connections'], 1)
+        self.assertLessEqual(self.db.read_pool.stats()['open_connections'], 1)
+
+
+class InitializationTests(DatabaseTestCase):
+    def test_schema_version_recorded_and_setup_skipped(self):
+        with self.db._writer() as conn:
+            self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], manager.SCHEMA_VERSION)
+        self.db.close()
+
+        calls = []
+        original = NexusDatabase._create_schema
+        NexusDatabase._create_schema = lambda db, conn: calls.append(conn)
+        try:
+            self.db = NexusDatabase(str(self.db_path))
+        finally:
+            NexusDatabase._create_schema = original
+        self.assertEqual(calls, [])
+        self.assertTrue(self.db.fts_enabled)
+
+    def test_get_database_is_lazy_and_shared(self):
+        self.addCleanup(manager._reset_after_fork)
+        manager._reset_after_fork()
+        self.assertIsNone(manager._database)
+
+        instances = []
+        threads = [threading.Thread(target=lambda: instances.append(manager.get_database(str(self.db_path))))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(db) for db in instances}), 1)
+        self.assertIs(manager.database_manager, instances[0])
+        instances[0].close()
+
+    def test_migrates_text_timestamps_to_epoch_columns(self):
+        self.db.close()
+        legacy_path = Path(self._tmp.name) / "legacy.db"
+        conn = sqlite3.connect(str(legacy_path))
+        conn.executescript('''
+            CREATE TABLE agent_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, agent_name TEXT NOT NULL, operation TEXT NOT NULL,
+                duration REAL, success BOOLEAN DEFAULT TRUE, tokens_used INTEGER, cost REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+            INSERT INTO agent_metrics (agent_name, operation, duration, created_at)
+            VALUES ('grok', 'op', 1.0, '2024-01-01 00:00:00');
+        ''')
+        conn.close()
+
+        self.db = NexusDatabase(str(legacy_path))
+        with self.db._reader() as conn:
+            self.assertEqual(conn.execute('SELECT created_ts FROM agent_metrics').fetchone()[0], 1704067200)
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT SUM(duration) FROM agent_metrics "
+                "WHERE agent_name = ? AND created_ts >= ? AND created_ts < ?", ('grok', 0, 1)).fetchall()
+        self.assertIn('COVERING INDEX idx_agent_metrics_agent_time', plan[0][3])
+        self.assertEqual(self.db.get_agent_performance('grok', days=100000)['total_operations'], 1)
+
+        task_id = self.db.create_task('analysis', "epoch")
+        with self.db._writer() as conn:
+            conn.execute("UPDATE tasks SET updated_at = '2024-01-02 00:00:00' WHERE id = ?", (task_id,))
+            self.assertEqual(conn.execute('SELECT updated_ts FROM tasks').fetchone()[0], 1704153600)
+
+
+class KnowledgeSearchTests(DatabaseTestCase):
+    def test_ranked_search_matches_response_text(self):
+        self.db.add_knowledge("pricing", "Premium tiers convert better than discounts")
+        self.db.add_knowledge("marketing", "Short video hooks drive engagement")
+        results = self.db.get_knowledge("how do discounts affect conversion", limit=5)
+        self.assertEqual([r['query'] for r in results], ["pricing"])
+
+    def test_category_filter(self):
+        self.db.add_knowledge("revenue strategy", "Upsell", category='sales')
+        self.db.add_knowledge("revenue strategy", "Automate", category='ops')
+        results = self.db.search_knowledge("revenue", category='ops')
+        self.assertEqual([r['content'] for r in results], ["Automate"])
+
+    def test_replace_keeps_index_in_sync(self):
+        self.db.add_knowledge("ai", "old answer about widgets")
+        self.db.add_knowledge("ai", "new answer about gadgets")
+        self.assertEqual(self.db.get_knowledge("widgets"), [])
+        self.assertEqual(len(self.db.get_knowledge("gadgets")), 1)
+
+    def test_backfill_existing_database(self):
+        with self.db._writer() as conn:
+            for trigger in ('insert', 'delete', 'update'):
+                conn.execute(f"DROP TRIGGER knowledge_fts_{trigger}")
+            conn.execute("DROP TABLE knowledge_fts")
+            conn.execute("INSERT INTO knowledge (query, response) VALUES ('legacy', 'row before fts')")
+            conn.execute("PRAGMA user_version = 0")
+        self.db.close()
+        self.db = NexusDatabase(str(self.db_path))
+        self.assertEqual(len(self.db.get_knowledge("before")), 1)
+
+
+@unittest.skipUnless(VECTOR_INDEX_AVAILABLE, "NumPy not installed")
+class VectorIndexTests(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db.add_knowledge("pricing strategy", "Raise prices for premium tiers")
+        self.db.add_knowledge("marketing funnel", "Content attracts leads to the pricing page", category='marketing')
+        self.db.close()
+        self.db = NexusDatabase(str(self.db_path), vector_index=True)
+
+    def test_ranks_query_matches_first(self):
+        results = self.db.get_knowledge("pricing")
+        self.assertEqual([r['query'] for r in results], ["pricing strategy", "marketing funnel"])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertEqual(self.db.get_knowledge("pricing", category='marketing')[0]['query'], "marketing funnel")
+
+    def test_incremental_add_and_replace(self):
+        self.db.add_knowledge("quantum avatar", "first answer")
+        self.assertEqual(self.db.get_knowledge("avatar")[0]['content'], "first answer")
+        self.db.add_knowledge("quantum avatar", "second answer")
+        self.assertEqual([r['content'] for r in self.db.get_knowledge("avatar")], ["second answer"])
+
+    def test_persisted_index_is_memory_mapped_and_caught_up(self):
+        self.db.add_knowledge("churn analysis", "Track cancellations weekly")
+        self.db.close()
+        with NexusDatabase(str(self.db_path)) as plain:
+            plain.add_knowledge("churn forecast", "Written while the index was closed")
+
+        self.db = NexusDatabase(str(self.db_path), vector_index=True)
+        self.assertIsInstance(self.db.vector_index._base['postings'], np.memmap)
+        self.assertEqual({r['query'] for r in self.db.get_knowledge("churn")},
+                         {"churn analysis", "churn forecast"})
+
+    def test_compaction_drops_removed_documents(self):
+        index = KnowledgeVectorIndex(max_delta_docs=3)
+        for i in range(1, 6):
+            index.add(i, f"term{i} shared", "body")
+        index.remove([2])
+        index.compact()
+        self.assertEqual(len(index), 4)
+        self.assertEqual(sorted(k for k, _ in index.search("shared", k=10)), [1, 3, 4, 5])
+        self.assertEqual(index.search("term2"), [])
+
+
+class QueryCacheTests(DatabaseTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self._tmp.name) / "nexus.db"
+        self.db = NexusDatabase(str(self.db_path), query_cache=True, cache_size=3)
+
+    def test_repeated_reads_hit_and_writes_invalidate(self):
+        self.db.add_knowledge("pricing", "Charge more")
+        self.assertEqual(len(self.db.get_knowledge("pricing")), 1)
+        self.db.get_knowledge("pricing")
+        self.db.get_system_stats()
+        stats = self.db.get_cache_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['entries'], 3)  # get_system_stats caches its nested get_revenue_stats
+
+        self.db.create_task('analysis', "unrelated table")
+        self.db.get_knowledge("pricing")
+        self.assertEqual(self.db.get_cache_stats()['hits'], 2)
+        self.assertEqual(self.db.get_system_stats()['total_tasks'], 1)
+
+        self.db.add_knowledge("pricing tiers", "Three tiers")
+        self.assertEqual(len(self.db.get_knowledge("pricing")), 2)
+
+    def test_lru_eviction_ttl_and_isolated_results(self):
+        for limit in (1, 2, 3, 4):
+            self.db.get_conversation_history(limit=limit)
+        self.assertEqual(self.db.get_cache_stats()['evictions'], 1)
+
+        history = self.db.get_conversation_history(limit=4)
+        history.append("mutated")
+        self.assertEqual(self.db.get_conversation_history(limit=4), [])
+
+        self.db.query_cache.ttl = -1
+        self.db.get_conversation_history(limit=5)
+        self.db.get_conversation_history(limit=5)
+        self.assertEqual(self.db.get_cache_stats()['expirations'], 1)
+
+
+class PayloadStorageTests(DatabaseTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self._tmp.name) / "nexus.db"
+        self.db = NexusDatabase(str(self.db_path), compress_payloads=True,
+                                payload_threshold=256, spill_threshold=4096)
+
+    def stored(self, sql, params=()):
+        with self.db._reader() as conn:
+            return conn.execute(sql, params).fetchone()[0]
+
+    def test_large_payloads_compress_and_stay_searchable(self):
+        response = "Tiered pricing with annual discounts converts well. " * 20
+        knowledge_id = self.db.add_knowledge("pricing", response)
+        self.db.add_knowledge("short", "plain text")
+
+        self.assertIsInstance(self.stored('SELECT response FROM knowledge WHERE id = ?', (knowledge_id,)), bytes)
+        self.assertEqual(self.stored("SELECT typeof(response) FROM knowledge WHERE query = 'short'"), 'text')
+        self.assertEqual(self.db.get_knowledge("annual discounts")[0]['content'], response.strip())
+        self.assertEqual(self.db.get_knowledge("pricing")[0]['content'], response.strip())
+
+        self.db.add_knowledge("pricing", "replaced")
+        self.assertEqual(self.db.get_knowledge("annual discounts"), [])
+
+    def test_very_large_payloads_spill_to_shared_files(self):
+        result = "\n".join(f"def handler_{i}(request):\n    return {i}" for i in range(400))
+        first, second = self.db.create_task('code', "a"), self.db.create_task('code', "b")
+        self.db.update_task_status(first, 'completed', result=result)
+        self.db.update_task_status(second, 'completed', result=result)
+
+        files = list((self.db_path.parent / "nexus_blobs").glob('*/*'))
+        self.assertEqual(len(files), 1)
+        self.assertEqual(self.db.get_task_by_id(second)['result'], result)
+
+        self.db.update_task_status(first, 'completed')
+        self.assertEqual(self.db.collect_payload_garbage(grace=-1), 0)
+        self.db.update_task_status(second, 'completed')
+        self.assertEqual(self.db.collect_payload_garbage(grace=-1), 1)
+        self.assertFalse(files[0].exists())
+
+    def test_existing_rows_read_back_after_toggling(self):
+        self.db.add_knowledge("guide", "step " * 200)
+        self.db.close()
+        self.db = NexusDatabase(str(self.db_path))
+        self.assertEqual(self.db.get_knowledge("guide")[0]['content'], ("step " * 200).strip())
+
+
+class BulkTaskTests(DatabaseTestCase):
+    def test_bulk_insert_returns_contiguous_ids(self):
+        self.db.create_task('analysis', "single")
+        ids = self.db.create_tasks_bulk((('content', f"post {i}", 2) for i in range(100)))
+        self.assertEqual(ids, range(2, 102))
+        self.assertEqual(self.db.get_task_by_id(ids[-1])['content'], "post 99")
+        self.assertEqual(self.db.get_system_stats()['total_tasks'], 101)
+
+    def test_invalid_task_rolls_back_the_batch(self):
+        self.assertEqual(self.db.create_tasks_bulk([('analysis', "ok"), {'type': 'analysis'}]), range(0))
+        self.assertEqual(self.db.get_pending_tasks(), [])
+
+    def test_ndjson_import(self):
+        path = Path(self._tmp.name) / "tasks.ndjson"
+        path.write_text('{"type": "analysis", "content": "a", "priority": 3}\n\n'
+                        '{"task_type": "content", "content": {"topic": "ai"}}\n')
+        ids = self.db.import_tasks_ndjson(path)
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(self.db.get_task_by_id(ids[0])['priority'], 3)
+        self.assertEqual(json.loads(self.db.get_task_by_id(ids[1])['content']), {'topic': 'ai'})
+
+
+class CompactRowTests(DatabaseTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = NexusDatabase(str(Path(self._tmp.name) / "nexus.db"), compact_rows=True)
+
+    def test_compact_rows_keep_dict_access(self):
+        self.db.create_task('analysis', "report", priority=3)
+        task = self.db.get_pending_tasks()[0]
+        self.assertIsInstance(task, tuple)
+        self.assertEqual((task['type'], task.priority, task.get('missing', 'x')), ('analysis', 3, 'x'))
+        self.assertEqual(dict(task), {'id': 1, 'type': 'analysis', 'content': "report",
+                                      'priority': 3, 'created_at': task.created_at})
+        with self.assertRaises(KeyError):
+            task['status']
+
+        self.db.add_knowledge("pricing tiers", "annual plans convert better", category='sales')
+        self.assertEqual(self.db.get_knowledge("pricing")[0]['content'], "annual plans convert better")
+
+    def test_streams_match_list_order_across_batches(self):
+        self.db.create_tasks_bulk(('analysis', f"task {i}", i % 3) for i in range(25))
+        streamed = [task['id'] for task in self.db.iter_pending_tasks(batch_size=4)]
+        self.assertEqual(streamed, [task['id'] for task in self.db.get_pending_tasks(limit=100)])
+        self.assertEqual(len(set(streamed)), 25)
+
+        for i in range(7):
+            self.db.save_conversation(f"question {i}", "x" * 150, 0.1)
+        history = list(self.db.iter_conversation_history(batch_size=3))
+        self.assertEqual([row['user_query'] for row in history], [f"question {i}" for i in reversed(range(7))])
+        self.assertEqual(len(history[0]['ai_response']), 103)
+
+
+class KeysetPaginationTests(DatabaseTestCase):
+    def page_through(self, open_stream):
+        pages, cursor = [], None
+        while True:
+            stream = open_stream(cursor)
+            pages.append([row['id'] for row in stream])
+            cursor = stream.next_cursor
+            if cursor is None:
+                return pages
+
+    def test_cursor_pages_cover_every_row_once(self):
+        self.db.create_tasks_bulk(('analysis', f"task {i}", i % 4) for i in range(23))
+        pages = self.page_through(lambda cursor: self.db.iter_pending_tasks(cursor=cursor, limit=5, batch_size=2))
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        self.assertEqual(sum(pages, []), [task['id'] for task in self.db.get_pending_tasks(limit=100)])
+
+    def test_search_pages_follow_rank(self):
+        for i in range(12):
+            self.db.add_knowledge(f"pricing question {i}", "pricing " * (i + 1), category='sales')
+        ranked = [row['id'] for row in self.db.iter_knowledge_search("pricing")]
+        self.assertEqual(len(ranked), 12)
+        pages = self.page_through(lambda cursor: self.db.iter_knowledge_search("pricing", cursor=cursor, limit=5))
+        self.assertEqual(sum(pages, []), ranked)
+
+    def test_ndjson_export_ends_with_cursor_trailer(self):
+        for i in range(3):
+            self.db.save_conversation(f"question {i}", "answer", 0.1)
+        lines = [json.loads(line) for line in ndjson_lines(self.db.iter_conversation_history(limit=2))]
+        self.assertEqual([line.get('user_query') for line in lines[:2]], ["question 2", "question 1"])
+        rest = list(self.db.iter_conversation_history(cursor=lines[2]['next_cursor']))
+        self.assertEqual([row['user_query'] for row in rest], ["question 0"])
+        with self.assertRaises(ValueError):
+            self.db.iter_conversation_history(cursor="not-a-cursor")
+
+
+class TaskDeduplicationTests(DatabaseTestCase):
+    def test_active_duplicates_return_existing_task(self):
+        first = self.db.create_task('analysis', "Summarize  Q3 revenue")
+        self.assertEqual(self.db.create_task('analysis', "summarize q3 revenue "), first)
+        self.assertNotEqual(self.db.create_task('content', "Summarize Q3 revenue"), first)
+        self.assertNotEqual(self.db.create_task('analysis', "Summarize Q3 revenue", dedupe=False), first)
+
+        self.db.update_task_status(first, 'completed', result="done")
+        self.assertNotEqual(self.db.create_task('analysis', "Summarize Q3 revenue"), first)
+        self.assertEqual(self.db.get_system_stats()['deduplicated_tasks'], 1)
+
+    def test_requeue_conflicting_with_active_duplicate_fails(self):
+        first = self.db.create_task('analysis', "Summarize Q3 revenue")
+        self.db.update_task_status(first, 'completed', result="done")
+        second = self.db.create_task('analysis', "Summarize Q3 revenue")
+        with self.assertLogs(level='WARNING') as logs:
+            self.assertFalse(self.db.update_task_status(first, 'pending'))
+        self.assertIn("identical task is already active", logs.output[0])
+        self.assertEqual(self.db.get_task_by_id(first)['status'], 'completed')
+        self.db.update_task_status(second, 'completed', result="done again")
+        self.assertTrue(self.db.update_task_status(first, 'pending'))
+
+    def test_bulk_skips_queued_tasks(self):
+        self.db.create_task('content', "post 0")
+        ids = self.db.create_tasks_bulk([('content', f"post {i % 3}") for i in range(6)])
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(self.db.get_system_stats(exact=True)['deduplicated_tasks'], 4)
+
+    def test_waiter_receives_in_flight_result(self):
+        task_id = self.db.create_task('analysis', "shared")
+        threading.Timer(0.1, self.db.update_task_status, (task_id, 'completed'),
+                        {'result': "answer"}).start()
+        self.assertEqual(self.db.wait_for_task(self.db.create_task('analysis', "shared"),
+                                               timeout=5, poll_interval=0.02)['result'], "answer")
+        self.assertIsNone(self.db.wait_for_task(self.db.create_task('analysis', "other"), timeout=0.05))
+
+    def test_existing_queue_is_hashed_on_upgrade(self):
+        with self.db._writer() as conn:
+            conn.execute("DROP INDEX idx_tasks_active_hash")
+            conn.executemany("INSERT INTO tasks (task_type, content) VALUES ('analysis', ?)",
+                             [("legacy",), ("legacy",)])
+            conn.execute("PRAGMA user_version = 3")
+        self.db.close()
+        self.db = NexusDatabase(str(self.db_path))
+        self.assertEqual(self.db.create_task('analysis', "legacy"), 1)
+
+
+class TaskClaimTests(DatabaseTestCase):
+    pool_mode = 'thread'
+
+    def test_concurrent_claims_never_overlap(self):
+        for i in range(60):
+            self.db.create_task('analysis', f"task {i}")
+        claimed = []
+        lock = threading.Lock()
+
+        def worker(name):
+            while True:
+                tasks = self.db.claim_tasks(name, ['analysis'], n=4)
+                if not tasks:
+                    return
+                with lock:
+                    claimed.extend(task['id'] for task in tasks)
+
+        threads = [threading.Thread(target=worker, args=(f"agent{n}",)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(claimed), 60)
+        self.assertEqual(len(set(claimed)), 60)
+
+    def test_expired_lease_is_requeued_then_failed(self):
+        task_id = self.db.create_task('analysis', "flaky")
+        first = self.db.claim_tasks('a', ['analysis'], lease_seconds=-1, max_attempts=2)
+        self.assertEqual(first[0]['attempts'], 1)
+        second = self.db.claim_tasks('b', ['analysis'], lease_seconds=-1, max_attempts=2)
+        self.assertEqual(second[0]['id'], task_id)
+        self.assertEqual(second[0]['attempts'], 2)
+        self.assertEqual(self.db.requeue_expired_tasks(max_attempts=2), 1)
+        self.assertEqual(self.db.get_task_by_id(task_id)['status'], 'failed')
+
+    def test_late_result_after_lease_expired_mid_task_is_dropped(self):
+        task_id = self.db.create_task('analysis', "slow")
+        self.db.claim_tasks('a', ['analysis'], lease_seconds=-1)
+        # a's lease ran out mid-task; b picks the task up
+        self.assertEqual(self.db.claim_tasks('b', ['analysis'])[0]['id'], task_id)
+        self.assertFalse(self.db.update_task_status(task_id, 'completed', assigned_agent='a', result="late"))
+        task = self.db.get_task_by_id(task_id)
+        self.assertEqual((task['status'], task['assigned_agent']), ('processing', 'b'))
+        self.assertTrue(self.db.update_task_status(task_id, 'completed', assigned_agent='b', result="on time"))
+        self.assertEqual(self.db.get_task_by_id(task_id)['result'], "on time")
+
+    def test_keep_task_lease_renews_while_running(self):
+        task_id = self.db.create_task('analysis', "long call")
+        self.db.claim_tasks('a', ['analysis'], lease_seconds=0.3)
+        with self.db.keep_task_lease(task_id, 'a', lease_seconds=0.3) as lost:
+            threading.Event().wait(0.6)
+            self.assertEqual(self.db.claim_tasks('b', ['analysis']), [])
+        self.assertFalse(lost.is_set())
+        self.assertTrue(self.db.update_task_status(task_id, 'completed', assigned_agent='a'))
+
+    def test_claim_filters_types(self):
+        self.db.create_task('code_generation', "write code")
+        self.assertEqual(self.db.claim_tasks('a', ['analysis']), [])
+        self.assertEqual(len(self.db.claim_tasks('a', ['code_generation'])), 1)
+
+
+class TaskWakeupTests(DatabaseTestCase):
+    pool_mode = 'thread'
+
+    def wait_in_thread(self, notifier, since, task_types=None):
+        woke = threading.Event()
+
+        def waiter():
+            notifier.wait(since, timeout=5, task_types=task_types)
+            woke.set()
+
+        threading.Thread(target=waiter, daemon=True).start()
+        return woke
+
+    def test_create_task_wakes_waiter(self):
+        since = self.db.task_notifier.sequence
+        woke = self.wait_in_thread(self.db.task_notifier, since)
+        self.assertFalse(woke.wait(0.05))
+        self.db.create_task('analysis', "wake up")
+        self.assertTrue(woke.wait(1))
+
+    def test_waiters_only_wake_for_their_task_types(self):
+        notifier = self.db.task_notifier
+        types = ['code_generation']
+        woke = self.wait_in_thread(notifier, notifier.sequence_for(types), types)
+        task_id = self.db.create_task('analysis', "not for the coder")
+        self.db.claim_tasks('a', ['analysis'])
+        self.db.update_task_status(task_id, 'completed', assigned_agent='a', result="done")
+        self.assertFalse(woke.wait(0.1))
+        self.db.create_task('code_generation', "for the coder")
+        self.assertTrue(woke.wait(1))
+
+    def test_completion_wakes_types_of_ready_dependents(self):
+        workflow = self.db.create_workflow('chain', {
+            'draft': {'type': 'content_generation', 'content': "draft"},
+            'review': {'type': 'analysis', 'content': "review", 'after': ['draft']},
+        })
+        notifier = self.db.task_notifier
+        woke = self.wait_in_thread(notifier, notifier.sequence_for(['analysis']), ['analysis'])
+        self.db.claim_tasks('writer', ['content_generation'])
+        self.assertFalse(woke.wait(0.05))
+        self.db.update_task_status(workflow['tasks']['draft'], 'completed', assigned_agent='writer')
+        self.assertTrue(woke.wait(1))
+
+    def test_deduplicated_task_does_not_ring(self):
+        self.db.create_task('analysis', "same")
+        since = self.db.task_notifier.sequence
+        self.db.create_task('analysis', "same")
+        self.assertEqual(self.db.task_notifier.sequence, since)
+
+    def test_wait_for_task_returns_when_finished(self):
+        task_id = self.db.create_task('analysis', "finish me")
+        self.db.claim_tasks('a', ['analysis'])
+        timer = threading.Timer(0.1, self.db.update_task_status, (task_id, 'completed'),
+                                {'assigned_agent': 'a', 'result': "done"})
+        timer.start()
+        task = self.db.wait_for_task(task_id, timeout=5, poll_interval=30)
+        timer.join()
+        self.assertEqual(task['status'], 'completed')
+
+    def test_doorbell_wakes_other_instances(self):
+        first = NexusDatabase(str(self.db_path), pool_mode='thread', task_doorbell=True)
+        second = NexusDatabase(str(self.db_path), pool_mode='thread', task_doorbell=True)
+        try:
+            coder = self.wait_in_thread(second.task_notifier, second.task_notifier.sequence_for(['code']), ['code'])
+            woke = self.wait_in_thread(second.task_notifier, second.task_notifier.sequence)
+            first.create_task('analysis', "from another process")
+            self.assertTrue(woke.wait(2))
+            self.assertFalse(coder.is_set())
+            self.assertGreaterEqual(second.task_notifier.remote_rings, 1)
+        finally:
+            first.close()
+            second.close()
+        self.assertEqual(list((self.db_path.parent / 'nexus_doorbell').iterdir()), [])
+
+
+class WorkflowTests(DatabaseTestCase):
+    pool_mode = 'thread'
+
+    def setUp(self):
+        super().setUp()
+        self.workflow = self.db.create_workflow('launch', {
+            'join': {'type': 'strategic_planning', 'content': "combine", 'after': ['research', 'code']},
+            'research': {'type': 'analysis', 'content': "research"},
+            'code': {'type': 'code_generation', 'content': "build"},
+        })
+        self.ids = self.workflow['tasks']
+
+    def test_fan_out_then_join_with_inputs(self):
+        claimed = self.db.claim_tasks('agent', n=10)
+        self.assertEqual(sorted(t['id'] for t in claimed), sorted([self.ids['research'], self.ids['code']]))
+
+        self.db.update_task_status(self.ids['research'], 'completed', result="market notes")
+        self.assertEqual(self.db.claim_tasks('agent', n=10), [])
+        self.db.update_task_status(self.ids['code'], 'completed', result="def main(): pass")
+
+        join = self.db.claim_tasks('grok', ['strategic_planning'])[0]
+        self.assertEqual(join['id'], self.ids['join'])
+        self.assertEqual([(i['step'], i['result']) for i in join['inputs']],
+                         [('research', "market notes"), ('code', "def main(): pass")])
+        self.db.update_task_status(join['id'], 'completed', result="plan")
+
+        status = self.db.get_workflow_status(self.workflow['id'])
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['critical_path'][-1], 'join')
+        self.assertLessEqual(status['critical_path_seconds'], status['work_seconds'])
+
+    def test_failure_cascades_downstream(self):
+        self.db.claim_tasks('agent', ['analysis'])
+        self.db.update_task_status(self.ids['research'], 'failed', error_message="boom")
+        status = self.db.get_workflow_status(self.workflow['id'])
+        self.assertEqual(status['status'], 'failed')
+        self.assertEqual(status['tasks']['join']['status'], 'failed')
+        self.assertEqual(status['tasks']['code']['status'], 'pending')
+
+    def test_cycles_are_rejected(self):
+        self.assertEqual(self.db.create_workflow('loop', {
+            'a': {'type': 'analysis', 'content': "a", 'after': ['b']},
+            'b': {'type': 'analysis', 'content': "b", 'after': ['a']},
+        }), {})
+
+
+class WriteBehindTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self._tmp.name) / "nexus.db"
+        self.db = NexusDatabase(str(self.db_path), pool_mode='thread', write_behind=True,
+                                write_batch_size=1000, write_flush_interval=60)
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def test_writes_are_batched_into_one_commit(self):
+        for i in range(50):
+            self.db.log_agent_metric('grok', 'generate', 0.1)
+        self.assertEqual(self.db.write_buffer.pending(), 50)
+        self.assertEqual(self.db.flush_writes(), 50)
+        self.assertEqual(self.db.write_buffer.get_stats()['batches'], 1)
+        self.assertEqual(self.db.get_agent_performance('grok')['total_operations'], 50)
+
+    def test_task_reads_see_buffered_tasks(self):
+        self.assertEqual(self.db.create_task('analysis', "buffered"), 0)
+        self.assertEqual(len(self.db.get_pending_tasks()), 1)
+
+    def test_cached_reads_see_buffered_and_flushed_writes(self):
+        self.db.close()
+        self.db = NexusDatabase(str(self.db_path), pool_mode='thread', write_behind=True,
+                                write_batch_size=1000, write_flush_interval=60, query_cache=True)
+        self.assertEqual(self.db.get_conversation_history(), [])
+        self.db.save_conversation("hello", "world")
+        self.assertEqual(len(self.db.get_conversation_history()), 1)
+        self.assertEqual(self.db.get_system_stats()['total_conversations'], 1)
+
+        # A write queued without going through an @invalidates method is invalidated by the flush
+        self.db.write_buffer.submit('conversations', 'INSERT INTO conversations (user_query, ai_response) '
+                                    'VALUES (?, ?)', ("again", "world"))
+        self.db.flush_writes()
+        self.assertEqual(len(self.db.get_conversation_history()), 2)
+        self.assertEqual(self.db.get_system_stats()['total_conversations'], 2)
+
+    def test_close_flushes(self):
+        self.db.save_conversation("hello", "world")
+        self.db.close()
+        self.db = NexusDatabase(str(self.db_path))
+        self.assertEqual(self.db.get_system_stats()['total_conversations'], 1)
+
+
+class RollupTests(DatabaseTestCase):
+    def _insert_metric(self, agent, duration, success, age):
+        with self.db._writer() as conn:
+            conn.execute(
+                "INSERT INTO agent_metrics (agent_name, operation, duration, success, tokens_used, cost, created_at) "
+                "VALUES (?, 'op', ?, ?, 10, 0.5, datetime('now', ?))",
+                (agent, duration, success, age))
+
+    def test_agent_performance_respects_window(self):
+        self._insert_metric('grok', 1.0, True, '-1 hours')
+        self._insert_metric('grok', 3.0, False, '-3 days')
+        self._insert_metric('grok', 9.0, True, '-30 days')
+        perf = self.db.get_agent_performance('grok', days=7)
+        self.assertEqual(perf['total_operations'], 2)
+        self.assertAlmostEqual(perf['avg_duration'], 2.0)
+        self.assertAlmostEqual(perf['success_rate'], 50.0)
+        self.assertEqual(perf['total_tokens'], 20)
+
+    def test_incremental_compaction(self):
+        self.db.log_agent_metric('claude', 'op', 0.2)
+        self.assertEqual(self.db.get_agent_performance()['claude']['total_operations'], 1)
+        self.db.log_agent_metric('claude', 'op', 0.4)
+        self.assertEqual(self.db.compact_rollups(), {'agent_metrics': 1})
+        self.assertEqual(self.db.get_agent_performance()['claude']['total_operations'], 2)
+
+    def test_latency_percentiles(self):
+        for i in range(1, 101):
+            self.db.log_agent_metric('grok', 'op', i / 100)
+        perf = self.db.get_agent_performance('grok')
+        self.assertAlmostEqual(perf['p50_duration'], 0.5, delta=0.05)
+        self.assertAlmostEqual(perf['p99_duration'], 0.99, delta=0.1)
+
+    def test_window_includes_minute_of_end(self):
+        end = 1792274400  # exactly on a minute (and hour) boundary
+        segments = rollups.window_segments(end - 7 * rollups.DAY, end)
+        self.assertEqual(segments[-1], ('minute', end, end + rollups.MINUTE))
+
+    def test_revenue_stats(self):
+        self.db.log_revenue(100, 'paypal')
+        self.db.log_revenue(50, 'stripe')
+        with self.db._writer() as conn:
+            conn.execute("INSERT INTO revenue (amount, source, created_at) VALUES (25, 'paypal', datetime('now', '-60 days'))")
+        stats = self.db.get_revenue_stats(days=30)
+        self.assertEqual(stats['total_revenue'], 175)
+        self.assertEqual(stats['revenue_by_source'], {'paypal': 125, 'stripe': 50})
+        self.assertEqual(stats['recent_revenue'], 150)
+
+
+class SystemStatsTests(DatabaseTestCase):
+    def _populate(self):
+        self.db.add_knowledge("a", "x", category='sales')
+        self.db.add_knowledge("a", "y", category='sales')
+        self.db.add_knowledge("b", "z", category='ops')
+        first = self.db.create_task('analysis', "one")
+        self.db.create_task('analysis', "two")
+        self.db.update_task_status(first, 'completed')
+        self.db.save_conversation("q", "r", response_time=1.0, satisfaction=4)
+        self.db.save_conversation("q", "r", response_time=3.0)
+
+    def test_counters_match_exact_recount(self):
+        self._populate()
+        stats = self.db.get_system_stats()
+        self.assertEqual(stats, self.db.get_system_stats(exact=True))
+        self.assertEqual(stats['knowledge_entries'], 2)
+        self.assertEqual(stats['knowledge_categories'], 2)
+        self.assertEqual((stats['pending_tasks'], stats['completed_tasks']), (1, 1))
+        self.assertEqual(stats['avg_response_time'], 2.0)
+        self.assertEqual(stats['avg_satisfaction'], 4.0)
+
+    def test_reconcile_corrects_drift(self):
+        self._populate()
+        with self.db._writer() as conn:
+            conn.execute("UPDATE stats_counters SET value = 99 WHERE name = 'tasks_total'")
+        self.assertEqual(self.db.reconcile_stats(), {'tasks_total': 2 - 99})
+        self.assertEqual(self.db.get_system_stats()['total_tasks'], 2)
+
+
+class MaintenanceTests(DatabaseTestCase):
+    def test_pass_reclaims_free_pages_and_refreshes_statistics(self):
+        self.db.create_tasks_bulk(('analysis', f"{i} " + "x" * 2000) for i in range(500))
+        with self.db._writer() as conn:
+            conn.execute('DELETE FROM tasks WHERE id <= 400')
+        health = self.db.get_database_health()
+        self.assertEqual(health['auto_vacuum'], 'incremental')
+        self.assertGreater(health['freelist_ratio'], 0.5)
+        self.assertIn('tasks', health['stale_tables'])
+
+        report = self.db.run_maintenance(force=True)
+        self.assertEqual(report['analyzed'], ['tasks'])
+        self.assertGreaterEqual(report['vacuumed_pages'], health['freelist_count'] - 1)
+        self.assertLess(report['after']['file_bytes'], report['before']['file_bytes'] / 2)
+        self.assertEqual(self.db.get_database_health()['tables']['tasks']['analyzed_rows'], 100)
+
+    def test_health_reads_row_counts_without_scanning_tables(self):
+        self.db.create_tasks_bulk(('analysis', f"task {i}") for i in range(150))
+        self.db.log_agent_metric('grok', 'op', 0.1)
+        statements = []
+        with self.db._reader() as conn:
+            conn.set_trace_callback(statements.append)
+        try:
+            tables = self.db.get_database_health()['tables']
+        finally:
+            with self.db._reader() as conn:
+                conn.set_trace_callback(None)
+        self.assertEqual((tables['tasks']['rows'], tables['tasks']['rows_source']), (150, 'counter'))
+        self.assertEqual((tables['agent_metrics']['rows'], tables['agent_metrics']['rows_source']),
+                         (1, 'rowid_range'))
+        self.assertFalse([sql for sql in statements if 'COUNT(*) FROM "tasks"' in sql])
+
+    def test_pass_prunes_expired_rollup_buckets(self):
+        with self.db._writer() as conn:
+            conn.execute("INSERT INTO agent_metrics (agent_name, operation, duration, created_at) "
+                         "VALUES ('grok', 'op', 1.0, datetime('now', '-30 days'))")
+        self.db.compact_rollups()
+
+        def granularities():
+            with self.db._reader() as conn:
+                return {row[0] for row in conn.execute('SELECT granularity FROM agent_metrics_rollup')}
+
+        self.assertIn('minute', granularities())
+        report = self.db.run_maintenance(force=True)
+        self.assertGreaterEqual(report['pruned_rollups'], 1)
+        self.assertNotIn('minute', granularities())
+        self.assertIn('day', granularities())
+
+    def test_busy_database_is_skipped(self):
+        self.db.create_task('analysis', "fresh write")
+        self.assertTrue(self.db.run_maintenance(idle_seconds=60)['skipped'])
+
+    def test_tuning_profile(self):
+        self.db.close()
+        self.db = NexusDatabase(str(self.db_path), tuning_profile='balanced')
+        self.assertEqual(self.db.get_database_health()['cache_size'], -16384)
+        with self.assertRaises(ValueError):
+            NexusDatabase(str(self.db_path), tuning_profile='turbo')
+
+
+class BackupTests(DatabaseTestCase):
+    pool_mode = 'thread'
+
+    def test_stepped_backup_is_consistent(self):
+        for i in range(200):
+            self.db.add_knowledge(f"query {i}", "x" * 500)
+        target = Path(self._tmp.name) / "copy.db"
+        self.assertTrue(self.db.backup_database(str(target), pages=5))
+        self.assertTrue(verify_backup(str(target)))
+        copy = NexusDatabase(str(target))
+        self.assertEqual(copy.get_system_stats()['knowledge_entries'], 200)
+        copy.close()
+
+    def test_scheduler_rotates_generations(self):
+        scheduler = BackupScheduler(self.db, Path(self._tmp.name) / "backups", keep=2, pages=4)
+        reports = [scheduler.run_backup() for _ in range(3)]
+        self.assertTrue(all(report['verified'] for report in reports))
+        self.assertEqual(scheduler.get_stats()['generations'], 2)
+        self.assertIsNotNone(reports[-1]['during_query_p50_ms'])
+
+
+class RetentionTests(DatabaseTestCase):
+    def test_cleanup_keeps_newest_conversations_in_chunks(self):
+        for i in range(1200):
+            self.db.save_conversation(f"q{i}", "r")
+        report = self.db.apply_retention([RetentionPolicy('conversations', max_rows=1000)], chunk_size=50)
+        self.assertEqual(report['conversations']['rows'], 200)
+        self.assertEqual(report['conversations']['chunks'], 4)
+        with self.db._reader() as conn:
+            oldest = conn.execute('SELECT user_query FROM conversations ORDER BY id LIMIT 1').fetchone()[0]
+        self.assertEqual(oldest, "q200")
+        self.assertEqual(self.db.get_system_stats()['total_conversations'], 1000)
+
+    def test_cleanup_clears_old_task_results_and_archives(self):
+        old = self.db.create_task('analysis', "old")
+        recent = self.db.create_task('analysis', "recent")
+        for task_id in (old, recent):
+            self.db.update_task_status(task_id, 'completed', result="payload")
+        with self.db._writer() as conn:
+            conn.execute("UPDATE tasks SET updated_at = datetime('now', '-120 days') WHERE id = ?", (old,))
+
+        report = self.db.cleanup_old_entries(days=90, archive=True)
+        self.assertEqual(report['tasks']['rows'], 1)
+        self.assertIsNone(self.db.get_task_by_id(old)['result'])
+        self.assertEqual(self.db.get_task_by_id(recent)['result'], "payload")
+
+        archive, = (self.db_path.parent / 'archive').glob('tasks-*.ndjson.gz')
+        with gzip.open(archive, 'rt') as f:
+            self.assertEqual([json.loads(line) for line in f], [{'id': old, 'result': "payload"}])
+
+    def test_size_policy(self):
+        for i in range(100):
+            self.db.log_agent_metric('grok', 'x' * 1000, 0.1)
+        report = self.db.apply_retention([RetentionPolicy('agent_metrics', max_bytes=50 * 1024)])
+        self.assertGreater(report['agent_metrics']['rows'], 0)
+        self.assertLess(report['agent_metrics']['rows'], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
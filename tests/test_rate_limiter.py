@@ -0,0 +1,121 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import unittest
+
+from CashMoneyColors_App.utils.helpers import (
+    ProviderRateLimiter,
+    RateLimitExceeded,
+    TokenBucket,
+    parse_retry_after,
+    rate_limited_call,
+    configure_rate_limiter,
+)
+
+
+class TooManyRequests(Exception):
+    def __init__(self, retry_after):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={'retry-after': retry_after})
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_reservations_queue_behind_each_other(self):
+        bucket = TokenBucket(capacity=2, rate=10)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, delta=0.01)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, delta=0.01)
+        bucket.refund(2)
+        self.assertAlmostEqual(bucket.wait_time(1), 0.1, delta=0.01)
+
+    def test_set_rate_credits_elapsed_time_at_old_rate(self):
+        bucket = TokenBucket(capacity=10, rate=10)
+        bucket.drain()
+        time.sleep(0.2)
+        bucket.set_rate(1)
+        self.assertAlmostEqual(bucket.available(), 2, delta=0.2)
+
+
+class ProviderRateLimiterTests(unittest.TestCase):
+    def test_burst_then_timeout(self):
+        limiter = ProviderRateLimiter('test', requests_per_minute=60, tokens_per_minute=6000)
+        for _ in range(3):
+            self.assertEqual(limiter.acquire(tokens=1000), 0.0)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire(tokens=4000, timeout=0.5)
+        stats = limiter.get_stats()
+        self.assertEqual((stats['acquired'], stats['rejected']), (3, 1))
+        self.assertEqual(stats['wait_histogram']['<=0s'], 3)
+        self.assertAlmostEqual(stats['budget']['tokens_available'], 3000, delta=10)
+
+    def test_rate_limited_pauses_and_backs_off(self):
+        limiter = ProviderRateLimiter('test', requests_per_minute=600, backoff_factor=0.5, recovery=0.25)
+        self.assertEqual(limiter.rate_limited(retry_after=2), 2)
+        budget = limiter.get_budget()
+        self.assertGreater(budget['blocked_for'], 1.5)
+        self.assertEqual(budget['scale'], 0.5)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire(timeout=1)
+        self.assertEqual(limiter.rate_limited(), 2.0)  # exponential backoff on the second strike
+        limiter.succeeded()
+        self.assertEqual(limiter.scale, 0.5)
+
+    def test_async_waiters_share_the_bucket(self):
+        limiter = ProviderRateLimiter('test', requests_per_minute=1200)
+        limiter.requests.drain()
+
+        async def main():
+            start = time.perf_counter()
+            await asyncio.gather(*(limiter.acquire_async() for _ in range(4)))
+            return time.perf_counter() - start
+
+        self.assertGreaterEqual(asyncio.run(main()), 0.18)
+        self.assertEqual(limiter.get_stats()['acquired'], 4)
+
+    def test_rate_limited_call_retries_429_and_records_usage(self):
+        limiter = configure_rate_limiter('test-provider', requests_per_minute=600, tokens_per_minute=60000)
+        attempts = []
+
+        def create(**request):
+            attempts.append(request)
+            if len(attempts) == 1:
+                raise TooManyRequests('0.05')
+            return SimpleNamespace(usage=SimpleNamespace(total_tokens=120))
+
+        start = time.perf_counter()
+        response = rate_limited_call('test-provider', create, model='m', max_tokens=1000,
+                                     messages=[{'role': 'user', 'content': "x" * 400}])
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+        self.assertEqual(response.usage.total_tokens, 120)
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(limiter.stats['rate_limited'], 1)
+        # Two 1100-token estimates reserved, the successful one corrected to 120, plus refill during the pause
+        self.assertGreaterEqual(limiter.tokens.available(), 60000 - 1100 - 120)
+        self.assertLess(limiter.tokens.available(), 60000 - 1100)
+
+    def test_rate_limited_call_refunds_failures_and_bounds_the_wait(self):
+        limiter = configure_rate_limiter('test-provider', requests_per_minute=60, tokens_per_minute=6000)
+
+        def fail(**request):
+            raise ConnectionError("provider down")
+
+        with self.assertRaises(ConnectionError):
+            rate_limited_call('test-provider', fail, max_tokens=1000)
+        self.assertAlmostEqual(limiter.tokens.available(), 6000, delta=10)
+
+        limiter.rate_limited(retry_after=5)
+        start = time.perf_counter()
+        with self.assertRaises(RateLimitExceeded):
+            rate_limited_call('test-provider', fail, max_wait=0.1, max_tokens=10)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('7'), 7.0)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertGreater(parse_retry_after('Wed, 21 Oct 2099 07:28:00 GMT'), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,283 @@
+import asyncio
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+import unittest
+
+from CashMoneyColors_App.ai.base_ai import AnalysisAI
+from CashMoneyColors_App.ai.claude_ai import ClaudeAI
+from CashMoneyColors_App.ai.response_cache import ResponseCache, cache_key
+from CashMoneyColors_App.ai.single_flight import SingleFlight
+from CashMoneyColors_App.db.manager import NexusDatabase
+
+DETERMINISTIC = {'temperature': 0}
+
+
+class CountingCall:
+    def __init__(self, response="answer"):
+        self.response = response
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.response
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        message = SimpleNamespace(content=f"response {len(self.requests)}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeMessages:
+    def __init__(self):
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        return SimpleNamespace(content=[SimpleNamespace(text=f"response {len(self.requests)}")],
+                               usage=SimpleNamespace(input_tokens=10, output_tokens=5))
+
+
+class ClaudeAgent(ClaudeAI):
+    """ClaudeAI with the agent loop stubbed out (it only answers prompts here)"""
+
+    def _run_loop(self):
+        pass
+
+    def process_task(self, task):
+        return {'success': True, 'response': self.generate_response(task['content'])}
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "llm_cache.db"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_key_normalizes_whitespace_but_not_parameters(self):
+        params = {'temperature': 0.7, 'max_tokens': 1000}
+        self.assertEqual(cache_key('grok-4', "Write a post  \r\nabout tea\n\n", params),
+                         cache_key('grok-4', "Write a post\nabout tea", params))
+        self.assertNotEqual(cache_key('grok-4', "Write a post", params),
+                            cache_key('grok-4', "Write a post", {**params, 'temperature': 0.2}))
+        self.assertNotEqual(cache_key('grok-4', "def f():\n    pass", params),
+                            cache_key('grok-4', "def f():\npass", params))
+
+    def test_fetch_caches_responses_but_not_failures(self):
+        cache = ResponseCache()
+        call = CountingCall()
+        for _ in range(3):
+            self.assertEqual(cache.fetch('grok', 'grok-4', "prompt", DETERMINISTIC, call), "answer")
+        self.assertEqual(call.calls, 1)
+
+        failing = CountingCall(None)
+        cache.fetch('grok', 'grok-4', "other", DETERMINISTIC, failing)
+        cache.fetch('grok', 'grok-4', "other", DETERMINISTIC, failing)
+        self.assertEqual(failing.calls, 2)
+        stats = cache.get_stats()
+        self.assertEqual(stats['memory_hits'], 2)
+        self.assertEqual(stats['providers']['grok']['hits'], 2)
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 5)
+
+    def test_opt_out_and_temperature_limit(self):
+        cache = ResponseCache(max_temperature=0.3)
+        call = CountingCall()
+        cache.fetch('grok', 'grok-4', "prompt", {'temperature': 0.9}, call)
+        cache.fetch('grok', 'grok-4', "prompt", {'temperature': 0.9}, call)
+        cache.fetch('grok', 'grok-4', "prompt", {'temperature': 0.0}, call, cache=False)
+        self.assertEqual(call.calls, 3)
+        self.assertEqual(cache.get_stats()['skipped'], 3)
+
+    def test_only_deterministic_requests_cached_by_default(self):
+        cache = ResponseCache()
+        call = CountingCall()
+        for params in ({'temperature': 0.7}, {'temperature': 0.7}, {}, {}):
+            cache.fetch('grok', 'grok-4', "prompt", params, call)
+        self.assertEqual((call.calls, cache.get_stats()['skipped']), (4, 4))
+
+        opted_in = ResponseCache(max_temperature=None)
+        for params in ({'temperature': 0.7}, {'temperature': 0.7}, {}, {}):
+            opted_in.fetch('grok', 'grok-4', "prompt", params, call)
+        self.assertEqual(call.calls, 6)
+
+    def test_disk_tier_survives_restart_and_expires(self):
+        cache = ResponseCache(self.path, ttl=0.2)
+        cache.fetch('claude', 'claude-3', "prompt", DETERMINISTIC, CountingCall())
+        cache.close()
+
+        reopened = ResponseCache(self.path, ttl=0.2)
+        call = CountingCall()
+        self.assertEqual(reopened.fetch('claude', 'claude-3', "prompt", DETERMINISTIC, call), "answer")
+        self.assertEqual((call.calls, reopened.get_stats()['disk_hits']), (0, 1))
+        reopened.close()
+
+        time.sleep(0.25)
+        expired = ResponseCache(self.path, ttl=0.2)
+        expired.fetch('claude', 'claude-3', "prompt", DETERMINISTIC, call)
+        self.assertEqual(call.calls, 1)
+        expired.close()
+
+    def test_size_eviction_drops_least_recently_used(self):
+        cache = ResponseCache(self.path, max_entries=1, max_bytes=2500)
+        for i in range(3):
+            cache.fetch('grok', 'grok-4', f"prompt {i}", DETERMINISTIC, CountingCall("x" * 1000))
+        self.assertEqual(cache.get_stats()['evicted'], 1)
+        self.assertLessEqual(cache.get_stats()['disk_bytes'], 2500)
+        call = CountingCall("x" * 1000)
+        cache.fetch('grok', 'grok-4', "prompt 0", DETERMINISTIC, call)
+        self.assertEqual(call.calls, 1)
+        cache.close()
+
+    def test_agent_reuses_cached_completion(self):
+        agent = AnalysisAI(None, {})
+        agent.response_cache = ResponseCache()
+        completions = FakeCompletions()
+        agent.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        first = agent._generate_response("Analyze the funnel", temperature=0, max_tokens=1500)
+        self.assertEqual(agent._generate_response("Analyze the funnel", temperature=0, max_tokens=1500), first)
+        agent._generate_response("Analyze the funnel", temperature=0, max_tokens=1500, cache=False)
+        agent._generate_response("Analyze the funnel", max_tokens=1500)  # sampled at 0.7: not cached
+        self.assertEqual(len(completions.requests), 3)
+
+
+    def test_analysis_agent_task_hits_default_cache(self):
+        db = NexusDatabase(str(self.path.with_name("nexus.db")))
+        self.addCleanup(db.close)
+        agent = AnalysisAI(db, {})
+        agent.response_cache = ResponseCache()
+        completions = FakeCompletions()
+        agent.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        task = {'id': 1, 'content': "Quarterly funnel report"}
+        first = agent.process_task(task)
+        self.assertEqual(agent.process_task(task), first)
+        self.assertEqual(len(completions.requests), 1)
+        self.assertEqual(completions.requests[0]['temperature'], 0)
+        self.assertEqual(agent.response_cache.get_stats()['memory_hits'], 1)
+
+    def test_claude_respects_cache_opt_out(self):
+        agent = ClaudeAgent()
+        agent.response_cache = ResponseCache(max_temperature=None)
+        messages = FakeMessages()
+        agent.client, agent.initialized = SimpleNamespace(messages=messages), True
+        first = agent.generate_response("Summarize the quarter")
+        self.assertEqual(agent.generate_response("Summarize the quarter"), first)
+        agent.generate_response("Summarize the quarter", cache=False)
+        self.assertEqual(len(messages.requests), 2)
+        self.assertIsNone(ClaudeAgent(config={'cache_responses': False}).response_cache)
+
+class SingleFlightTests(unittest.TestCase):
+    def test_concurrent_threads_share_one_call(self):
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return "shared"
+
+        leader = threading.Thread(target=lambda: results.append(flights.do('key', slow)))
+        leader.start()
+        started.wait(2)
+        waiters = [threading.Thread(target=lambda: results.append(flights.do('key', slow))) for _ in range(5)]
+        for thread in waiters:
+            thread.start()
+        self.assertTrue(wait_for(lambda: flights.waiters().get('key') == 5))
+        release.set()
+        for thread in [leader] + waiters:
+            thread.join()
+        self.assertEqual((len(calls), results), (1, ["shared"] * 6))
+        self.assertEqual(flights.get_stats()['coalesced'], 5)
+        self.assertEqual(flights.waiters(), {})
+
+    def test_sampled_requests_are_coalesced_but_not_stored(self):
+        cache = ResponseCache()
+        release = threading.Event()
+        calls, results = [], []
+
+        def provider():
+            calls.append(1)
+            release.wait(2)
+            return "sampled"
+
+        def agent(**options):
+            results.append(cache.fetch('grok', 'grok-4', "broadcast", {'temperature': 0.7}, provider, **options))
+
+        threads = [threading.Thread(target=agent) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(wait_for(lambda: cache.flights.waiters().get(
+            cache_key('grok-4', "broadcast", {'temperature': 0.7})) == 3))
+        opted_out = threading.Thread(target=agent, kwargs={'cache': False})
+        opted_out.start()
+        self.assertTrue(wait_for(lambda: len(calls) == 2))
+        release.set()
+        for thread in threads + [opted_out]:
+            thread.join()
+        self.assertEqual(results, ["sampled"] * 5)
+        cache.fetch('grok', 'grok-4', "broadcast", {'temperature': 0.7}, provider)
+        self.assertEqual(len(calls), 3)
+
+    def test_leader_error_reaches_waiters(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        errors = []
+
+        def failing():
+            release.wait(2)
+            raise RuntimeError("provider down")
+
+        def caller():
+            try:
+                flights.do('key', failing)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=caller) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(wait_for(lambda: flights.waiters().get('key') == 2))
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, ["provider down"] * 3)
+
+    def test_asyncio_tasks_share_one_call(self):
+        cache = ResponseCache()
+        calls = []
+
+        async def provider():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "async answer"
+
+        async def main():
+            return await asyncio.gather(*(cache.fetch_async('grok', 'grok-4', "same prompt", DETERMINISTIC, provider)
+                                          for _ in range(8)))
+
+        self.assertEqual(asyncio.run(main()), ["async answer"] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get_stats()['single_flight']['coalesced'], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()